@@ -0,0 +1,333 @@
+"""
+Constant folding for PIR expressions
+CS420, Spring 2025
+
+This file defines an optimization pass that rewrites the expressions of a
+PIR tree in place:
+
+  * A PIR_ExpressionBinop or PIR_ExpressionUnop whose operands are all
+    constants is replaced by the constant it evaluates to, bottom-up, so
+    2 * 16 + 1 becomes 33 and ~true becomes false.
+  * Operations with an identity or absorbing constant are simplified:
+    x * 1, x + 0, x - 0, x / 1, x | 0 and x & -1 become x, as do x & true,
+    x | false, - - x and ~ ~ x; x * 0, x & 0, x & false and x | true become
+    the constant, but only when x holds no subroutine call, whose side
+    effects must still happen, and nothing that can fail at run time: no
+    array element, and no division but by a nonzero constant.
+
+Integers follow Eck's 16-bit 2's complement arithmetic: the Scanner
+limits integer constants to 32767, and every folded result wraps around
+to the range -32768..32767, as the machine's would.  Division truncates
+toward zero, and a division by zero is left for run time.
+
+The pass is meant to run after the TypeChecker, on a program that checks.
+It folds only operands of the types an operator takes, and x * 1 may leave
+a char where the checker saw an int, which matters only to the overload
+resolution the checker has already done.
+
+Expressions are walked bottom-up with an explicit stack, like the
+TypeChecker's, and the counters of a ConstantFolder accumulate over every
+tree it folds.
+"""
+
+from lexeme import Lexeme
+from parserIR import (PIR_AssignmentStatement, PIR_DoStatement, PIR_ExpressionBinop,
+                      PIR_ExpressionConstant, PIR_ExpressionUnop,
+                      PIR_ExpressionVariable, PIR_IfStatement, PIR_ReturnStatement,
+                      PIR_SubroutineCall, PIR_WhileStatement)
+from typeChecker import BOOLEAN, INT, operands
+
+
+def toInt16(value):
+    """Returns a Python int wrapped around to a 16-bit 2's complement
+    value."""
+    return (value + 32768) % 65536 - 32768
+
+
+def divide16(dividend, divisor):
+    """Returns the 16-bit quotient of two ints, truncated toward zero."""
+    quotient = abs(dividend) // abs(divisor)
+    return toInt16(-quotient if (dividend < 0) != (divisor < 0) else quotient)
+
+
+# operator -> function computing its result from two int values
+INT_OPERATIONS = {
+    Lexeme.SYMBOL_AND: lambda a, b: a & b,
+    Lexeme.SYMBOL_DIVIDE: divide16,
+    Lexeme.SYMBOL_EQUAL: lambda a, b: a == b,
+    Lexeme.SYMBOL_GT: lambda a, b: a > b,
+    Lexeme.SYMBOL_LT: lambda a, b: a < b,
+    Lexeme.SYMBOL_MINUS: lambda a, b: toInt16(a - b),
+    Lexeme.SYMBOL_OR: lambda a, b: a | b,
+    Lexeme.SYMBOL_PLUS: lambda a, b: toInt16(a + b),
+    Lexeme.SYMBOL_TIMES: lambda a, b: toInt16(a * b),
+}
+# operator -> function computing its result from two boolean values
+BOOLEAN_OPERATIONS = {
+    Lexeme.SYMBOL_AND: lambda a, b: a and b,
+    Lexeme.SYMBOL_EQUAL: lambda a, b: a == b,
+    Lexeme.SYMBOL_OR: lambda a, b: a or b,
+}
+
+# (operator, type, value) -> True if a constant operand with that value
+# leaves the other operand unchanged; the first set holds on either side
+# of the operator and the second only on the right
+IDENTITIES = {
+    (Lexeme.SYMBOL_PLUS, INT, 0), (Lexeme.SYMBOL_TIMES, INT, 1),
+    (Lexeme.SYMBOL_AND, INT, -1), (Lexeme.SYMBOL_OR, INT, 0),
+    (Lexeme.SYMBOL_AND, BOOLEAN, True), (Lexeme.SYMBOL_OR, BOOLEAN, False),
+}
+RIGHT_IDENTITIES = {(Lexeme.SYMBOL_MINUS, INT, 0), (Lexeme.SYMBOL_DIVIDE, INT, 1)}
+# (operator, type, value) -> True if a constant operand with that value
+# on either side is the result, whatever the other operand is
+ABSORBING = {
+    (Lexeme.SYMBOL_TIMES, INT, 0), (Lexeme.SYMBOL_AND, INT, 0),
+    (Lexeme.SYMBOL_OR, INT, -1), (Lexeme.SYMBOL_AND, BOOLEAN, False),
+    (Lexeme.SYMBOL_OR, BOOLEAN, True),
+}
+
+
+def constantKey(operator, node):
+    """Returns the (operator, type, value) key of a constant operand for
+    the IDENTITIES and ABSORBING sets, or None if the operand is not an
+    int or boolean constant."""
+    if type(node) is not PIR_ExpressionConstant:
+        return None
+    if node.type == INT or node.type == BOOLEAN:
+        return (operator, node.type, node.value)
+    return None
+
+
+class ConstantFolder:
+    """
+    This class folds the constant expressions of PIR trees.  The counters
+    accumulate over every call:
+
+        expressions     expression nodes visited
+        folded          operators replaced by the constant they evaluate to
+        simplified      operators removed by an identity
+        removed         expression nodes removed from the trees
+    """
+
+    def __init__(self):
+        self.expressions = 0    # expression nodes visited
+        self.folded = 0         # operations evaluated
+        self.removed = 0        # expression nodes removed
+        self.simplified = 0     # identities applied
+
+    def fold(self, pirClass):
+        """Folds every expression of a class in place.  Returns the class."""
+        for subroutine in pirClass.subroutines:
+            self.foldStatements(subroutine.body.statements)
+        return pirClass
+
+    def foldStatements(self, statements):
+        """Folds the expressions of a list of statements in place."""
+        for statement in statements:
+            kind = type(statement)
+            if kind is PIR_AssignmentStatement:
+                if statement.arrayExpression is not None:
+                    statement.arrayExpression = self.foldExpression(statement.arrayExpression)
+                statement.expression = self.foldExpression(statement.expression)
+            elif kind is PIR_DoStatement:
+                statement.subprogram = self.foldExpression(statement.subprogram)
+            elif kind is PIR_IfStatement:
+                statement.condition = self.foldExpression(statement.condition)
+                self.foldStatements(statement.thenBranch)
+                if statement.elseBranch is not None:
+                    self.foldStatements(statement.elseBranch)
+            elif kind is PIR_WhileStatement:
+                statement.condition = self.foldExpression(statement.condition)
+                self.foldStatements(statement.statements)
+            elif kind is PIR_ReturnStatement and statement.expression is not None:
+                statement.expression = self.foldExpression(statement.expression)
+
+    def foldExpression(self, expression):
+        """Folds an expression tree, rewriting its nodes in place.  Returns
+        the node that replaces its root, which may be the root itself."""
+        results = {}    # node -> (replacement, whether it is pure)
+        stack = [expression]
+        while stack:
+            node = stack[-1]
+            if node in results:
+                stack.pop()
+                continue
+            pending = [child for child in operands(node) if child not in results]
+            if pending:
+                stack.extend(reversed(pending))
+                continue
+            stack.pop()
+            self.expressions += 1
+            results[node] = self.__foldNode(node, results)
+        return results[expression][0]
+
+    def report(self):
+        """Returns the counters as a line of text."""
+        return (f"{self.expressions:,} expression nodes: {self.folded:,} folded, "
+                f"{self.simplified:,} simplified, {self.removed:,} removed")
+
+    def __foldNode(self, node, results):
+        """Returns the (replacement, pure) pair for a node whose operands
+        have been folded, after pointing the node at their replacements.
+        A pure expression calls no subroutine and cannot fail at run time,
+        so it may be dropped."""
+        kind = type(node)
+        if kind is PIR_ExpressionBinop:
+            left, leftPure = results[node.leftExp]
+            right, rightPure = results[node.rightExp]
+            node.leftExp = left
+            node.rightExp = right
+            pure = leftPure and rightPure
+            if node.operator == Lexeme.SYMBOL_DIVIDE and not (
+                    constantKey(node.operator, right) is not None and right.value != 0):
+                pure = False    # may divide by zero
+            return self.__foldBinop(node, pure)
+        if kind is PIR_ExpressionUnop:
+            operand, pure = results[node.expression]
+            node.expression = operand
+            return self.__foldUnop(node), pure
+        if kind is PIR_SubroutineCall:
+            node.actualParameters = [results[argument][0]
+                                     for argument in node.actualParameters]
+            return node, False
+        if kind is PIR_ExpressionVariable and node.arrayExpression is not None:
+            # the index may be out of bounds
+            node.arrayExpression = results[node.arrayExpression][0]
+            return node, False
+        return node, True
+
+    def __foldBinop(self, node, pure):
+        left = node.leftExp
+        right = node.rightExp
+        op = node.operator
+        if type(left) is PIR_ExpressionConstant and type(right) is PIR_ExpressionConstant:
+            if left.type == INT and right.type == INT:
+                operation = INT_OPERATIONS.get(op)
+                if operation is not None and not (op == Lexeme.SYMBOL_DIVIDE and
+                                                  right.value == 0):
+                    return self.__constant(node, operation(left.value, right.value),
+                                           2), True
+            elif left.type == BOOLEAN and right.type == BOOLEAN:
+                operation = BOOLEAN_OPERATIONS.get(op)
+                if operation is not None:
+                    return self.__constant(node, operation(left.value, right.value),
+                                           2), True
+        leftKey = constantKey(op, left)
+        rightKey = constantKey(op, right)
+        if rightKey in IDENTITIES or rightKey in RIGHT_IDENTITIES:
+            return self.__simplify(left, 2), pure
+        if leftKey in IDENTITIES:
+            return self.__simplify(right, 2), pure
+        if pure and rightKey in ABSORBING:
+            return self.__simplify(right, 1 + self.__size(left)), pure
+        if pure and leftKey in ABSORBING:
+            return self.__simplify(left, 1 + self.__size(right)), pure
+        return node, pure
+
+    def __foldUnop(self, node):
+        operand = node.expression
+        op = node.operator
+        if type(operand) is PIR_ExpressionConstant:
+            if operand.type == INT:
+                value = toInt16(-operand.value) if op == Lexeme.SYMBOL_MINUS \
+                    else ~operand.value
+                return self.__constant(node, value, 1)
+            if operand.type == BOOLEAN and op == Lexeme.SYMBOL_NEGATE:
+                return self.__constant(node, not operand.value, 1)
+        elif type(operand) is PIR_ExpressionUnop and operand.operator == op:
+            # - - x and ~ ~ x are x, even at the ends of the 16-bit range
+            return self.__simplify(operand.expression, 2)
+        return node
+
+    def __constant(self, node, value, removed):
+        """Returns the constant a node evaluates to, counting the node as
+        folded and the nodes it takes the place of as removed."""
+        self.folded += 1
+        self.removed += removed
+        if type(value) is bool:
+            return PIR_ExpressionConstant(node.lineNumber, BOOLEAN, value)
+        return PIR_ExpressionConstant(node.lineNumber, INT, value)
+
+    def __simplify(self, replacement, removed):
+        self.simplified += 1
+        self.removed += removed
+        return replacement
+
+    def __size(self, node):
+        """Returns the number of expression nodes in a tree."""
+        count = 0
+        stack = [node]
+        while stack:
+            count += 1
+            stack.extend(operands(stack.pop()))
+        return count
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+    from eckParser import Parser
+    from pirPrinter import PIR_Printer
+
+    if len(sys.argv) > 1:
+        folder = ConstantFolder()
+        for filename in sys.argv[1:]:
+            print(PIR_Printer().render(folder.fold(Parser().parse(filename))), end="")
+        print(folder.report())
+        sys.exit()
+
+    # each expression and what it folds to
+    CASES = [
+        ("2 * 16 + 1", "33"), ("~true", "false"), ("32767 + 1", "-32767 - 1"),
+        ("-(7) / 2", "-3"), ("7 / 0", None), ("1 < 2 & ~(3 = 4)", "true"),
+        ("x * 1 + 0", "x"), ("(x - 0) / 1", "x"), ("x & false", "false"),
+        ("f() & false", None), ("- - x", "x"), ("x * (3 - 3)", "0"),
+        ("~0", "-1"), ("x | 0", "x"), ('"a" = "a"', None),
+        ("(x / 0) * 0", None), ("a[99] & 0", None), ("(x / y) * 0", None),
+        ("(x / 2) * 0", "0"), ("a[1] * 1", "a[1]"),
+    ]
+    failures = 0
+    with tempfile.TemporaryDirectory() as workDir:
+        filename = os.path.join(workDir, "Fold.eck")
+        for source, expected in CASES:
+            with open(filename, "w") as outFile:
+                outFile.write(f"class Fold {{ function void f() {{ int x; x = {source}; "
+                              f"x = {expected or source}; return; }} }}\n")
+            statements = Parser().parse(filename).subroutines[0].body.statements
+            folded = ConstantFolder().foldExpression(statements[0].expression)
+            want = statements[1].expression
+            if expected is not None:
+                want = ConstantFolder().foldExpression(want)
+            got = PIR_Printer().render(folded)
+            if got != PIR_Printer().render(want):
+                failures += 1
+                print(f"{source}: got\n{got}")
+    print(f"{len(CASES) - failures} of {len(CASES)} cases fold as expected")
+
+    # each expression that fails at run time must still fail once folded
+    from pirInterpreter import EckRuntimeError, PIR_Interpreter
+    TRAPS = ["(x / 0) * 0", "a[99] & 0", "(x / y) * 0", "(a[5] / 1) | 0"]
+    failures = 0
+    with tempfile.TemporaryDirectory() as workDir:
+        filename = os.path.join(workDir, "Main.eck")
+        for source in TRAPS:
+            with open(filename, "w") as outFile:
+                outFile.write(f"class Main {{ function void main() {{ int x, y; Array a; "
+                              f"a = Array.new(3); x = {source}; return; }} }}\n")
+            outcomes = []
+            for folder in (None, ConstantFolder()):
+                pirClass = Parser().parse(filename)
+                if folder is not None:
+                    folder.fold(pirClass)
+                try:
+                    interpreter = PIR_Interpreter()
+                    interpreter.load([pirClass])
+                    interpreter.run()
+                    outcomes.append("no error")
+                except EckRuntimeError as err:
+                    outcomes.append(err.value)
+            if outcomes[0] != outcomes[1] or outcomes[0] == "no error":
+                failures += 1
+                print(f"{source}: {outcomes[0]} before folding, {outcomes[1]} after")
+    print(f"{len(TRAPS) - failures} of {len(TRAPS)} run time errors survive folding")
@@ -0,0 +1,365 @@
+"""
+Cross-class dependency index for whole-program builds of Eck
+CS420, Spring 2025
+
+This file defines an index of the dependencies between the classes of an
+Eck program, and between their subroutines, extracted from the PIR trees.
+A class depends on every class it names: in the type of a variable or a
+subroutine, in a call such as Square.new(), or as the class of the
+variable a method is called on.  A subroutine depends on every subroutine
+it calls.
+
+The index also keeps, for every file, the class it declares, the
+interface of that class (the signatures of its subroutines, which is all
+another class can see of it), and the errors the last build found in it.
+It is saved as a JSON file, so build() can bring a program up to date by
+parsing and checking only:
+
+  * the files that changed since the last build, and
+  * the classes that depend on a class whose interface changed.
+
+A class that depends on a changed class, but only through an interface
+that stayed the same, checks exactly as before, so it is not checked
+again.  The classes that are not checked are declared to the TypeChecker
+from their saved interfaces, without reading their files.
+
+A file is known to be unchanged when its size and modification time are
+those recorded; otherwise its contents are hashed, so a file that was only
+touched is not parsed again.
+"""
+
+import hashlib
+import json
+import os
+
+from eckParser import Parser, ParserError
+from eckProject import projectFiles
+from eckTypes import DataTypes, SubroutineSpecifiers, VariableScopes
+from parserIR import (PIR_Base, PIR_Class, PIR_SubroutineBody, PIR_SubroutineCall,
+                      PIR_SubroutineDeclaration, PIR_VariableDeclaration)
+from pirSerializer import nodeFields
+from scanner import ScannerError
+from symbolTable import mangle
+from typeChecker import TypeCheckError, TypeChecker
+
+# version of the JSON layout written by save
+INDEX_VERSION = 1
+
+# attribute names of each PIR class besides lineNumber
+NODE_FIELDS = {}
+
+
+def subroutineCalls(node):
+    """Generates every PIR_SubroutineCall in a PIR tree."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is PIR_SubroutineCall:
+            yield node
+        fields = NODE_FIELDS.get(type(node))
+        if fields is None:
+            fields = NODE_FIELDS[type(node)] = nodeFields(type(node))
+        for name in fields:
+            value = getattr(node, name)
+            if type(value) is list:
+                stack.extend(value)
+            elif isinstance(value, PIR_Base):
+                stack.append(value)
+
+
+def classDependencies(pirClass):
+    """Extracts the dependencies of a class from its tree.
+    Returns:
+        The (classes, calls) pair.  classes is the sorted list of the
+        other classes the class names.  calls maps the mangled name of each
+        of its subroutines to the sorted list of the subroutines it calls:
+        the mangled name the TypeChecker assigned to the call if it has
+        been checked, and otherwise "Class.subroutine".
+    """
+    className = pirClass.name
+    fieldTypes = {declaration.name: declaration.type
+                  for declaration in pirClass.variables}
+    classes = {declaration.type[1] for declaration in pirClass.variables
+               if declaration.type[0] == DataTypes.CLASS_SCALAR}
+    calls = {}
+    for subroutine in pirClass.subroutines:
+        declarations = subroutine.parameters + subroutine.body.variables
+        classes.update(declaration.type[1] for declaration in declarations
+                       if declaration.type[0] == DataTypes.CLASS_SCALAR)
+        if subroutine.type[0] == DataTypes.CLASS_SCALAR:
+            classes.add(subroutine.type[1])
+        variableTypes = dict(fieldTypes)
+        variableTypes.update((declaration.name, declaration.type)
+                             for declaration in declarations)
+        callees = set()
+        for call in subroutineCalls(subroutine.body):
+            target = call.varOrClass
+            if target is None:
+                calleeClass = className
+            elif target in variableTypes:
+                typ = variableTypes[target]
+                calleeClass = typ[1] if typ[0] == DataTypes.CLASS_SCALAR else "Array"
+            else:
+                calleeClass = target
+            classes.add(calleeClass)
+            callees.add(call.mangledSubrName or f"{calleeClass}.{call.subroutineName}")
+        caller = subroutine.mangledName or mangle(className, subroutine.name,
+                                                  subroutine.parameters)
+        calls[caller] = sorted(callees)
+    classes.discard(className)
+    classes.discard(None)
+    return sorted(classes), calls
+
+
+def classInterface(pirClass):
+    """Returns what other classes can see of a class, the signature of each
+    subroutine, as a list of [specifier, return type, name, parameter
+    types] lists that JSON can hold."""
+    return [[subroutine.specifier.name, typeList(subroutine.type), subroutine.name,
+             [typeList(parameter.type) for parameter in subroutine.parameters]]
+            for subroutine in pirClass.subroutines]
+
+
+def typeList(typ):
+    """Returns a (DataType, className | None) pair as a list JSON can hold."""
+    return [typ[0].name, typ[1]]
+
+
+def interfaceClass(name, interface):
+    """Returns a PIR_Class with the name and subroutine declarations of a
+    saved interface, and empty bodies, for declaring the class to a
+    TypeChecker."""
+    subroutines = []
+    for specifier, typ, subroutineName, parameterTypes in interface:
+        parameters = [PIR_VariableDeclaration(0, (DataTypes[dataType], className),
+                                              f"p{i}", VariableScopes.PARAMETER)
+                      for i, (dataType, className) in enumerate(parameterTypes)]
+        subroutines.append(PIR_SubroutineDeclaration(
+            0, SubroutineSpecifiers[specifier], (DataTypes[typ[0]], typ[1]),
+            subroutineName, parameters, PIR_SubroutineBody(0, [], [])))
+    return PIR_Class(0, name, [], subroutines)
+
+
+def fileDigest(filename):
+    """Returns the SHA-256 hex digest of a file's bytes."""
+    with open(filename, "rb") as inFile:
+        return hashlib.sha256(inFile.read()).hexdigest()
+
+
+class DependencyIndex:
+    """
+    The dependencies of every class of a program, kept up to date by
+    build().  files maps each filename to its record, a dict holding:
+
+        class       name of the class declared in the file, or None if it
+                    does not parse
+        calls       the subroutine dependencies from classDependencies
+        classes     the class dependencies from classDependencies
+        digest      SHA-256 hex digest of the file's bytes
+        errors      the errors found in the file by the last build
+        interface   the class's interface from classInterface
+        stat        the file's [size, modification time in nanoseconds]
+
+    After each build, parsed lists the files parsed and checked lists the
+    classes checked.
+    """
+
+    def __init__(self, path=None):
+        """
+        path    Optional; JSON file the index is loaded from, if it exists,
+                and saved to by build
+        """
+        self.checked = []        # classes checked by the last build
+        self.files = {}          # filename -> record
+        self.parsed = []         # files parsed by the last build
+        self.path = path
+        self.__classFiles = {}   # class name -> filename
+        self.__dependents = {}   # class name -> set of class names that name it
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def build(self, paths):
+        """Brings a program up to date, parsing and checking only what its
+        changes require.
+        Inputs:
+            paths       A directory, a filename, or a list of them, as for
+                        parseProject
+        Returns:
+            The list of the errors of the whole program, in file order,
+            including those of the files that were not checked again.
+        """
+        files = projectFiles(paths)
+        self.parsed = []
+        self.checked = []
+        affected = set()      # classes to check
+        changedFiles = []
+        for filename in set(self.files) - set(files):
+            # a removed class changes the interface its dependents see
+            affected.update(self.dependents(self.files[filename]["class"], depth=1))
+            self.__replace(filename, None)
+        for filename in files:
+            stat = os.stat(filename)
+            stat = [stat.st_size, stat.st_mtime_ns]
+            record = self.files.get(filename)
+            if record is not None and record["stat"] == stat:
+                continue
+            digest = fileDigest(filename)
+            if record is not None and record["digest"] == digest:
+                record["stat"] = stat
+                continue
+            changedFiles.append((filename, stat, digest))
+
+        trees = {}            # class name -> PIR_Class to check
+        for filename, stat, digest in changedFiles:
+            old = self.files.get(filename)
+            record = {"calls": {}, "class": None, "classes": [], "digest": digest,
+                      "errors": [], "interface": [], "stat": stat}
+            pirClass = self.__parse(filename, record)
+            if pirClass is not None:
+                record["class"] = pirClass.name
+                record["interface"] = classInterface(pirClass)
+                trees[pirClass.name] = pirClass
+            if old is None or old["class"] != record["class"] or \
+                    old["interface"] != record["interface"]:
+                for name in (record["class"], None if old is None else old["class"]):
+                    affected.update(self.dependents(name, depth=1))
+            self.__replace(filename, record)
+        affected.difference_update(trees)
+        for name in sorted(affected):
+            filename = self.__classFiles.get(name)
+            if filename is not None:
+                pirClass = self.__parse(filename, self.files[filename])
+                if pirClass is not None:
+                    trees[name] = pirClass
+        self.__check(trees)
+        if self.path is not None:
+            self.save(self.path)
+        return [error for filename in files for error in self.files[filename]["errors"]]
+
+    def callersOf(self, subroutineName):
+        """Returns the sorted mangled names of the subroutines that call a
+        subroutine, named by its mangled or "Class.subroutine" name."""
+        return sorted(caller for record in self.files.values()
+                      for caller, callees in record["calls"].items()
+                      if subroutineName in callees)
+
+    def dependents(self, className, depth=None):
+        """Returns the set of classes that depend on a class, directly or
+        through other classes.
+        Inputs:
+            className   name of the class
+            depth       Optional; most steps of dependence to follow, by
+                        default as many as there are
+        """
+        found = set()
+        frontier = [className]
+        while frontier and depth != 0:
+            following = []
+            for name in frontier:
+                for dependent in self.__dependents.get(name, ()):
+                    if dependent not in found and dependent != className:
+                        found.add(dependent)
+                        following.append(dependent)
+            frontier = following
+            if depth is not None:
+                depth -= 1
+        return found
+
+    def load(self, path):
+        """Replaces the index with the one saved in a JSON file.  An index
+        saved in another layout is ignored, so the next build starts over."""
+        with open(path) as inFile:
+            data = json.load(inFile)
+        self.files = {}
+        self.__classFiles = {}
+        self.__dependents = {}
+        if data.get("version") != INDEX_VERSION:
+            return
+        for filename, record in data["files"].items():
+            self.__replace(filename, record)
+
+    def save(self, path):
+        """Writes the index to a JSON file with sorted keys, through a
+        temporary file so a reader never sees half of it."""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as outFile:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, outFile,
+                      indent=1, sort_keys=True)
+            outFile.write("\n")
+        os.replace(temporary, path)
+
+    def __check(self, trees):
+        """Type checks the classes in trees, declaring the rest of the
+        program from the interfaces in the index, and stores the errors of
+        each class in its record."""
+        self.checked = sorted(trees)
+        if not trees:
+            return
+        declared = [interfaceClass(record["class"], record["interface"])
+                    for record in self.files.values()
+                    if record["class"] is not None and record["class"] not in trees]
+        try:
+            TypeChecker().check(trees.values(), declared)
+            errors = []
+        except TypeCheckError as err:
+            errors = err.value
+        for name, pirClass in trees.items():
+            filename = self.__classFiles[name]
+            record = dict(self.files[filename])
+            record["errors"] = [error for error in errors
+                                if error.startswith(name + ": ")]
+            # after checking, calls carry the mangled names of overloads
+            record["classes"], record["calls"] = classDependencies(pirClass)
+            self.__replace(filename, record)
+
+    def __parse(self, filename, record):
+        """Parses a file for a build.  Returns its PIR_Class, or None with
+        the error stored in the record if it does not parse."""
+        self.parsed.append(filename)
+        try:
+            return Parser().parse(filename)
+        except (ParserError, ScannerError) as err:
+            record["errors"] = [f"{filename}: {err.value}"]
+            return None
+
+    def __replace(self, filename, record):
+        """Replaces the record of a file, or removes it if record is None,
+        updating the class and dependent indexes to match."""
+        old = self.files.pop(filename, None)
+        if old is not None and old["class"] is not None:
+            if self.__classFiles.get(old["class"]) == filename:
+                del self.__classFiles[old["class"]]
+            for name in old["classes"]:
+                self.__dependents[name].discard(old["class"])
+        if record is None:
+            return
+        if record["class"] is None:
+            # a file that does not parse has no dependencies until it does
+            record["calls"], record["classes"] = {}, []
+        else:
+            self.__classFiles[record["class"]] = filename
+        self.files[filename] = record
+        for name in record["classes"]:
+            self.__dependents.setdefault(name, set()).add(record["class"])
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    # python dependencyIndex.py [program directory [index file]]
+    here = os.path.dirname(os.path.abspath(__file__))
+    program = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, "ParserTests", "Square")
+    with tempfile.TemporaryDirectory() as workDir:
+        index = DependencyIndex(sys.argv[2] if len(sys.argv) > 2
+                                else os.path.join(workDir, "index.json"))
+        for step in ("first build", "second build"):
+            errors = index.build(program)
+            print(f"{step}: parsed {len(index.parsed)} files, checked "
+                  f"{index.checked}, {len(errors)} errors")
+        for filename, record in sorted(index.files.items()):
+            name = record["class"]
+            print(f"{name}: depends on {record['classes']}, "
+                  f"depended on by {sorted(index.dependents(name))}")
+            for caller, callees in sorted(record["calls"].items()):
+                print(f"   {caller} calls {', '.join(callees) or 'nothing'}")
@@ -0,0 +1,267 @@
+"""
+Reproducible benchmark suite for the Eck scanner, parser and printer
+CS420, Spring 2025
+
+This file builds a set of Eck workloads of a controlled size, each a single
+class with a different shape, and measures every stage of the front end on
+them: lexemes per second for the Scanner, AST nodes per second for the
+Parser, the split of the time between scanning, parsing and printing, and
+the peak memory of a parse followed by a print.  The workloads are made by
+deterministic generators seeded with SEED, so two runs of the same commit
+measure the same input.
+
+The results are written as JSON with sorted keys, so the files from two
+commits can be diffed directly or compared with --compare:
+
+    python eckBenchSuite.py results.json [kilobytes per workload]
+    python eckBenchSuite.py --compare old.json new.json
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+
+from eckBenchmark import peakMemory, scanFile, timeIt, walkNodes, writeLargeClass
+from eckParser import Parser
+from pirPrinter import PIR_Printer
+
+# version of the JSON layout written by runSuite
+RESULTS_VERSION = 1
+# seed for every workload generator
+SEED = 420
+# default size of each workload
+KILOBYTES = 256
+
+# binary operators used in generated expressions
+OPERATORS = ["+", "-", "*", "/", "&", "|", "<", ">", "="]
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def subroutines(outFile, target, writeBody):
+    """Writes a class named Bench, calling writeBody(outFile, index) for the
+    body of one subroutine after another until the file holds at least
+    target bytes."""
+    outFile.write("class Bench {\n   field int x, y, z;\n\n")
+    index = 0
+    while outFile.tell() < target:
+        outFile.write(f"   method void f{index}() {{\n")
+        writeBody(outFile, index)
+        outFile.write("      return;\n   }\n\n")
+        index += 1
+    outFile.write("}\n")
+
+
+def writeTestPrograms(filename, target, rng):
+    """Writes the subroutines of ParserTests/Square/SquareGame.eck over and
+    over, as few times as make the file hold at least target bytes, so it
+    is less than one copy over target like the other workloads."""
+    single = os.path.getsize(writeLargeClass(filename, 1))
+    perCopy = os.path.getsize(writeLargeClass(filename, 2)) - single
+    copies = max(1, -(-(target - single) // perCopy) + 1)
+    writeLargeClass(filename, copies)
+
+
+def writeIdentifiers(filename, target, rng):
+    """Writes local variables with long names and assignments between
+    them, so most of the input is identifier characters."""
+    def body(outFile, index):
+        names = ["".join(rng.choice(LETTERS) for _ in range(rng.randint(12, 32)))
+                 + str(i) for i in range(8)]
+        outFile.write(f"      int {', '.join(names)};\n")
+        for _ in range(16):
+            left, right, other = rng.sample(names, 3)
+            outFile.write(f"      {left} = {right} + {other};\n")
+
+    with open(filename, "w") as outFile:
+        subroutines(outFile, target, body)
+
+
+def writeStrings(filename, target, rng):
+    """Writes calls whose arguments are long string constants."""
+    def body(outFile, index):
+        for _ in range(8):
+            words = ["".join(rng.choice(LETTERS) for _ in range(rng.randint(1, 10)))
+                     for _ in range(rng.randint(8, 24))]
+            outFile.write(f'      do Output.printString("{" ".join(words)}");\n')
+
+    with open(filename, "w") as outFile:
+        subroutines(outFile, target, body)
+
+
+def writeComments(filename, target, rng):
+    """Writes statements buried in line and block comments, so most of
+    the input is skipped by the Scanner."""
+    def body(outFile, index):
+        for _ in range(4):
+            words = " ".join(rng.choice(LETTERS) * rng.randint(1, 8)
+                             for _ in range(12))
+            outFile.write(f"      // {words}\n      /* {words}\n         {words} */\n"
+                          f"      x = y; /** {words} */\n")
+
+    with open(filename, "w") as outFile:
+        subroutines(outFile, target, body)
+
+
+def writeNested(filename, target, rng, depth=40):
+    """Writes if and while statements nested depth deep."""
+    def body(outFile, index):
+        for level in range(depth):
+            indent = " " * (6 + 3 * level)
+            keyword = rng.choice(("if", "while"))
+            outFile.write(f"{indent}{keyword} (x < {level}) {{\n{indent}   x = x + 1;\n")
+        for level in reversed(range(depth)):
+            outFile.write(" " * (6 + 3 * level) + "}\n")
+
+    with open(filename, "w") as outFile:
+        subroutines(outFile, target, body)
+
+
+def writeExpressions(filename, target, rng, operands=200):
+    """Writes assignments of expressions with the given number of
+    operands, mixing every operator with parentheses and unary
+    operators."""
+    def body(outFile, index):
+        for _ in range(4):
+            terms = [rng.choice(("x", "y", "z", "-x", "~y", "(x + 1)", "17"))
+                     for _ in range(operands)]
+            outFile.write("      x = " + terms[0])
+            for i, term in enumerate(terms[1:], 1):
+                outFile.write(f" {rng.choice(OPERATORS)} {term}")
+                if i % 10 == 0:
+                    outFile.write("\n         ")
+            outFile.write(";\n")
+
+    with open(filename, "w") as outFile:
+        subroutines(outFile, target, body)
+
+
+# workload name -> generator, called as generator(filename, target bytes,
+# random.Random)
+WORKLOADS = {
+    "comments": writeComments,
+    "expressions": writeExpressions,
+    "identifiers": writeIdentifiers,
+    "nested": writeNested,
+    "strings": writeStrings,
+    "tests": writeTestPrograms,
+}
+
+
+def buildWorkload(name, filename, kilobytes=KILOBYTES):
+    """Writes the named workload of about the given size.  Returns the
+    filename."""
+    WORKLOADS[name](filename, int(kilobytes * 1024), random.Random(f"{SEED}:{name}"))
+    return filename
+
+
+def parseAndPrint(filename):
+    """Parses a file and renders its tree, the whole front end."""
+    return PIR_Printer().render(Parser().parse(filename))
+
+
+def measure(filename, repeat=3):
+    """Measures the front end on one file.  Returns a dict of results;
+    times are the best of repeat runs.
+
+    The Parser pulls its lexemes from a Scanner as it goes, so the parse
+    time is that of a whole parse less the time to scan the same file."""
+    scanSeconds, lexemes = timeIt(scanFile, filename, repeat=repeat)
+    totalSeconds, tree = timeIt(Parser().parse, filename, repeat=repeat)
+    printSeconds, text = timeIt(PIR_Printer().render, tree, repeat=repeat)
+    nodes = sum(1 for _ in walkNodes(tree))
+    parseSeconds = max(totalSeconds - scanSeconds, 0.0)
+    seconds = scanSeconds + parseSeconds + printSeconds
+    return {
+        "bytes": os.path.getsize(filename),
+        "lexemes": lexemes,
+        "lexemesPerSecond": lexemes / scanSeconds,
+        "lines": text.count("\n"),
+        "nodes": nodes,
+        "nodesPerSecond": nodes / totalSeconds,
+        "peakBytes": peakMemory(parseAndPrint, filename),
+        "seconds": {"scan": scanSeconds, "parse": parseSeconds,
+                    "print": printSeconds},
+        "split": {"scan": scanSeconds / seconds, "parse": parseSeconds / seconds,
+                  "print": printSeconds / seconds},
+    }
+
+
+def gitCommit():
+    """Returns the commit checked out in this module's repository, or None
+    if git is not available."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def runSuite(kilobytes=KILOBYTES, repeat=3, names=None):
+    """Builds and measures the workloads, all of them by default.  Returns
+    the results as a dict ready to be written as JSON."""
+    results = {
+        "version": RESULTS_VERSION,
+        "environment": {"commit": gitCommit(), "machine": platform.machine(),
+                        "python": platform.python_version(),
+                        "system": platform.system()},
+        "settings": {"kilobytes": kilobytes, "repeat": repeat, "seed": SEED},
+        "workloads": {},
+    }
+    with tempfile.TemporaryDirectory() as workDir:
+        for name in names or sorted(WORKLOADS):
+            filename = buildWorkload(name, os.path.join(workDir, f"{name}.eck"),
+                                     kilobytes)
+            results["workloads"][name] = measure(filename, repeat)
+    return results
+
+
+def writeResults(filename, results):
+    """Writes suite results to a JSON file with sorted keys."""
+    with open(filename, "w") as outFile:
+        json.dump(results, outFile, indent=2, sort_keys=True)
+        outFile.write("\n")
+
+
+def compareResults(old, new):
+    """Prints the change in throughput and peak memory of each workload
+    between two sets of suite results."""
+    print(f"{'workload':<12} {'lexemes/s':>10} {'nodes/s':>10} {'peak':>10}")
+    for name, after in sorted(new["workloads"].items()):
+        before = old["workloads"].get(name)
+        if before is None:
+            print(f"{name:<12} (new workload)")
+            continue
+        print(f"{name:<12}"
+              f" x{after['lexemesPerSecond'] / before['lexemesPerSecond']:9.2f}"
+              f" x{after['nodesPerSecond'] / before['nodesPerSecond']:9.2f}"
+              f" x{after['peakBytes'] / before['peakBytes']:9.2f}")
+
+
+def report(results):
+    """Prints a table of suite results."""
+    for name, result in sorted(results["workloads"].items()):
+        split = result["split"]
+        print(f"{name:<12} {result['bytes'] / 1024:7,.0f} KB"
+              f"  {result['lexemesPerSecond']:10,.0f} lexemes/s"
+              f"  {result['nodesPerSecond']:10,.0f} nodes/s"
+              f"  peak {result['peakBytes'] / 1024:8,.0f} KB"
+              f"  scan/parse/print {split['scan']:4.0%} {split['parse']:4.0%}"
+              f" {split['print']:4.0%}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--compare":
+        with open(sys.argv[2]) as oldFile, open(sys.argv[3]) as newFile:
+            compareResults(json.load(oldFile), json.load(newFile))
+    else:
+        output = sys.argv[1] if len(sys.argv) > 1 else "benchmark.json"
+        kilobytes = float(sys.argv[2]) if len(sys.argv) > 2 else KILOBYTES
+        results = runSuite(kilobytes)
+        report(results)
+        writeResults(output, results)
+        print(f"results written to {output}")
@@ -0,0 +1,838 @@
+"""
+Throughput benchmarks for the Eck compiler front end
+CS420, Spring 2025
+
+This module builds large Eck workloads by repeating the programs found in
+the test directories and times the compiler components on them.  Run it
+as a script to print a throughput comparison:
+
+    python eckBenchmark.py [megabytes]
+"""
+
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from enum import Enum
+
+from constantFolder import ConstantFolder
+from dependencyIndex import DependencyIndex
+from eckGenerator import EckGenerator
+from eckGrammar import FOLLOW
+from eckParser import Parser, ParserError
+from eckProject import parseProject
+from incrementalParser import IncrementalParser
+from lexeme import Lexeme
+from parseCache import ParseCache
+from parseProfiler import ParseProfiler
+from parserIR import PIR_AssignmentStatement, PIR_Base, PIR_Class, PIR_ExpressionBinop
+from pirInterpreter import PIR_Interpreter
+from pirPrinter import PIR_Printer
+from pirSerializer import PIR_Reader, PIR_Writer
+from scanner import Scanner, ScannerError, tokenizeAll
+from symbolTable import SymbolTableManager
+from typeChecker import TypeCheckError, TypeChecker
+
+# directory holding this module; test inputs are located relative to it
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# test programs that scan without lexical errors
+SCANNER_TESTS = ["Main.eck", "Square.eck", "SquareGame.eck"]
+
+
+def sourceFiles():
+    """Returns the paths of the error-free .eck programs in the
+    ParserTests and ScannerTests directories."""
+    files = sorted(glob.glob(os.path.join(HERE, "ParserTests", "**", "*.eck"),
+                             recursive=True))
+    for testDir in ("Scanner", "HW1"):
+        for name in SCANNER_TESTS:
+            path = os.path.join(HERE, "..", "..", testDir, "ScannerTests", name)
+            if os.path.exists(path):
+                files.append(os.path.normpath(path))
+    return files
+
+
+def buildCorpus(filename, megabytes):
+    """Writes a file of roughly the given size by concatenating the test
+    programs over and over.  Returns the filename."""
+    sources = []
+    for path in sourceFiles():
+        with open(path, "r") as inFile:
+            sources.append(inFile.read())
+    chunk = "\n".join(sources) + "\n"
+    target = int(megabytes * 1024 * 1024)
+    with open(filename, "w") as outFile:
+        written = 0
+        while written < target:
+            outFile.write(chunk)
+            written += len(chunk)
+    return filename
+
+
+def scanFile(filename, **scannerOptions):
+    """Scans every lexeme in a file.  Returns the number of lexemes read."""
+    scanner = Scanner(filename, **scannerOptions)
+    count = 0
+    while True:
+        try:
+            category, _ = scanner.nextLexeme()
+        except ScannerError:
+            continue
+        count += 1
+        if category == Lexeme.EOF:
+            return count
+
+
+def scanTuples(filename, **scannerOptions):
+    """Scans every lexeme in a file.  Returns a list of
+    ((category, value), line number) tuples."""
+    scanner = Scanner(filename, **scannerOptions)
+    tokens = []
+    while True:
+        try:
+            lexeme = scanner.nextLexeme()
+        except ScannerError:
+            continue
+        tokens.append((lexeme, scanner.getLineNumber()))
+        if lexeme[0] == Lexeme.EOF:
+            return tokens
+
+
+def timeIt(function, *args, repeat=3, **kwargs):
+    """Calls function(*args, **kwargs) repeat times.  Returns the
+    (best time in seconds, result of the last call) pair."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def peakMemory(function, *args, **kwargs):
+    """Calls function(*args, **kwargs) once.  Returns the peak number of
+    bytes allocated by Python during the call."""
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def retainedMemory(function, *args, **kwargs):
+    """Calls function(*args, **kwargs) once.  Returns the (result, number
+    of bytes allocated by Python that the result keeps alive) pair."""
+    tracemalloc.start()
+    try:
+        result = function(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def writeLongExpression(filename, operands):
+    """Writes a class whose only statement assigns an expression with the
+    given number of operands, cycling through the binary operators of
+    every precedence level.  Returns the filename."""
+    operators = ["+", "*", "-", "/", "<", "&", "=", "|", ">"]
+    with open(filename, "w") as outFile:
+        outFile.write("class Long {\n   field int x;\n"
+                      "   function void f() {\n      x = a0")
+        for i in range(1, operands):
+            outFile.write(f" {operators[i % len(operators)]} a{i}")
+            if i % 8 == 0:
+                outFile.write("\n         ")
+        outFile.write(";\n      return;\n   }\n}\n")
+    return filename
+
+
+def maxStackDepth(function, *args, **kwargs):
+    """Calls function(*args, **kwargs) once.  Returns the deepest Python
+    call depth reached below the call."""
+    depth = maxDepth = 0
+
+    def profiler(frame, event, arg):
+        nonlocal depth, maxDepth
+        if event == "call":
+            depth += 1
+            maxDepth = max(maxDepth, depth)
+        elif event == "return":
+            depth -= 1
+
+    sys.setprofile(profiler)
+    try:
+        function(*args, **kwargs)
+    finally:
+        sys.setprofile(None)
+    return maxDepth
+
+
+def benchmarkLongExpressions(workDir, sizes=(10, 100, 1000, 10000)):
+    """Parses single expressions of increasing length.  Returns a list of
+    (operand count, seconds, AST node count, maximum call depth) tuples;
+    the call depth does not grow with the length."""
+    results = []
+    for operands in sizes:
+        filename = writeLongExpression(
+            os.path.join(workDir, f"long{operands}.eck"), operands)
+        seconds, _ = timeIt(Parser().parse, filename)
+        depth = maxStackDepth(Parser().parse, filename)
+        # one variable per operand plus one binop per operator
+        results.append((operands, seconds, 2 * operands - 1, depth))
+    return results
+
+
+def walkNodes(pirObject):
+    """Yields every PIR node of an AST, whether its attributes are kept
+    in slots or in an instance dictionary."""
+    stack = [pirObject]
+    while stack:
+        node = stack.pop()
+        yield node
+        values = list(getattr(node, "__dict__", {}).values())
+        for cls in type(node).__mro__:
+            values.extend(getattr(node, name)
+                          for name in getattr(cls, "__slots__", ()))
+        for value in values:
+            for item in value if isinstance(value, list) else (value,):
+                if isinstance(item, PIR_Base):
+                    stack.append(item)
+
+
+def nodeSize(node):
+    """Returns the bytes taken by one PIR node object, counting its
+    instance dictionary if it has one but not the objects it refers to."""
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def benchmarkAstMemory(copies=1000):
+    """Parses every ParserTests/Square program the given number of times,
+    keeping all the ASTs alive.  Returns the (PIR_ExpressionBinop size,
+    node count, retained bytes) triple."""
+    files = sorted(glob.glob(os.path.join(HERE, "ParserTests", "Square", "*.eck")))
+
+    def parseAll():
+        return [Parser().parse(path) for _ in range(copies) for path in files]
+
+    trees, retained = retainedMemory(parseAll)
+    nodes = sum(1 for tree in trees for _ in walkNodes(tree))
+    binop = next(node for node in walkNodes(trees[0])
+                 if isinstance(node, PIR_ExpressionBinop))
+    return nodeSize(binop), nodes, retained
+
+
+def largeClass(copies):
+    """Parses ParserTests/Square/SquareGame.eck and returns a PIR_Class
+    whose subroutine list repeats the parsed subroutines copies times."""
+    pirClass = Parser().parse(
+        os.path.join(HERE, "ParserTests", "Square", "SquareGame.eck"))
+    return PIR_Class(pirClass.lineNumber, pirClass.name, pirClass.variables,
+                     pirClass.subroutines * copies)
+
+
+def streamLines(printer, pirObject):
+    """Consumes PIR_Printer.lines() without keeping the lines.  Returns
+    the number of lines."""
+    return sum(1 for _ in printer.lines(pirObject))
+
+
+def benchmarkPrinter(workDir, copies=2000):
+    """Times PIR_Printer on a large class, streaming its lines, rendering
+    to a string and printing to a file.  Returns a list of (name, seconds,
+    output line count, peak bytes) tuples."""
+    pirClass = largeClass(copies)
+    outFilename = os.path.join(workDir, "large.parse")
+    runs = [("stream lines", streamLines, (PIR_Printer(), pirClass)),
+            ("render", PIR_Printer().render, (pirClass,)),
+            ("print to file", PIR_Printer().print, (outFilename, pirClass))]
+    lines = streamLines(PIR_Printer(), pirClass)
+    results = []
+    for name, function, args in runs:
+        seconds, _ = timeIt(function, *args)
+        results.append((name, seconds, lines, peakMemory(function, *args)))
+    return results
+
+
+def benchmarkDispatch(nodes=1000000):
+    """Renders a class of at least the given number of nodes with the table
+    and singledispatch printer dispatch.  Returns a list of (dispatch name,
+    seconds, node count) triples."""
+    perCopy = (sum(1 for _ in walkNodes(largeClass(2))) -
+              sum(1 for _ in walkNodes(largeClass(1))))
+    pirClass = largeClass(-(-nodes // perCopy))
+    count = sum(1 for _ in walkNodes(pirClass))
+    results = []
+    for dispatch in ("singledispatch", "table"):
+        seconds, _ = timeIt(PIR_Printer(dispatch).render, pirClass, repeat=1)
+        results.append((dispatch, seconds, count))
+    return results
+
+
+def writeLargeClass(filename, copies):
+    """Writes the source of ParserTests/Square/SquareGame.eck with its
+    subroutine declarations repeated copies times.  Returns the
+    filename."""
+    with open(os.path.join(HERE, "ParserTests", "Square", "SquareGame.eck")) as inFile:
+        source = inFile.read()
+    start = source.index("   constructor")
+    end = source.rindex("}")
+    with open(filename, "w") as outFile:
+        outFile.write(source[:start])
+        for _ in range(copies):
+            outFile.write(source[start:end])
+        outFile.write("}\n")
+    return filename
+
+
+def benchmarkSerialization(workDir, copies=200):
+    """Compares parsing a large class with loading its serialized tree.
+    Returns a list of (step name, seconds, bytes) triples; the bytes are
+    the source size for parsing and the serialized size otherwise."""
+    filename = writeLargeClass(os.path.join(workDir, "large.eck"), copies)
+    parseSeconds, pirClass = timeIt(Parser().parse, filename)
+    dumpSeconds, data = timeIt(PIR_Writer().dumps, pirClass)
+    loadSeconds, _ = timeIt(PIR_Reader().loads, data)
+    return [("parse", parseSeconds, os.path.getsize(filename)),
+            ("dumps", dumpSeconds, len(data)),
+            ("loads", loadSeconds, len(data))]
+
+
+def benchmarkParseCache(workDir, copies=200):
+    """Parses a large class and the ParserTests programs through a
+    ParseCache, first with an empty cache and then again.  Returns a list
+    of (build name, seconds, hits, misses) tuples, starting with the same
+    files parsed without a cache."""
+    files = [writeLargeClass(os.path.join(workDir, "large.eck"), copies)]
+    files.extend(sorted(glob.glob(os.path.join(HERE, "ParserTests", "**", "*.eck"),
+                                  recursive=True)))
+    seconds, _ = timeIt(lambda: [Parser().parse(filename) for filename in files],
+                        repeat=1)
+    results = [("no cache", seconds, 0, len(files))]
+    cache = ParseCache(os.path.join(workDir, "cache"))
+    for build in ("cold", "warm"):
+        hits, misses = cache.hits, cache.misses
+        seconds, _ = timeIt(lambda: [cache.parse(filename) for filename in files],
+                            repeat=1)
+        results.append((build, seconds, cache.hits - hits, cache.misses - misses))
+    return results
+
+
+def benchmarkProfiler(workDir, copies=200):
+    """Parses a large class with and without a ParseProfiler.  Returns a
+    list of (mode name, seconds, profiled rule calls) triples."""
+    filename = writeLargeClass(os.path.join(workDir, "large.eck"), copies)
+    seconds, _ = timeIt(Parser().parse, filename)
+    results = [("off", seconds, 0)]
+    profiler = ParseProfiler()
+    seconds, _ = timeIt(lambda: Parser(profiler=profiler).parse(filename), repeat=1)
+    results.append(("on", seconds,
+                    sum(stats.calls for stats in profiler.rules.values())))
+    return results
+
+
+def benchmarkIncremental(workDir, copies=200):
+    """Types a statement, one character at a time, into a subroutine in the
+    middle of a large class and deletes it again, applying each keystroke
+    with an IncrementalParser.  Returns a list of (kind of edit, median
+    seconds, edits) triples, led by a full parse of the class."""
+    filename = writeLargeClass(os.path.join(workDir, "large.eck"), copies)
+    seconds, _ = timeIt(Parser().parse, filename)
+    results = [("full parse", seconds, 1)]
+    incremental = IncrementalParser()
+    incremental.parse(filename)
+    pos = incremental.text.index("return;", len(incremental.text) // 2)
+    statement = "x = x + (y * 2);\n      "
+    edits = [(pos + i, pos + i, char) for i, char in enumerate(statement)]
+    edits += [(pos + i, pos + i + 1, "") for i in reversed(range(len(statement)))]
+    times = {}
+    for start, end, replacement in edits:
+        # an edit that adds or removes a line renumbers the later subroutines
+        newline = "\n" in incremental.text[start:end] + replacement
+        begin = time.perf_counter()
+        try:
+            incremental.edit(start, end, replacement)
+        except (ParserError, ScannerError):
+            pass
+        kind = "newline" if newline else incremental.reparsed
+        times.setdefault(kind, []).append(time.perf_counter() - begin)
+    for kind, samples in sorted(times.items()):
+        samples.sort()
+        results.append((kind, samples[len(samples) // 2], len(samples)))
+    return results
+
+
+def writeWideClass(filename, variables):
+    """Writes a class named Wide with the given number of fields, and a
+    method that declares as many locals and assigns each field to a local.
+    Returns the filename."""
+    with open(filename, "w") as outFile:
+        outFile.write("class Wide {\n")
+        for i in range(variables):
+            outFile.write(f"   field int f{i};\n")
+        outFile.write("   method void touch() {\n")
+        for i in range(variables):
+            outFile.write(f"      int v{i};\n")
+        for i in range(variables):
+            outFile.write(f"      v{i} = f{variables - 1 - i};\n")
+        outFile.write("      return;\n   }\n}\n")
+    return filename
+
+
+def benchmarkSymbolTable(workDir, variables=10000, scanned=1000):
+    """Declares a class with many variables in a SymbolTableManager, then
+    resolves every variable reference in it, first by a linear scan of the
+    variables lists of the PIR, as a baseline, for the first scanned
+    references, and then through the manager's tables for all of them.
+    Returns a list of (step name, seconds, count) triples."""
+    pirClass = Parser().parse(writeWideClass(os.path.join(workDir, "wide.eck"),
+                                             variables))
+    seconds, manager = timeIt(lambda: SymbolTableManager().build([pirClass]))
+    results = [("declare", seconds, manager.symbolCount())]
+    subroutine = pirClass.subroutines[0]
+    references = []
+    for statement in subroutine.body.statements:
+        if isinstance(statement, PIR_AssignmentStatement):
+            references.extend((statement.variable, statement.expression.name))
+
+    def linearScan(names):
+        declarations = subroutine.body.variables + subroutine.parameters \
+            + pirClass.variables
+        for name in names:
+            for declaration in declarations:
+                if declaration.name == name:
+                    break
+
+    def hashed(names):
+        resolve = manager.resolve
+        mangledName = subroutine.mangledName
+        for name in names:
+            resolve(mangledName, name)
+
+    seconds, _ = timeIt(linearScan, references[:scanned], repeat=1)
+    results.append(("linear scan", seconds, scanned))
+    seconds, _ = timeIt(hashed, references)
+    results.append(("hashed", seconds, len(references)))
+    return results
+
+
+def writeProject(directory, classes):
+    """Writes a program of the given number of classes into a directory,
+    each a copy of ParserTests/Square/SquareGame.eck under its own class
+    name, which its constructor returns.  Returns the directory."""
+    with open(os.path.join(HERE, "ParserTests", "Square", "SquareGame.eck")) as inFile:
+        source = inFile.read()
+    os.makedirs(directory, exist_ok=True)
+    for i in range(classes):
+        with open(os.path.join(directory, f"SquareGame{i}.eck"), "w") as outFile:
+            outFile.write(source.replace("SquareGame", f"SquareGame{i}"))
+    return directory
+
+
+def writeCheckedProject(directory, classes):
+    """Writes a program that type checks without errors: the classes of
+    writeProject with the classes of ParserTests/Square.  Returns the
+    directory."""
+    writeProject(directory, classes)
+    for name in ("Main.eck", "Square.eck", "SquareGame.eck"):
+        with open(os.path.join(HERE, "ParserTests", "Square", name)) as inFile, \
+                open(os.path.join(directory, name), "w") as outFile:
+            # the test program calls draw with undeclared variables
+            outFile.write(inFile.read().replace("do draw(a, b);", "do draw();"))
+    return directory
+
+
+def benchmarkTypeChecker(workDir, classes=400):
+    """Type checks two large programs: copies of SquareGame with the
+    other classes of ParserTests/Square, and random classes from an
+    EckGenerator, which are full of type errors.  Returns a list of
+    (program name, seconds, nodes checked, errors) tuples."""
+    directory = writeCheckedProject(os.path.join(workDir, "typed"), classes)
+    generator = EckGenerator(seed=420, classes=classes // 4, subroutines=8)
+    generated = os.path.join(workDir, "generated")
+    generator.writeProgram(generated)
+    results = []
+    for name, program in (("SquareGame", directory), ("generated", generated)):
+        pirClasses = parseProject(program, workers=1)
+
+        def check():
+            checker = TypeChecker()
+            try:
+                checker.check(pirClasses)
+            except TypeCheckError:
+                pass
+            return checker
+
+        seconds, checker = timeIt(check)
+        results.append((name, seconds, checker.nodes, len(checker.errors)))
+    return results
+
+
+def benchmarkDependencyIndex(workDir, classes=400):
+    """Builds a program of many classes with a DependencyIndex, then builds
+    it again after no change, after a change inside one class, and after a
+    change to the interface of the Square class that every SquareGame copy
+    uses.  Returns a list of (step name, seconds, files parsed, classes
+    checked) tuples."""
+    directory = writeCheckedProject(os.path.join(workDir, "indexed"), classes)
+    index = DependencyIndex(os.path.join(workDir, "index.json"))
+
+    def edit(name, old, new):
+        filename = os.path.join(directory, name)
+        with open(filename) as inFile:
+            source = inFile.read()
+        with open(filename, "w") as outFile:
+            outFile.write(source.replace(old, new, 1))
+
+    steps = [
+        ("full build", None),
+        ("no change", None),
+        ("one body", ("SquareGame0.eck", "do Sys.wait(5);", "do Sys.wait(6);")),
+        ("interface", ("Square.eck", "method void dispose()", "method void dispose(int x)")),
+    ]
+    results = []
+    for step, change in steps:
+        if change is not None:
+            edit(*change)
+        seconds, _ = timeIt(index.build, directory, repeat=1)
+        results.append((step, seconds, len(index.parsed), len(index.checked)))
+    return results
+
+
+def benchmarkConstantFolder(workDir, classes=100):
+    """Folds the constants of a program from an EckGenerator, whose random
+    expressions are full of constant operands, and type checks it before
+    and after.  Returns the ConstantFolder and a list of (step name,
+    seconds, expression nodes) triples."""
+    generated = os.path.join(workDir, "folded")
+    EckGenerator(seed=420, classes=classes, subroutines=8).writeProgram(generated)
+    pirClasses = parseProject(generated, workers=1)
+
+    def check():
+        checker = TypeChecker()
+        try:
+            checker.check(pirClasses)
+        except TypeCheckError:
+            pass
+        return checker
+
+    results = []
+    seconds, checker = timeIt(check)
+    results.append(("check", seconds, checker.nodes))
+    folder = ConstantFolder()
+    seconds, _ = timeIt(lambda: [folder.fold(pirClass) for pirClass in pirClasses.values()],
+                        repeat=1)
+    results.append(("fold", seconds, folder.expressions))
+    seconds, checker = timeIt(check)
+    results.append(("check folded", seconds, checker.nodes))
+    return folder, results
+
+
+# a loop-heavy program: a sieve of primes, nested loops of arithmetic on
+# an array, and a method called in a loop
+LOOPS_PROGRAM = """
+class Main {
+    function void main() {
+        int i, j, n, count, sum;
+        Array sieve;
+        Accumulator total;
+        n = 8000;
+        sieve = Array.new(n);
+        i = 2;
+        while (i < n) {
+            if (sieve[i] = 0) {
+                count = count + 1;
+                j = i + i;
+                while (j < n) { sieve[j] = 1; j = j + i; }
+            }
+            i = i + 1;
+        }
+        i = 0;
+        while (i < 150) {
+            j = 0;
+            while (j < 150) { sum = sum + ((i * j) / 7) - (j & 3); j = j + 1; }
+            i = i + 1;
+        }
+        total = Accumulator.new();
+        i = 0;
+        while (i < 20000) { do total.add(i); i = i + 1; }
+        do Output.printInt(count); do Output.println();
+        do Output.printInt(sum); do Output.println();
+        do Output.printInt(total.get()); do Output.println();
+        return;
+    }
+}
+"""
+ACCUMULATOR_CLASS = """
+class Accumulator {
+    field int value;
+    constructor Accumulator new() { value = 0; return this; }
+    method void add(int n) { value = value + (n / 3); return; }
+    method int get() { return value; }
+}
+"""
+
+
+def benchmarkInterpreter(workDir, moves=3000):
+    """Runs two programs with each mode of the PIR_Interpreter: a loop-heavy
+    program, and SquareGame driven by a script of arrow keys that moves
+    the square back and forth.  Returns a list of (program name, mode,
+    load seconds, run seconds, output) tuples; both modes should give the
+    same output."""
+    loops = os.path.join(workDir, "loops")
+    os.makedirs(loops, exist_ok=True)
+    for name, text in (("Main.eck", LOOPS_PROGRAM), ("Accumulator.eck", ACCUMULATOR_CLASS)):
+        with open(os.path.join(loops, name), "w") as outFile:
+            outFile.write(text)
+    game = writeCheckedProject(os.path.join(workDir, "game"), 0)
+    keys = []
+    for arrow in (132, 130) * (moves // 400):
+        keys += [arrow] * 200 + [0] * 5
+    keys.append(81)
+    results = []
+    for name, program in (("loops", loops), ("SquareGame", game)):
+        pirClasses = parseProject(program, workers=1)
+        for mode in ("visitor", "closures"):
+            def run():
+                output = io.StringIO()
+                interpreter = PIR_Interpreter(mode, output=output, keys=keys)
+                start = time.perf_counter()
+                interpreter.load(pirClasses)
+                loaded = time.perf_counter()
+                interpreter.run()
+                return (loaded - start, time.perf_counter() - loaded,
+                        output.getvalue() or f"{interpreter.library.screenCalls} screen calls")
+            _, (loadSeconds, runSeconds, output) = timeIt(run, repeat=1)
+            results.append((name, mode, loadSeconds, runSeconds, output))
+    return results
+
+
+def benchmarkProject(workDir, classes=2000):
+    """Times parseProject on a program of many classes with 1, 2, 4, ...
+    worker processes, up to the number of cores.  Returns a list of
+    (worker count, seconds, class count) triples."""
+    directory = writeProject(os.path.join(workDir, "project"), classes)
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    results = []
+    for workers in counts:
+        seconds, trees = timeIt(parseProject, directory, workers=workers, repeat=1)
+        results.append((workers, seconds, len(trees)))
+    return results
+
+
+def benchmarkErrorPaths(workDir, rates=(0.0, 0.01, 0.1)):
+    """Scans generated programs with lexical errors injected at each of
+    the given rates.  Returns a list of (error rate, seconds, lexeme
+    count, error count) tuples."""
+    results = []
+    for rate in rates:
+        generator = EckGenerator(seed=420, classes=20, subroutines=20,
+                                 errorRate=rate, errorKinds=("character", "integer"))
+        filename = os.path.join(workDir, f"errors{rate}.eck")
+        with open(filename, "w") as outFile:
+            generator.write(outFile)
+        seconds, count = timeIt(scanFile, filename)
+        results.append((rate, seconds, count, generator.errors))
+    return results
+
+
+def benchmarkTokenStorage(filename):
+    """Compares a list of per-token tuples against a TokenArray for a
+    whole file.  Returns a list of (storage name, seconds, token count,
+    retained bytes) tuples."""
+    results = []
+    for name, function in (("tuple list", scanTuples),
+                           ("TokenArray", tokenizeAll)):
+        seconds, _ = timeIt(function, filename, engine="regex")
+        tokens, retained = retainedMemory(function, filename, engine="regex")
+        results.append((name, seconds, len(tokens), retained))
+    return results
+
+
+class TokenReplay:
+    """Stands in for a Scanner, handing out the same list of lexemes over
+    and over."""
+
+    def __init__(self, lexemes):
+        self.__lexemes = lexemes
+        self.__next = 0
+
+    def getLineNumber(self):
+        return 1
+
+    def nextLexeme(self):
+        lexeme = self.__lexemes[self.__next]
+        self.__next = (self.__next + 1) % len(self.__lexemes)
+        return lexeme
+
+
+def benchmarkLexemeTests(iterations=200000):
+    """Times Parser.match/matchNext and a follow-set membership test with
+    lexemes as plain Enum constants and list follow sets (the original
+    representation) against IntEnum constants and bitmask follow sets.
+    Returns a list of (test name, seconds, iteration count) triples."""
+    PlainLexeme = Enum("PlainLexeme", [lexeme.name for lexeme in Lexeme])
+    sample = [Lexeme.IDENTIFIER, Lexeme.SYMBOL_PLUS, Lexeme.INTEGER_CONST,
+              Lexeme.SYMBOL_SEMICOLON]
+    followNames = [lexeme.name for lexeme in Lexeme
+                   if (1 << lexeme) & FOLLOW["exp4"]]
+    results = []
+    for kind in (PlainLexeme, Lexeme):
+        lexemes = [(kind[lexeme.name], None) for lexeme in sample]
+        semicolon = kind.SYMBOL_SEMICOLON
+        parser = Parser()
+        # feed the parser from the replayed lexemes instead of a file
+        parser._Parser__scanner = TokenReplay(lexemes)
+        parser.nextToken()
+
+        def matching():
+            for _ in range(iterations):
+                parser.matchNext(semicolon)
+                parser.match(semicolon)
+
+        if kind is PlainLexeme:
+            followList = [kind[name] for name in followNames]
+
+            def following():
+                for _ in range(iterations):
+                    for lk, _ in lexemes:
+                        lk in followList
+        else:
+            def following():
+                for _ in range(iterations):
+                    for lk, _ in lexemes:
+                        (1 << lk) & FOLLOW["exp4"]
+
+        seconds, _ = timeIt(matching)
+        results.append((f"{kind.__name__} match", seconds, iterations))
+        seconds, _ = timeIt(following)
+        results.append((f"{kind.__name__} follow", seconds,
+                        iterations * len(lexemes)))
+    return results
+
+
+def benchmarkScannerModes(filename):
+    """Compares the read(1) scanner against the buffered and memory-mapped
+    scanner modes and the regex engine.  Returns a list of (mode name,
+    seconds, lexeme count, peak bytes) tuples."""
+    modes = [
+        ("read(1)", {}),
+        ("block 64K", {"blockSize": 64 * 1024}),
+        ("whole file", {"blockSize": -1}),
+        ("mmap", {"memoryMap": True}),
+        ("regex engine", {"engine": "regex"}),
+    ]
+    results = []
+    for name, options in modes:
+        seconds, count = timeIt(scanFile, filename, **options)
+        peak = peakMemory(scanFile, filename, **options)
+        results.append((name, seconds, count, peak))
+    return results
+
+
+def report(title, filename, results):
+    """Prints a throughput table for a list of (name, seconds, count,
+    peak bytes) tuples, relative to the first entry."""
+    size = os.path.getsize(filename) / (1024 * 1024)
+    print(f"{title} ({size:.1f} MB)")
+    baseline = results[0][1]
+    for name, seconds, count, peak in results:
+        print(f"   {name:<12} {seconds:8.3f} s  {size / seconds:7.2f} MB/s"
+              f"  {count / seconds:12,.0f} lexemes/s  x{baseline / seconds:.2f}"
+              f"  peak {peak / 1024:10,.0f} KB")
+
+
+if __name__ == "__main__":
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    print("Lexeme tests")
+    for name, seconds, count in benchmarkLexemeTests():
+        print(f"   {name:<18} {seconds:8.3f} s  {count / seconds:12,.0f} tests/s")
+    binopSize, nodes, retained = benchmarkAstMemory()
+    print("AST memory (ParserTests/Square x1000)")
+    print(f"   PIR_ExpressionBinop {binopSize} bytes  {nodes:,} nodes"
+          f"  {retained / 1024:10,.0f} KB  {retained / nodes:6.1f} bytes/node")
+    with tempfile.TemporaryDirectory() as workDir:
+        corpus = buildCorpus(os.path.join(workDir, "corpus.eck"), megabytes)
+        report("Scanner modes and engines", corpus, benchmarkScannerModes(corpus))
+        print("Long expressions")
+        for operands, seconds, nodes, depth in benchmarkLongExpressions(workDir):
+            print(f"   {operands:>6} operands {seconds:8.3f} s"
+                  f"  {nodes / seconds:12,.0f} nodes/s  call depth {depth}")
+        print("PIR_Printer")
+        for name, seconds, lines, peak in benchmarkPrinter(workDir):
+            print(f"   {name:<16} {seconds:8.3f} s  {lines / seconds:12,.0f} lines/s"
+                  f"  peak {peak / 1024:10,.0f} KB")
+        dispatches = benchmarkDispatch()
+        print(f"PIR_Printer dispatch ({dispatches[0][2]:,} nodes)")
+        for name, seconds, count in dispatches:
+            print(f"   {name:<16} {seconds:8.3f} s  {count / seconds:12,.0f} nodes/s"
+                  f"  x{dispatches[0][1] / seconds:.2f}")
+        steps = benchmarkSerialization(workDir)
+        print("PIR serialization")
+        for name, seconds, size in steps:
+            print(f"   {name:<8} {seconds:8.3f} s  {size / 1024:8,.0f} KB"
+                  f"  x{steps[0][1] / seconds:.2f}")
+        builds = benchmarkParseCache(workDir)
+        print("Parse cache")
+        for name, seconds, hits, misses in builds:
+            print(f"   {name:<8} {seconds:8.3f} s  {hits:3} hits  {misses:3} misses"
+                  f"  x{builds[0][1] / seconds:.2f}")
+        print("Parse profiler")
+        modes = benchmarkProfiler(workDir)
+        for name, seconds, calls in modes:
+            print(f"   {name:<8} {seconds:8.3f} s  {calls:10,} rule calls"
+                  f"  x{modes[0][1] / seconds:.2f}")
+        print("Incremental parse (keystrokes in a large class)")
+        for kind, seconds, count in benchmarkIncremental(workDir):
+            print(f"   {kind:<12} {seconds * 1e6:10,.0f} us  {count:3} edits")
+        print("Symbol tables (a class of 20,000 variables)")
+        for name, seconds, count in benchmarkSymbolTable(workDir):
+            print(f"   {name:<12} {seconds:8.3f} s  {count:8,}  {count / seconds:12,.0f} /s")
+        print("Type checker")
+        for name, seconds, nodes, errors in benchmarkTypeChecker(workDir):
+            print(f"   {name:<12} {seconds:8.3f} s  {nodes:10,} nodes"
+                  f"  {nodes / seconds:12,.0f} nodes/s  {errors:6,} errors")
+        print("Dependency index builds")
+        for step, seconds, parsed, checked in benchmarkDependencyIndex(workDir):
+            print(f"   {step:<12} {seconds:8.3f} s  {parsed:5} files parsed"
+                  f"  {checked:5} classes checked")
+        folder, steps = benchmarkConstantFolder(workDir)
+        print(f"Constant folding ({folder.report()})")
+        for step, seconds, nodes in steps:
+            print(f"   {step:<12} {seconds:8.3f} s  {nodes:10,} nodes")
+        print("Interpreter (visitor vs closures)")
+        interpreted = benchmarkInterpreter(workDir)
+        for name, mode, loadSeconds, runSeconds, output in interpreted:
+            print(f"   {name:<10} {mode:<8} load {loadSeconds:7.3f} s  run {runSeconds:7.3f} s"
+                  f"  {output.split()}")
+        for visitor, closures in zip(interpreted[::2], interpreted[1::2]):
+            print(f"   {visitor[0]:<10} closures x{visitor[3] / closures[3]:.2f}"
+                  f"{'' if visitor[4] == closures[4] else '  OUTPUTS DIFFER'}")
+        print("Project parse")
+        projects = benchmarkProject(workDir)
+        for workers, seconds, classes in projects:
+            print(f"   {workers:3} workers {seconds:8.3f} s  {classes / seconds:10,.0f} classes/s"
+                  f"  x{projects[0][1] / seconds:.2f}")
+        print("Scanner error paths (generated programs)")
+        for rate, seconds, count, errors in benchmarkErrorPaths(workDir):
+            print(f"   error rate {rate:<5} {seconds:8.3f} s  {count / seconds:12,.0f} lexemes/s"
+                  f"  {errors:6,} errors")
+        storage = benchmarkTokenStorage(corpus)
+        print("Token storage")
+        for name, seconds, count, retained in storage:
+            print(f"   {name:<12} {seconds:8.3f} s  {retained / 1024:10,.0f} KB"
+                  f"  {retained / count:6.1f} bytes/token")
@@ -0,0 +1,364 @@
+"""
+Random Eck program generator
+CS420, Spring 2025
+
+This file generates random, syntactically valid Eck programs by expanding
+the backtrack-free grammar in eckGrammar, the same grammar the p* methods
+of the Parser implement, so the programs can be used as load and fuzz
+workloads for the scanner and parser.
+
+A generator is deterministic: the same seed and knobs always produce the
+same text.  Every class is drawn from its own random stream, so the
+classes of a program can be generated separately and in any order.  The text is produced
+in chunks from an explicit stack of grammar symbols, so programs of any
+size can be streamed to a file without being built in memory.
+
+With an error rate, lexical errors like those of ScannerTests/Error*.eck
+are inserted between the tokens: illegal characters and integer constants
+too large for 16 bits, and, at the end of the output, a string constant or
+multi-line comment cut off by the end of the file.  The errors come from
+a separate random stream, so the program around them is the same program
+generated without errors.
+"""
+
+import os
+import random
+
+from eckGrammar import PRODUCTIONS, START
+from lexeme import Lexeme, LexemeMap
+from pirPrinter import IndentCache
+
+# kinds of lexical errors that can be injected; the last two can only be
+# placed at the end of the output
+ERROR_KINDS = ("character", "integer", "string", "comment")
+# characters the Scanner rejects
+ILLEGAL_CHARACTERS = "\\%$#?@^`!:"
+# class names that can be used as types without being generated
+LIBRARY_CLASSES = ["String", "Array"]
+# text of each keyword and symbol lexeme
+TERMINAL_TEXT = {lexeme: text for text, lexeme in
+                 {**LexemeMap.keywords, **LexemeMap.symbols}.items()}
+SYLLABLES = ["ba", "ce", "di", "fo", "gu", "ka", "le", "mi", "no", "pu",
+             "ra", "se", "ti", "vo", "wu", "za"]
+# tokens written without a space before or after them
+NO_SPACE_BEFORE = {")", "]", ",", "."}
+NO_SPACE_AFTER = {"(", "[", "."}
+# output tokens gathered before a chunk of text is yielded
+CHUNK_TOKENS = 4096
+# spaces per indentation level of the generated text
+INDENTATION_INCR = 3
+
+# work items on the expansion stack besides grammar symbols
+LEAVE_BLOCK = ("leave", "block")
+LEAVE_EXPRESSION = ("leave", "expression")
+
+
+def shallowestAlternatives(productions):
+    """Returns a dict mapping each nonterminal to its alternatives of least
+    derivation height, the ones that end an expansion soonest.  A
+    terminal-only alternative has height 0, and an alternative with
+    nonterminals is one higher than the tallest of them."""
+    height = dict.fromkeys(productions, float("inf"))
+
+    def altHeight(alternative):
+        return max((height[symbol] + 1 for symbol in alternative
+                    if isinstance(symbol, str)), default=0)
+
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in productions.items():
+            least = min(altHeight(alternative) for alternative in alternatives)
+            if least < height[name]:
+                height[name] = least
+                changed = True
+    return {name: [alternative for alternative in alternatives
+                   if altHeight(alternative) == height[name]]
+            for name, alternatives in productions.items()}
+
+
+SHALLOWEST = shallowestAlternatives(PRODUCTIONS)
+# right-recursive operator tails such as <exp2'>, which are either empty
+# or add one binary operator to an expression and repeat
+OPERATOR_TAILS = {name: [alternative for alternative in alternatives if alternative]
+                  for name, alternatives in PRODUCTIONS.items()
+                  if not name.endswith("*") and [] in alternatives and
+                  all(alternative[-1] == name
+                      for alternative in alternatives if alternative)}
+
+
+class EckGenerator:
+    """
+    This class generates random Eck programs.  chunks() streams a whole
+    program, one class after another, and writeProgram() writes each class
+    to its own file, as the Parser expects.
+
+    The errors counter holds the number of lexical errors injected so far.
+    """
+
+    def __init__(self, seed=0, classes=1, subroutines=4, statements=6, depth=3,
+                 expressionLength=4, vocabulary=64, expressionDepth=3,
+                 errorRate=0.0, errorKinds=ERROR_KINDS):
+        """
+        seed                Optional; any value random.Random accepts
+        classes             Optional; number of classes in the program
+        subroutines         Optional; subroutines per class
+        statements          Optional; statements in each subroutine body;
+                            nested blocks hold up to half as many
+        depth               Optional; deepest nesting of if and while
+                            statements
+        expressionLength    Optional; most binary operators in a statement's
+                            expression; nested expressions get a quarter
+        vocabulary          Optional; number of distinct variable and
+                            subroutine names
+        expressionDepth     Optional; deepest nesting of parenthesized,
+                            subscript and argument expressions
+        errorRate           Optional; chance of a lexical error before each
+                            token, 0 for a valid program
+        errorKinds          Optional; the ERROR_KINDS to inject
+        """
+        for name, value in (("classes", classes), ("vocabulary", vocabulary)):
+            if value < 1:
+                raise ValueError(f"{name} must be at least 1")
+        for name, value in (("subroutines", subroutines), ("statements", statements),
+                            ("depth", depth), ("expressionLength", expressionLength),
+                            ("expressionDepth", expressionDepth)):
+            if value < 0:
+                raise ValueError(f"{name} must not be negative")
+        for kind in errorKinds:
+            if kind not in ERROR_KINDS:
+                raise ValueError(f"unknown lexical error kind '{kind}'")
+        self.classes = classes
+        self.depth = depth
+        self.errorKinds = tuple(errorKinds)
+        self.errorRate = errorRate
+        self.errors = 0           # lexical errors injected
+        self.expressionDepth = expressionDepth
+        self.expressionLength = expressionLength
+        self.seed = seed
+        self.statements = statements
+        self.subroutines = subroutines
+
+        # a number suffix keeps names distinct and clear of the keywords
+        rng = random.Random(f"{seed}:classes")
+        self.classNames = ["".join(rng.choices(SYLLABLES, k=2)).capitalize() + str(i)
+                           for i in range(classes)]
+        rng = random.Random(f"{seed}:vocabulary")
+        self.names = ["".join(rng.choices(SYLLABLES, k=rng.randint(1, 3))) + str(i)
+                      for i in range(vocabulary)]
+        self.__typeNames = self.classNames + LIBRARY_CLASSES
+
+    def chunks(self):
+        """Generates the text of the whole program in chunks, the classes
+        one after another.  An error at the end of the file is only placed
+        after the last class."""
+        for index in range(self.classes):
+            yield from self.classChunks(index, endError=index == self.classes - 1)
+
+    def classChunks(self, index, endError=True):
+        """Generates the text of one class in chunks.
+        Inputs:
+            index       Which class, from 0 to classes - 1
+            endError    Optional; whether the text may end with a string
+                        constant or comment cut off by the end of the file
+        """
+        errorRng = random.Random(f"{self.seed}:{index}:errors")
+        errorRate = self.errorRate
+        midErrors = [kind for kind in self.errorKinds if kind in ("character", "integer")]
+        if not midErrors:
+            errorRate = 0
+        indents = IndentCache()
+        indent = 0
+        lineStart = True
+        spaceBefore = False
+        parts = []
+        for token in self.tokens(index):
+            if errorRate and errorRng.random() < errorRate:
+                self.errors += 1
+                if errorRng.choice(midErrors) == "character":
+                    error = errorRng.choice(ILLEGAL_CHARACTERS)
+                else:
+                    error = str(errorRng.randint(32768, 99999))
+                parts.append(indents[indent] if lineStart else " ")
+                parts.append(error)
+                lineStart = False
+                spaceBefore = True
+            if token == "}":
+                indent -= INDENTATION_INCR
+                parts.append(indents[indent] + "}\n" if lineStart else "\n" + indents[indent] + "}\n")
+                lineStart = True
+            elif token == "{":
+                parts.append(indents[indent] + "{\n" if lineStart else " {\n")
+                indent += INDENTATION_INCR
+                lineStart = True
+            elif token == ";":
+                parts.append(";\n")
+                lineStart = True
+            else:
+                if lineStart:
+                    parts.append(indents[indent])
+                elif spaceBefore and token not in NO_SPACE_BEFORE:
+                    parts.append(" ")
+                parts.append(token)
+                lineStart = False
+                spaceBefore = token not in NO_SPACE_AFTER
+            if len(parts) >= CHUNK_TOKENS:
+                yield "".join(parts)
+                parts = []
+        endErrors = [kind for kind in self.errorKinds if kind in ("string", "comment")]
+        if endError and self.errorRate and endErrors and errorRng.random() < 0.5:
+            self.errors += 1
+            if errorRng.choice(endErrors) == "string":
+                parts.append('"' + " ".join(errorRng.choices(self.names, k=4)) + "\n")
+            else:
+                parts.append("/* " + " ".join(errorRng.choices(self.names, k=4)) + "\n")
+        yield "".join(parts)
+
+    def repeatCount(self, name, rng, blockDepth):
+        """Returns how many times a starred nonterminal <x>* repeats <x>."""
+        if name == "subroutineDec*":
+            return self.subroutines
+        elif name == "statement*":
+            if blockDepth == 1:
+                return self.statements
+            elif blockDepth <= self.depth + 1:
+                return rng.randint(1, max(1, self.statements // 2))
+            return 0
+        return rng.randint(0, 3)
+
+    def terminalText(self, lexeme, rng):
+        """Returns the text of a terminal, choosing names and constants for
+        identifiers, integer constants and string constants."""
+        if lexeme == Lexeme.IDENTIFIER:
+            return rng.choice(self.names)
+        elif lexeme == Lexeme.INTEGER_CONST:
+            return str(rng.randint(0, 32767))
+        elif lexeme == Lexeme.STRING_CONST:
+            return '"' + " ".join(rng.choices(self.names, k=rng.randint(0, 4))) + '"'
+        return TERMINAL_TEXT[lexeme]
+
+    def tokens(self, index):
+        """Generates the token texts of one class by expanding the grammar
+        from its start symbol with an explicit stack."""
+        rng = random.Random(f"{self.seed}:{index}")
+        blockDepth = 0          # nesting of <statements>
+        budgets = []            # operators left in each open <expression>
+        stack = [START]
+        while stack:
+            item = stack.pop()
+            kind = type(item)
+            if kind is tuple:
+                if item is LEAVE_BLOCK:
+                    blockDepth -= 1
+                elif item is LEAVE_EXPRESSION:
+                    budgets.pop()
+                else:
+                    yield item[1]
+                continue
+            elif kind is not str:
+                yield self.terminalText(item, rng)
+                continue
+
+            if item == START:
+                symbols = list(PRODUCTIONS[START][0])
+                symbols[1] = ("text", self.classNames[index])
+            elif item == "className":
+                symbols = [("text", rng.choice(self.__typeNames))]
+            elif item[-1] == "*":
+                symbols = [item[:-1]] * self.repeatCount(item, rng, blockDepth)
+            elif item == "statements":
+                blockDepth += 1
+                symbols = PRODUCTIONS[item][0] + [LEAVE_BLOCK]
+            elif item == "expression":
+                if not budgets:
+                    budget = rng.randint(0, self.expressionLength)
+                elif len(budgets) < self.expressionDepth:
+                    budget = rng.randint(0, self.expressionLength // 4)
+                else:
+                    budget = 0
+                budgets.append(budget)
+                symbols = PRODUCTIONS[item][0] + [LEAVE_EXPRESSION]
+            elif item in OPERATOR_TAILS:
+                if budgets[-1] and rng.random() < 0.75:
+                    budgets[-1] -= 1
+                    symbols = rng.choice(OPERATOR_TAILS[item])
+                else:
+                    symbols = []
+            elif len(budgets) >= self.expressionDepth and budgets:
+                # too deep for another nested expression
+                symbols = rng.choice(SHALLOWEST[item])
+            else:
+                symbols = rng.choice(PRODUCTIONS[item])
+            stack.extend(reversed(symbols))
+
+    def write(self, outFile):
+        """Writes the whole program to an open text file.  Returns the
+        number of characters written."""
+        written = 0
+        for chunk in self.chunks():
+            written += outFile.write(chunk)
+        return written
+
+    def writeProgram(self, directory):
+        """Writes each class to a file named after it in a directory, which
+        is created if necessary.  Returns the list of filenames."""
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for index, name in enumerate(self.classNames):
+            filename = os.path.join(directory, name + ".eck")
+            with open(filename, "w") as outFile:
+                for chunk in self.classChunks(index):
+                    outFile.write(chunk)
+            files.append(filename)
+        return files
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    from eckParser import Parser, ParserError
+    from scanner import Scanner, ScannerError
+
+    if len(sys.argv) > 1:
+        # python eckGenerator.py directory [classes [seed]]
+        generator = EckGenerator(seed=sys.argv[3] if len(sys.argv) > 3 else 0,
+                                 classes=int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+        for filename in generator.writeProgram(sys.argv[1]):
+            print(filename)
+        sys.exit()
+
+    def countScannerErrors(filename):
+        """Scans a file to the end.  Returns the number of ScannerErrors."""
+        scanner = Scanner(filename)
+        errors = 0
+        while True:
+            try:
+                if scanner.nextLexeme()[0] == Lexeme.EOF:
+                    return errors
+            except ScannerError:
+                errors += 1
+
+    with tempfile.TemporaryDirectory() as workDir:
+        for seed in range(20):
+            generator = EckGenerator(seed=seed, classes=3, depth=seed % 5,
+                                     expressionLength=seed)
+            for filename in generator.writeProgram(os.path.join(workDir, str(seed))):
+                try:
+                    Parser().parse(filename)
+                except (ParserError, ScannerError) as err:
+                    print(f"seed {seed}: {os.path.basename(filename)}: {err.value}")
+        again = "".join(EckGenerator(seed=7, classes=3).chunks())
+        if again != "".join(EckGenerator(seed=7, classes=3).chunks()):
+            print("the same seed generated different programs")
+        print("20 seeds of valid programs generated and parsed")
+
+        for seed in range(20):
+            generator = EckGenerator(seed=seed, errorRate=0.02)
+            filename = os.path.join(workDir, f"errors{seed}.eck")
+            with open(filename, "w") as outFile:
+                generator.write(outFile)
+            found = countScannerErrors(filename)
+            if found != generator.errors:
+                print(f"seed {seed}: {generator.errors} errors injected, "
+                      f"{found} found by the Scanner")
+        print("20 seeds of programs with lexical errors generated and scanned")
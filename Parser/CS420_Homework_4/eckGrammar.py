@@ -0,0 +1,186 @@
+"""
+Grammar analysis for the Eck Compiler
+CS420, Spring 2025
+
+This module holds the backtrack-free BNF for Eck (see "Eck Backtrack Free
+Grammar.pdf") in machine-readable form and computes the FIRST and FOLLOW
+set of every nonterminal once, when the module is imported.  Each set is
+an int bitmask built by lexeme.lexemeMask(), so the parser can test
+whether lexeme lk is in a set in constant time:
+
+    if (1 << lk) & FOLLOW["exp1"]:
+        ...
+
+Notation: <name> is a nonterminal, <name>* is zero or more of them,
+quoted text is a keyword or symbol, identifier, integerConstant and
+stringConstant are the lexemes of those names, and ε is the empty string.
+"""
+
+import re
+from types import MappingProxyType
+
+from lexeme import Lexeme, LexemeMap, lexemeMask
+
+ECK_GRAMMAR = r"""
+<classDec>            -> 'class' <className> '{' <classVarDec>* <subroutineDec>* '}'
+<classVarDec>         -> <classVarModifier> <type> <varList> ';'
+<classVarModifier>    -> 'static' | 'field'
+<subroutineDec>       -> <subroutineSpecifier> <subroutineType> <subroutineName> '(' <formalParameters> ')' '{' <subroutineBody> '}'
+<subroutineSpecifier> -> 'constructor' | 'function' | 'method'
+<subroutineType>      -> 'void' | <type>
+<formalParameters>    -> <parameterList> | ε
+<parameterList>       -> <type> <varName> <parameterList1>
+<parameterList1>      -> ',' <parameterList> | ε
+<subroutineBody>      -> <varDec>* <statements>
+<varDec>              -> <type> <varList> ';'
+<type>                -> 'int' | 'char' | 'boolean' | 'int' '[' ']' | 'char' '[' ']' | 'boolean' '[' ']' | <className>
+<varList>             -> <varName> <varList1>
+<varList1>            -> ',' <varList> | ε
+<className>           -> identifier
+<subroutineName>      -> identifier
+<varName>             -> identifier
+<statements>          -> <statement>*
+<statement>           -> <assignmentStatement> | <ifStatement> | <whileStatement> | <doStatement> | <returnStatement>
+<assignmentStatement> -> <varName> <varArray> '=' <expression> ';'
+<varArray>            -> '[' <expression> ']' | ε
+<ifStatement>         -> 'if' '(' <expression> ')' '{' <statements> '}' <elseStatement>
+<elseStatement>       -> 'else' '{' <statements> '}' | ε
+<whileStatement>      -> 'while' '(' <expression> ')' '{' <statements> '}'
+<doStatement>         -> 'do' identifier <doStatement1> <actualParameters> ';'
+<doStatement1>        -> '.' identifier | ε
+<returnStatement>     -> 'return' <returnStatement1> ';'
+<returnStatement1>    -> <expression> | ε
+<expression>          -> <exp1> <expression'>
+<expression'>         -> '&' <exp1> <expression'> | '|' <exp1> <expression'> | ε
+<exp1>                -> <exp2> <exp1'>
+<exp1'>               -> '<' <exp2> <exp1'> | '>' <exp2> <exp1'> | '=' <exp2> <exp1'> | ε
+<exp2>                -> <exp3> <exp2'>
+<exp2'>               -> '+' <exp3> <exp2'> | '-' <exp3> <exp2'> | ε
+<exp3>                -> <exp4> <exp3'>
+<exp3'>               -> '*' <exp4> <exp3'> | '/' <exp4> <exp3'> | ε
+<exp4>                -> '-' <exp4> | '~' <exp4> | integerConstant | stringConstant | <keywordConstant> | identifier <exp4Id> | '(' <expression> ')'
+<exp4Id>              -> '[' <expression> ']' | '.' <subroutineName> <actualParameters> | <actualParameters> | ε
+<actualParameters>    -> '(' <expressionList> ')'
+<expressionList>      -> <expressionList1> | ε
+<expressionList1>     -> <expression> <expressionList2>
+<expressionList2>     -> ',' <expressionList1> | ε
+<keywordConstant>     -> 'true' | 'false' | 'null' | 'this'
+"""
+
+# the start symbol, which is followed by the end of the file
+START = "classDec"
+
+# lexemes named by bare words in the grammar text
+NAMED_LEXEMES = {
+    "identifier": Lexeme.IDENTIFIER,
+    "integerConstant": Lexeme.INTEGER_CONST,
+    "stringConstant": Lexeme.STRING_CONST,
+}
+
+# one symbol of a right-hand side: <nonterminal>, <nonterminal>*,
+# 'terminal', the ε marker, or bare word
+GRAMMAR_SYMBOL = re.compile(r"<([^>]+)>(\*?)|'([^']+)'|(ε)|(\w+)")
+
+
+def parseGrammar(text):
+    """Parses BNF text in the notation of ECK_GRAMMAR.  Returns a dict
+    mapping each nonterminal name to its list of alternatives.  An
+    alternative is a list whose items are nonterminal name strings or Lexeme
+    constants; the empty alternative is an empty list.  A starred
+    nonterminal <x>* becomes the nonterminal "x*", with the alternatives
+    <x> <x>* and ε."""
+    productions = {}
+    repetitions = {}
+    for line in text.strip().splitlines():
+        lhs, rhs = line.split("->")
+        lhs = lhs.strip()[1:-1]
+        alternatives = [[]]
+        # split alternatives on | separators, but not on the '|' terminal
+        for token in re.findall(r"'[^']+'|<[^>]+>\*?|[^\s|]+|\|", rhs):
+            if token == "|":
+                alternatives.append([])
+                continue
+            nonterminal, star, terminal, epsilon, word = \
+                GRAMMAR_SYMBOL.fullmatch(token).groups()
+            if epsilon:
+                continue
+            elif nonterminal:
+                if star:
+                    repetitions[nonterminal + "*"] = \
+                        [[nonterminal, nonterminal + "*"], []]
+                alternatives[-1].append(nonterminal + star)
+            elif terminal:
+                alternatives[-1].append(LexemeMap.keywords.get(terminal) or
+                                        LexemeMap.symbols[terminal])
+            else:
+                alternatives[-1].append(NAMED_LEXEMES[word])
+        productions[lhs] = alternatives
+    productions.update(repetitions)
+    return productions
+
+
+def computeSets(productions, start):
+    """Computes the nullable nonterminals and the FIRST and FOLLOW sets of
+    every nonterminal by iterating to a fixed point.  Returns a
+    (nullable set, FIRST dict, FOLLOW dict) triple; the sets in the dicts
+    are lexeme bitmasks."""
+    nullable = set()
+    first = dict.fromkeys(productions, 0)
+    follow = dict.fromkeys(productions, 0)
+    follow[start] = lexemeMask(Lexeme.EOF)
+
+    def firstOf(symbols):
+        """FIRST of a sequence of symbols, and whether it is nullable"""
+        mask = 0
+        for symbol in symbols:
+            if isinstance(symbol, str):
+                mask |= first[symbol]
+                if symbol not in nullable:
+                    return mask, False
+            else:
+                return mask | lexemeMask(symbol), False
+        return mask, True
+
+    changed = True
+    while changed:
+        changed = False
+        for lhs, alternatives in productions.items():
+            for alternative in alternatives:
+                mask, isNullable = firstOf(alternative)
+                if mask | first[lhs] != first[lhs]:
+                    first[lhs] |= mask
+                    changed = True
+                if isNullable and lhs not in nullable:
+                    nullable.add(lhs)
+                    changed = True
+                # what can follow each nonterminal in this alternative
+                for i, symbol in enumerate(alternative):
+                    if not isinstance(symbol, str):
+                        continue
+                    mask, restNullable = firstOf(alternative[i + 1:])
+                    if restNullable:
+                        mask |= follow[lhs]
+                    if mask | follow[symbol] != follow[symbol]:
+                        follow[symbol] |= mask
+                        changed = True
+    return nullable, first, follow
+
+
+def lexemesIn(mask):
+    """Returns the list of Lexeme constants in a lexeme bitmask."""
+    return [lexeme for lexeme in Lexeme if (1 << lexeme) & mask]
+
+
+PRODUCTIONS = MappingProxyType(parseGrammar(ECK_GRAMMAR))
+_nullable, _first, _follow = computeSets(PRODUCTIONS, START)
+NULLABLE = frozenset(_nullable)
+FIRST = MappingProxyType(_first)
+FOLLOW = MappingProxyType(_follow)
+
+
+if __name__ == "__main__":
+    # print the sets of every nonterminal
+    for name in PRODUCTIONS:
+        print(f"<{name}>{'  (nullable)' if name in NULLABLE else ''}")
+        print(f"   FIRST  {', '.join(lk.name for lk in lexemesIn(FIRST[name]))}")
+        print(f"   FOLLOW {', '.join(lk.name for lk in lexemesIn(FOLLOW[name]))}")
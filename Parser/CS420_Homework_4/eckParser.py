@@ -4,11 +4,27 @@ Dr. Hilton
 CS420, Spring 2025
 """
 
+from eckGrammar import FIRST, lexemesIn
 from eckTypes import DataTypes, SubroutineSpecifiers, VariableScopes
 from lexeme import Lexeme, LexemeMap
-from scanner import Scanner
+from scanner import Scanner, ScannerError
 from parserIR import *
 
+# identifies the trees this parser builds; change it whenever a change to
+# the parser changes its output, so cached parse results are not reused
+PARSER_VERSION = "1"
+
+# binding strength of each binary operator, taken from the grammar rule
+# whose tail the operator begins; higher levels bind more tightly
+BINARY_PRECEDENCE = {
+    lexeme: level
+    for level, rule in enumerate(("expression'", "exp1'", "exp2'", "exp3'"), 1)
+    for lexeme in lexemesIn(FIRST[rule])
+}
+
+# prefix operators of <exp4>
+UNARY_OPERATORS = (Lexeme.SYMBOL_MINUS, Lexeme.SYMBOL_NEGATE)
+
 
 class ParserError(Exception):
     """Custom error class for parser errors in a Eck source code file."""
@@ -30,15 +46,38 @@ class Parser:
     The methods whose names begin with lowercase "p" followed by an uppercase
     letter are direct embodiments of similarly named rules in the Eck
     grammar BNF.
+
+    Tokens are read ahead of the parser into a fixed-size ring buffer,
+    which is refilled from the scanner in batches whenever it runs dry.
+    peek(k) looks k tokens ahead without consuming anything; each buffered
+    token keeps the line number the scanner reported for it.
+
+    A parser constructed with a profiler (see parseProfiler) records calls,
+    time and tokens for each p* method and for Scanner.nextLexeme.  The
+    methods are replaced by profiling wrappers on that instance only, so
+    an unprofiled parser runs exactly as if profiling did not exist.
     """
+    # number of tokens the lookahead ring buffer holds; a power of two, and
+    # the deepest lookahead peek() allows
+    LOOKAHEAD_SIZE = 16
 
-    def __init__(self):
+    def __init__(self, profiler=None):
+        """
+        profiler    Optional; a parseProfiler.ParseProfiler to record each
+                    rule's calls, time and tokens consumed
+        """
         self.__class = None       # name of the class being parsed
         self.__filename = None    # file being parsed
         self.__lineNumber = None  # line number for current token
-        self.__lookahead = None   # lookahead token
+        self.__profiler = profiler
         self.__scanner = None     # Scanner object providing tokens to parser
         self.__token = None       # most recently scanned token
+        self.__resetLookahead()
+        if profiler is not None:
+            self.nextToken = profiler.countTokens(self.nextToken)
+            for name in dir(Parser):
+                if name[0] == "p" and name[1:2].isupper():
+                    setattr(self, name, profiler.wrap(name, getattr(self, name)))
 
     @property
     def lineNumber(self):
@@ -48,18 +87,49 @@ class Parser:
     def token(self):
         return self.__token
 
+    def __resetLookahead(self):
+        """Empties the lookahead ring buffer."""
+        self.__count = 0          # number of tokens in the ring buffer
+        self.__eofLine = None     # line number of EOF, once it is buffered
+        self.__head = 0           # ring index of the next unconsumed token
+        self.__lines = [None] * Parser.LOOKAHEAD_SIZE   # buffered line numbers
+        self.__scanError = None   # ScannerError raised after the buffered tokens
+        self.__tokens = [None] * Parser.LOOKAHEAD_SIZE  # buffered tokens
+
+    def __fill(self):
+        """Scans tokens into every free slot of the ring buffer.  A scanner
+        error ends the batch; it is raised once the tokens scanned before
+        it have been consumed.  After EOF, EOF is repeated."""
+        mask = Parser.LOOKAHEAD_SIZE - 1
+        tokens = self.__tokens
+        lines = self.__lines
+        nextLexeme = self.__scanner.nextLexeme
+        getLineNumber = self.__scanner.getLineNumber
+        slot = (self.__head + self.__count) & mask
+        while self.__count < Parser.LOOKAHEAD_SIZE:
+            if self.__eofLine is not None:
+                token = (Lexeme.EOF, None)
+                line = self.__eofLine
+            elif self.__scanError is not None:
+                break
+            else:
+                try:
+                    token = nextLexeme()
+                except ScannerError as err:
+                    self.__scanError = err
+                    break
+                line = getLineNumber()
+                if token[0] == Lexeme.EOF:
+                    self.__eofLine = line
+            tokens[slot] = token
+            lines[slot] = line
+            slot = (slot + 1) & mask
+            self.__count += 1
+
     def lookaheadToken(self):
         """Returns the next token, but does not remove it from the
         input stream."""
-        if self.__lookahead is not None:
-            raise ParserError(
-                f"Line {self.lineNumber}: More than one level of lookahead attempted")
-        else:
-            # cache the lookahead token and line number in self._lookahead
-            token = self.__scanner.nextLexeme()
-            lineNo = self.__scanner.getLineNumber()
-            self.__lookahead = (token, lineNo)
-            return token
+        return self.peek(1)
 
     def match(self, lexeme, errorMsg=None):
         """Returns if the current token matches the specified lexeme.
@@ -98,35 +168,71 @@ class Parser:
         return self.match(lexeme, errorMsg)
 
     def nextToken(self):
-        """Fetches the next token from the scanner"""
-        # check if there is a cached lookahead value
-        if self.__lookahead is not None:
-            # consume the cached value
-            self.__token = self.__lookahead[0]
-            self.__lineNumber = self.__lookahead[1]
-            self.__lookahead = None
-        else:
-            # fetch a new token from the scanner
-            self.__token = self.__scanner.nextLexeme()
-            self.__lineNumber = self.__scanner.getLineNumber()
+        """Consumes the next token from the lookahead buffer, refilling the
+        buffer from the scanner when it is empty."""
+        if self.__count == 0:
+            self.__fill()
+            if self.__count == 0:
+                raise self.__scanError
+        head = self.__head
+        self.__token = self.__tokens[head]
+        self.__lineNumber = self.__lines[head]
+        self.__head = (head + 1) & (Parser.LOOKAHEAD_SIZE - 1)
+        self.__count -= 1
         return self.__token
 
     def parse(self, filename):
         """Parse the specified file.  Returns a PIR abstract syntax tree."""
         self.__filename = filename
-        self.__scanner = Scanner(filename)
+        return self.parseFrom(Scanner(filename))
+
+    def parseFrom(self, scanner, rule="pClass", className=None):
+        """Parse the tokens delivered by a scanner, starting with one rule.
+        Inputs:
+            scanner     A Scanner, or any object with the nextLexeme() and
+                        getLineNumber() methods of one
+            rule        Optional; name of the p* method to parse with
+            className   Optional; name of the enclosing class, for parsing
+                        a rule below <classDec>
+        Returns:
+            The PIR tree the rule returns.  Tokens after the rule's end are
+            left unread; peek() shows the next one.
+        The first token delivered becomes the current token before the rule
+        runs: pClass matches it, while the other rules begin by reading the
+        token after it, so they must be given the token before their text.
+        """
+        self.__class = className
+        self.__scanner = scanner
+        if self.__profiler is not None:
+            scanner.nextLexeme = self.__profiler.wrap(
+                "Scanner.nextLexeme", scanner.nextLexeme)
+        self.__resetLookahead()
         # prime the pump by getting the first lexeme
         self.nextToken()
-        # attempt to parse the class
-        return self.pClass()
+        # attempt to parse the rule
+        return getattr(self, rule)()
+
+    def peek(self, k=1):
+        """Returns the token k positions past the current token without
+        removing anything from the input stream; peek(1) is the next token.
+        Inputs:
+            k       How far to look ahead, from 1 to LOOKAHEAD_SIZE
+        Returns:
+            The (Lexeme, value) token; (Lexeme.EOF, None) past the end of
+            the file.
+        """
+        if k > self.__count:
+            if not 0 < k <= Parser.LOOKAHEAD_SIZE:
+                raise ParserError(
+                    f"Line {self.lineNumber}: Lookahead of {k} tokens attempted")
+            self.__fill()
+            if k > self.__count:
+                raise self.__scanError
+        return self.__tokens[(self.__head + k - 1) & (Parser.LOOKAHEAD_SIZE - 1)]
 
     def pActualParameters(self):
         """<actualParameters> →  ( <expressionList> )"""
         self.matchNext(Lexeme.SYMBOL_OPEN_PAREN, "Expected a '('")
-        lk = self.lookaheadToken()[0]
-        if lk == Lexeme.SYMBOL_CLOSE_PAREN:
-            self.nextToken()
-            return []
         exprList = self.pExpressionList()
         self.matchNext(Lexeme.SYMBOL_CLOSE_PAREN, "Expected a ')'")
         return exprList
@@ -134,12 +240,12 @@ class Parser:
     def pAssignmentStatement(self):
         """<assignmentStatement> →  <varName><varArray> = <expression> ;"""
         varName = self.pVarName()
+        line = self.lineNumber
         varArray = self.pVarArray()
         self.matchNext(Lexeme.SYMBOL_EQUAL, "Expected a '='")
         expr = self.pExpression()
         self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-        asmt = PIR_AssignmentStatement(self.lineNumber, varName, varArray, expr)
-        return asmt
+        return PIR_AssignmentStatement(line, varName, varArray, expr)
 
     def pClass(self):
         """<classDec> →  class <className> { <classVarDec>*  <subroutineDec>* }"""
@@ -158,24 +264,24 @@ class Parser:
             return pirClass
 
     def pClassVarDecs(self):
-        """<classVarDec > →  <classVarModifier> <type>  <varList>;"""
-        scope = self.pClassVarModifier()
-        typ = self.pType()
-        names = self.pVarList()
-        self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-        line = self.lineNumber
+        """<classVarDec>*
+        <classVarDec > →  <classVarModifier> <type>  <varList>;"""
         pirVars = []
-        for name in names:
-            self.__lineNumber = self.__scanner.getLineNumber()
-            pirVarDec = PIR_VariableDeclaration(line, typ, name, scope)
-            pirVars.append(pirVarDec)
+        while (1 << self.peek()[0]) & FIRST["classVarDec"]:
+            scope = self.pClassVarModifier()
+            typ = self.pType()
+            line = self.lineNumber
+            names = self.pVarList()
+            self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
+            for name in names:
+                pirVars.append(PIR_VariableDeclaration(line, typ, name, scope))
         return pirVars
 
     def pClassVarModifier(self):
         """<classVarModifier> → static | field"""
         if self.matchNext(Lexeme.KW_STATIC):
             return VariableScopes.STATIC
-        elif self.match(Lexeme.KW_FIELD):
+        elif self.match(Lexeme.KW_FIELD, "Expected static or field"):
             return VariableScopes.FIELD
 
     def pClassVarName(self):
@@ -185,31 +291,28 @@ class Parser:
 
     def pDoStatement(self):
         """<doStatement> →  do identifier <doStatement1><actualParameters>;"""
-        self.nextToken()
-        #TODO: Add error
-        self.matchNext(Lexeme.IDENTIFIER)
+        self.matchNext(Lexeme.KW_DO, "Expected do")
+        line = self.lineNumber
+        self.matchNext(Lexeme.IDENTIFIER, "Expected a subroutine, class or variable name")
         name = self.token[1]
         scope = None
-        lk = self.lookaheadToken()[0]
-        if lk == Lexeme.SYMBOL_DOT:
+        if self.peek()[0] == Lexeme.SYMBOL_DOT:
             scope = name
             name = self.pDoStatement1()
         params = self.pActualParameters()
-        self.__lineNumber = self.__scanner.getLineNumber()
-        sub_call = PIR_SubroutineCall(self.lineNumber, scope, name, params)
         self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_DoStatement(self.lineNumber, sub_call)
+        return PIR_DoStatement(line, PIR_SubroutineCall(line, scope, name, params))
 
     def pDoStatement1(self):
         """<doStatement1> →  .identifier | epsilon"""
         self.nextToken()
-        #TODO: error
-        self.matchNext(Lexeme.IDENTIFIER)
+        self.matchNext(Lexeme.IDENTIFIER, "Expected a subroutine name")
         return self.token[1]
 
     def pElseStatement(self):
         """<elseStatement> →  else { <statements } | epsilon"""
+        if self.peek()[0] != Lexeme.KW_ELSE:
+            return None
         self.nextToken()
         self.matchNext(Lexeme.SYMBOL_OPEN_BRACE, "Expected a '{'")
         stmts = self.pStatements()
@@ -217,281 +320,186 @@ class Parser:
         return stmts
 
     def pExpression(self):
-        """<expression> →  <exp1><expression'>"""
-        operand1 = self.pExp1()
-        if self.__lookahead is not None and (self.__lookahead[0][0] == Lexeme.SYMBOL_SEMICOLON or\
-                                             self.__lookahead[0][0] == Lexeme.SYMBOL_CLOSE_PAREN or\
-                                             self.__lookahead[0][0] == Lexeme.SYMBOL_CLOSE_BRACKET):
-            return operand1
-        op, operand2 = self.pExpressionp()
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_ExpressionBinop(self.lineNumber, op, operand1, operand2)
+        """<expression> →  <exp1><expression'>
+           <exp1>       →  <exp2><exp1'>
+           <exp2>       →  <exp3><exp2'>
+           <exp3>       →  <exp4><exp3'>
+        All four binary levels are parsed here by precedence climbing: the
+        operands are <exp4>s, and each operator takes its level from the
+        <expression'>, <exp1'>, <exp2'> or <exp3'> rule it begins.  The
+        operators are folded left-associatively on an explicit stack, so
+        the Python call depth does not grow with the length of the
+        expression."""
+        operands = [self.pExp4()]
+        operators = []
+        while True:
+            op = self.peek()[0]
+            level = BINARY_PRECEDENCE.get(op)
+            if level is None:
+                break
+            self.nextToken()
+            # reduce everything on the stack that binds at least as tightly
+            while operators and operators[-1][1] >= level:
+                prevOp = operators.pop()[0]
+                operand2 = operands.pop()
+                operand1 = operands[-1]
+                operands[-1] = PIR_ExpressionBinop(operand1.lineNumber, prevOp,
+                                                   operand1, operand2)
+            operators.append((op, level))
+            operands.append(self.pExp4())
+        while operators:
+            prevOp = operators.pop()[0]
+            operand2 = operands.pop()
+            operand1 = operands[-1]
+            operands[-1] = PIR_ExpressionBinop(operand1.lineNumber, prevOp,
+                                               operand1, operand2)
+        return operands[0]
 
     def pExpressionList(self):
-        """<expressionList> →  <expressionList> | epsilon"""
-        exprs = self.pExpressionList1()
-        return exprs
+        """<expressionList> →  <expressionList1> | epsilon"""
+        if self.peek()[0] == Lexeme.SYMBOL_CLOSE_PAREN:
+            return []
+        return self.pExpressionList1()
 
     def pExpressionList1(self):
         """<expressionList1> →  <expression><expressionList2>"""
-        exprs = []
-        exprs.append(self.pExpression())
-        lk = self.lookaheadToken()[0]
-        if lk == Lexeme.SYMBOL_COMMA:
-            exprs = exprs + self.pExpressionList2()
-        return exprs
+        exprs = [self.pExpression()]
+        return exprs + self.pExpressionList2()
 
     def pExpressionList2(self):
         """<expressionList2> →  , <expressionList1> | epsilon"""
+        if self.peek()[0] != Lexeme.SYMBOL_COMMA:
+            return []
         self.nextToken()
-        exprs = self.pExpressionList1()
-        return exprs
-
-    def pExpressionp(self):
-        """<expression'> →  & <exp1><expression'> | | <exp1><expression'> | epsilon"""
-        if self.matchNext(Lexeme.SYMBOL_SEMICOLON) or self.match(Lexeme.SYMBOL_CLOSE_BRACKET) or\
-           self.match(Lexeme.SYMBOL_CLOSE_PAREN) or self.match(Lexeme.SYMBOL_COMMA):
-            return None, None
-        elif self.match(Lexeme.SYMBOL_AND):
-            op = Lexeme.SYMBOL_AND
-            operand2 = self.pExpression()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_OR):
-            op = Lexeme.SYMBOL_OR
-            operand2 = self.pExpression()
-            return op, operand2
-
-    def pExp1(self):
-        """<exp1> →  <exp2><exp1'>"""
-        operand1 = self.pExp2()
-        if self.__lookahead[0][0] in [Lexeme.SYMBOL_SEMICOLON, Lexeme.SYMBOL_CLOSE_BRACKET,
-                        Lexeme.SYMBOL_CLOSE_PAREN, Lexeme.SYMBOL_COMMA,
-                        Lexeme.SYMBOL_AND, Lexeme.SYMBOL_OR]:
-            return operand1
-        op, operand2 = self.pExp1p()
-        if op is None:
-            return None, None
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_ExpressionBinop(self.lineNumber, op, operand1, operand2)
-
-    def pExp1p(self):
-        """<exp1'> →  < <exp2><exp1'> | > <exp2><exp1'> | = <exp2><exp1'>| epsilon"""
-        if self.matchNext(Lexeme.SYMBOL_LT):
-            op = Lexeme.SYMBOL_LT
-            operand2 = self.pExp2()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_GT):
-            op = Lexeme.SYMBOL_GT
-            operand2 = self.pExp2()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_EQUAL):
-            op = Lexeme.SYMBOL_EQUAL
-            operand2 = self.pExp2()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_SEMICOLON):
-            return None, 'a'
-
-    def pExp2(self):
-        """<exp2> →  <exp3><exp2'>"""
-        operand1 = self.pExp3()
-        if self.__lookahead[0][0] in [Lexeme.SYMBOL_SEMICOLON, Lexeme.SYMBOL_CLOSE_BRACKET,
-                        Lexeme.SYMBOL_CLOSE_PAREN, Lexeme.SYMBOL_COMMA,
-                        Lexeme.SYMBOL_LT, Lexeme.SYMBOL_GT,
-                        Lexeme.SYMBOL_EQUAL, Lexeme.SYMBOL_AND,
-                        Lexeme.SYMBOL_OR]:
-            return operand1
-        op, operand2 = self.pExp2p()
-        if op is None:
-            return operand1
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_ExpressionBinop(self.lineNumber, op, operand1, operand2)
-
-    def pExp2p(self):
-        """<exp2'> →  + <exp3><exp2'> | - <exp3><exp2'> | epsilon"""
-        if self.matchNext(Lexeme.SYMBOL_PLUS):
-            op = Lexeme.SYMBOL_PLUS
-            operand2 = self.pExp2()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_MINUS):
-            op = Lexeme.SYMBOL_MINUS
-            operand2 = self.pExp2()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_SEMICOLON):
-            return None, None
-
-    def pExp3(self):
-        """<exp3> →  <exp4><exp3'>"""
-        operand1 = self.pExp4()
-        if self.__lookahead[0][0] in [Lexeme.SYMBOL_SEMICOLON, Lexeme.SYMBOL_CLOSE_BRACKET,
-                        Lexeme.SYMBOL_CLOSE_PAREN, Lexeme.SYMBOL_COMMA,
-                        Lexeme.SYMBOL_PLUS, Lexeme.SYMBOL_MINUS,
-                        Lexeme.SYMBOL_LT, Lexeme.SYMBOL_GT,
-                        Lexeme.SYMBOL_EQUAL, Lexeme.SYMBOL_AND,
-                        Lexeme.SYMBOL_OR]:
-            return operand1
-        op, operand2 = self.pExp3p()
-        if op is None:
-            return None, None
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_ExpressionBinop(self.lineNumber, op, operand1, operand2)
-
-    def pExp3p(self):
-        """<exp3'> →  * <exp4><exp3'> | / <exp4><exp3'> | epsilon"""
-        if self.matchNext(Lexeme.SYMBOL_TIMES):
-            op = Lexeme.SYMBOL_TIMES
-            operand2 = self.pExp3()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_DIVIDE):
-            op = Lexeme.SYMBOL_DIVIDE
-            operand2 = self.pExp3()
-            return op, operand2
-        elif self.match(Lexeme.SYMBOL_SEMICOLON):
-            return None, None
+        return self.pExpressionList1()
 
     def pExp4(self):
         """<exp4> →  - <exp4> | ~ <exp4> | integerConstant | stringConstant |
                      <keywordConstant> | identifier <exp4Id> |
                      ( <expression> )
-        """
-        if self.matchNext(Lexeme.SYMBOL_MINUS):
-            op = Lexeme.SYMBOL_MINUS
-            expr = self.pExp4()
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ExpressionUnop(self.lineNumber, op, expr)
-        elif self.match(Lexeme.SYMBOL_NEGATE):
-            op = Lexeme.SYMBOL_NEGATE
-            expr = self.pExp4()
-        elif self.match(Lexeme.INTEGER_CONST):
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ExpressionConstant(self.lineNumber, Lexeme.INTEGER_CONST,
+        Runs of prefix operators are collected in a loop rather than by
+        recursion."""
+        unops = []
+        self.nextToken()
+        while self.token[0] in UNARY_OPERATORS:
+            unops.append((self.lineNumber, self.token[0]))
+            self.nextToken()
+        if self.match(Lexeme.INTEGER_CONST):
+            expr = PIR_ExpressionConstant(self.lineNumber,
+                                          (DataTypes.INT_SCALAR, None),
                                           self.token[1])
         elif self.match(Lexeme.STRING_CONST):
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ExpressionConstant(self.lineNumber, Lexeme.STRING_CONST,
+            expr = PIR_ExpressionConstant(self.lineNumber,
+                                          (DataTypes.CLASS_SCALAR, "String"),
                                           self.token[1])
         elif self.match(Lexeme.IDENTIFIER):
             ident = self.token[1]
-            lk = self.lookaheadToken()[0]
+            lineNumber = self.lineNumber
+            lk = self.peek()[0]
             if lk == Lexeme.SYMBOL_OPEN_BRACKET:
-                expr = self.pExp4Id()
-                self.__lineNumber = self.__scanner.getLineNumber()
-                return PIR_ExpressionVariable(self.lineNumber, ident, expr)
+                expr = PIR_ExpressionVariable(lineNumber, ident, self.pExp4Id())
             elif lk == Lexeme.SYMBOL_DOT:
                 name, params = self.pExp4Id()
-                self.__lineNumber = self.__scanner.getLineNumber()
-                return PIR_SubroutineCall(self.lineNumber, ident, name, params)
+                expr = PIR_SubroutineCall(lineNumber, ident, name, params)
             elif lk == Lexeme.SYMBOL_OPEN_PAREN:
-                params = self.pExp4Id()
-                self.__lineNumber = self.__scanner.getLineNumber()
-                return PIR_SubroutineCall(self.lineNumber, None, ident, params)
-            elif lk in [Lexeme.SYMBOL_SEMICOLON, Lexeme.SYMBOL_CLOSE_BRACKET,
-                        Lexeme.SYMBOL_CLOSE_PAREN, Lexeme.SYMBOL_COMMA,
-                        Lexeme.SYMBOL_TIMES, Lexeme.SYMBOL_DIVIDE,
-                        Lexeme.SYMBOL_PLUS, Lexeme.SYMBOL_MINUS,
-                        Lexeme.SYMBOL_LT, Lexeme.SYMBOL_GT,
-                        Lexeme.SYMBOL_EQUAL, Lexeme.SYMBOL_AND,
-                        Lexeme.SYMBOL_OR]:
-                self.__lineNumber = self.__scanner.getLineNumber()
-                return PIR_ExpressionVariable(self.lineNumber, ident, None)
+                expr = PIR_SubroutineCall(lineNumber, None, ident, self.pExp4Id())
+            else:
+                expr = PIR_ExpressionVariable(lineNumber, ident, None)
+        elif self.match(Lexeme.SYMBOL_OPEN_PAREN):
+            expr = self.pExpression()
+            self.matchNext(Lexeme.SYMBOL_CLOSE_PAREN, "Expected a ')'")
+        elif (1 << self.token[0]) & FIRST["keywordConstant"]:
+            expr = self.pKeywordConstant()
         else:
-            return self.pKeywordConstant()
+            raise ParserError(f"Line {self.lineNumber}: Expected an expression")
+        # apply the prefix operators innermost first
+        for lineNumber, op in reversed(unops):
+            expr = PIR_ExpressionUnop(lineNumber, op, expr)
+        return expr
 
     def pExp4Id(self):
         """<exp4Id> →  [ <expression> ] | . <subroutineName><actualParameters> |
            <actualParameters> | epsilon"""
-        if self.lookaheadToken()[0] == Lexeme.SYMBOL_OPEN_PAREN:
-            params = self.pActualParams()
-            return params
-        elif self.matchNext(Lexeme.SYMBOL_OPEN_BRACKET):
+        lk = self.peek()[0]
+        if lk == Lexeme.SYMBOL_OPEN_PAREN:
+            return self.pActualParameters()
+        elif lk == Lexeme.SYMBOL_OPEN_BRACKET:
+            self.nextToken()
             expr = self.pExpression()
             self.matchNext(Lexeme.SYMBOL_CLOSE_BRACKET, "Expected a ']'")
             return expr
-        elif self.match(Lexeme.SYMBOL_DOT):
+        elif lk == Lexeme.SYMBOL_DOT:
+            self.nextToken()
             subName = self.pSubroutineName()
             params = self.pActualParameters()
             return subName, params
+        return None
 
     def pFormalParameters(self):
         """<formalParameters> →  <parameterList> | epsilon"""
-        if self.lookaheadToken()[0] == Lexeme.SYMBOL_CLOSE_PAREN:
+        if self.peek()[0] == Lexeme.SYMBOL_CLOSE_PAREN:
             return []
         return self.pParameterList()
 
     def pKeywordConstant(self):
-        """<keywordConstant> →  true | false | null | this"""
-        if self.matchNext(Lexeme.KW_TRUE):
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ExpressionConstant(self.lineNumber, (DataTypes.BOOLEAN_SCALAR, None), Lexeme.KW_TRUE)
-        elif self.matchNext(Lexeme.KW_FALSE):
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ExpressionConstant(self.lineNumber, (DataTypes.BOOLEAN_SCALAR, None), Lexeme.KW_FALSE)
-        elif self.matchNext(Lexeme.KW_NULL):
-            self.__lineNumber = self.__scanner.getLineNumber()
+        """<keywordConstant> →  true | false | null | this
+        The keyword is the current token."""
+        if self.match(Lexeme.KW_TRUE):
+            return PIR_ExpressionConstant(self.lineNumber, (DataTypes.BOOLEAN_SCALAR, None), True)
+        elif self.match(Lexeme.KW_FALSE):
+            return PIR_ExpressionConstant(self.lineNumber, (DataTypes.BOOLEAN_SCALAR, None), False)
+        elif self.match(Lexeme.KW_NULL):
             return PIR_ExpressionConstant(self.lineNumber, (DataTypes.VOID, None), None)
-        elif self.matchNext(Lexeme.KW_THIS):
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ExpressionConstant(self.lineNumber, (DataTypes.CLASS_SCALAR, None), Lexeme.KW_THIS)
+        elif self.match(Lexeme.KW_THIS, "Expected true, false, null or this"):
+            return PIR_ExpressionConstant(self.lineNumber, (DataTypes.CLASS_SCALAR, self.__class), Lexeme.KW_THIS)
 
     def pIfStatement(self):
         """<ifStatement> →  if ( <expression> ) { <statements> } <elseStatement>"""
-        # Consume if keyword
-        self.nextToken()
+        self.matchNext(Lexeme.KW_IF, "Expected if")
+        line = self.lineNumber
         self.matchNext(Lexeme.SYMBOL_OPEN_PAREN, "Expected a '('")
         expr = self.pExpression()
         self.matchNext(Lexeme.SYMBOL_CLOSE_PAREN, "Expected a ')'")
         self.matchNext(Lexeme.SYMBOL_OPEN_BRACE, "Expected a '{'")
         stmts = self.pStatements()
         self.matchNext(Lexeme.SYMBOL_CLOSE_BRACE, "Expected a '}'")
-        if self.lookaheadToken()[0] == Lexeme.KW_ELSE:
-            else_stmt = self.pElseStatement()
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_IfStatement(self.lineNumber, expr, stmts, else_stmt)
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_IfStatement(self.lineNumber, expr, stmts)
+        elseStmts = self.pElseStatement()
+        return PIR_IfStatement(line, expr, stmts, elseStmts)
 
     def pParameterList(self):
         """<parameterList> →  <type><varName><parameterList1>"""
-        params = []
         typ = self.pType()
         name = self.pVarName()
-        self.__lineNumber = self.__scanner.getLineNumber()
-        pirVarDec = PIR_VariableDeclaration(self.lineNumber, typ, name,
-                                            VariableScopes.PARAMETER)
-        params.append(pirVarDec)
-        params = params + self.pParameterList1()
-        return params
+        params = [PIR_VariableDeclaration(self.lineNumber, typ, name,
+                                          VariableScopes.PARAMETER)]
+        return params + self.pParameterList1()
 
     def pParameterList1(self):
-        """<parameterList1> →  <parameterList> | epsilon"""
-        if self.lookaheadToken()[0] == Lexeme.SYMBOL_CLOSE_PAREN:
-            self.nextToken()
+        """<parameterList1> →  , <parameterList> | epsilon"""
+        if self.peek()[0] != Lexeme.SYMBOL_COMMA:
             return []
-        self.matchNext(Lexeme.SYMBOL_COMMA, "Expected a ','")
+        self.nextToken()
         return self.pParameterList()
 
     def pReturnStatement(self):
         """<returnStatement> →  return <returnStatement1> ;"""
-        self.nextToken()
-        lk = self.lookaheadToken()[0]
-        if lk == Lexeme.SYMBOL_SEMICOLON:
-            self.nextToken()
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_ReturnStatement(self.lineNumber)
+        self.matchNext(Lexeme.KW_RETURN, "Expected return")
+        line = self.lineNumber
         expr = self.pReturnStatement1()
         self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_ReturnStatement(self.lineNumber, expr)
+        return PIR_ReturnStatement(line, expr)
 
     def pReturnStatement1(self):
         """<returnStatement1> →  <expression> | epsilon"""
-        expr = self.pExpression()
-        return expr
+        if self.peek()[0] == Lexeme.SYMBOL_SEMICOLON:
+            return None
+        return self.pExpression()
 
     def pStatement(self):
         """<statement> →  <assignmentStatement> | <ifStatement> |
                           <whileStatement> | <doStatement> |
                           <returnStatement>"""
-        lk = self.lookaheadToken()[0] if self.__lookahead is None else self.__lookahead[0][0]
+        lk = self.peek()[0]
         if lk == Lexeme.KW_IF:
             statement = self.pIfStatement()
         elif lk == Lexeme.KW_WHILE:
@@ -507,35 +515,25 @@ class Parser:
     def pStatements(self):
         """<statements> →  <statement>*"""
         statements = []
-        lk = self.lookaheadToken()[0] if self.__lookahead is None else self.__lookahead[0][0]
-        while lk != Lexeme.SYMBOL_CLOSE_BRACE:
-            statement = self.pStatement()
-            statements.append(statement)
-            lk = self.lookaheadToken()[0] if self.__lookahead is None else self.__lookahead[0][0]
+        while (1 << self.peek()[0]) & FIRST["statement"]:
+            statements.append(self.pStatement())
         return statements
 
     def pSubroutineBody(self):
         """<subroutineBody> →  <varDec>*<statements>"""
-        #TODO: if no variables
         vars = []
-        stmts = []
-        lk = self.lookaheadToken()[0]
-        while lk == Lexeme.KW_INT or lk == Lexeme.KW_CHAR or lk == Lexeme.KW_BOOLEAN or\
-              lk ==Lexeme.IDENTIFIER:
-            typ, names = self.pVarDec()
-            if names is None:
-                stmts.append(typ)
-                break
+        # a class-typed <varDec> and an <assignmentStatement> both start
+        # with an identifier; only a declaration has a second identifier
+        while (1 << self.peek()[0]) & FIRST["varDec"] and \
+                (self.peek()[0] != Lexeme.IDENTIFIER or
+                 self.peek(2)[0] == Lexeme.IDENTIFIER):
+            typ, line, names = self.pVarDec()
             for name in names:
-                self.__lineNumber = self.__scanner.getLineNumber()
-                var = PIR_VariableDeclaration(self.lineNumber, typ, name,
-                                              VariableScopes.LOCAL)
-                vars.append(var)
-            lk = self.lookaheadToken()[0]
-        stmts = stmts + self.pStatements()
-
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_SubroutineBody(self.lineNumber, vars, stmts)
+                vars.append(PIR_VariableDeclaration(line, typ, name,
+                                                    VariableScopes.LOCAL))
+        line = self.lineNumber
+        stmts = self.pStatements()
+        return PIR_SubroutineBody(line, vars, stmts)
 
     def pSubroutineDec(self):
         """
@@ -543,6 +541,7 @@ class Parser:
                 <subroutineName>  (<formalParameters>) { <subroutineBody> }
         """
         spec = self.pSubroutineSpecifier()
+        line = self.lineNumber
         typ = self.pSubroutineType()
         name = self.pSubroutineName()
         # parse parameter list
@@ -553,22 +552,20 @@ class Parser:
         self.matchNext(Lexeme.SYMBOL_OPEN_BRACE, "Expected a '{'")
         body = self.pSubroutineBody()
         self.matchNext(Lexeme.SYMBOL_CLOSE_BRACE, "Expected a '}'")
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_SubroutineDeclaration(self.lineNumber, spec, typ, name,
+        return PIR_SubroutineDeclaration(line, spec, typ, name,
                                          formal_params, body)
 
     def pSubroutineDecs(self):
         """<subroutineDec>*"""
         subroutines = []
-        while self.lookaheadToken()[0] != Lexeme.SYMBOL_CLOSE_BRACE:
+        while (1 << self.peek()[0]) & FIRST["subroutineDec"]:
             sub = self.pSubroutineDec()
             subroutines.append(sub)
         return subroutines
 
     def pSubroutineName(self):
         """<subroutineName> →  identifier"""
-        #TODO: Error message
-        self.matchNext(Lexeme.IDENTIFIER, "")
+        self.matchNext(Lexeme.IDENTIFIER, "Expected a subroutine name")
         return self.token[1]
 
     def pSubroutineSpecifier(self):
@@ -577,106 +574,78 @@ class Parser:
             return SubroutineSpecifiers.CONSTRUCTOR
         elif self.match(Lexeme.KW_FUNCTION):
             return SubroutineSpecifiers.FUNCTION
-        elif self.match(Lexeme.KW_METHOD):
+        elif self.match(Lexeme.KW_METHOD, "Expected constructor, function or method"):
             return SubroutineSpecifiers.METHOD
 
     def pSubroutineType(self):
         """<subroutineType> →  void | <type>"""
-        if self.lookaheadToken()[0] == (Lexeme.KW_VOID):
+        if self.peek()[0] == Lexeme.KW_VOID:
             self.nextToken()
             return (DataTypes.VOID, None)
-        return self.pType
+        return self.pType()
 
     def pType(self):
         """<type> →  int | char | boolean | int[] | char[] | boolean[] | <className>"""
         if self.matchNext(Lexeme.IDENTIFIER):
-            return (DataTypes.CLASS_SCALAR, None)
+            return (DataTypes.CLASS_SCALAR, self.token[1])
         elif self.match(Lexeme.KW_INT):
-            if self.lookaheadToken()[0] == Lexeme.SYMBOL_OPEN_BRACE:
-                self.nextToken()
-                self.nextToken()
-                return (DataTypes.INT_ARRAY, None)
-            return (DataTypes.INT_SCALAR, None)
+            scalar, array = DataTypes.INT_SCALAR, DataTypes.INT_ARRAY
         elif self.match(Lexeme.KW_CHAR):
-            if self.lookaheadToken()[0] == Lexeme.SYMBOL_OPEN_BRACE:
-                self.nextToken()
-                self.nextToken()
-                return (DataTypes.CHAR_ARRAY, None)
-            return (DataTypes.CHAR_SCALAR, None)
-        elif self.match(Lexeme.KW_BOOLEAN):
-            if self.lookaheadToken()[0] == Lexeme.SYMBOL_OPEN_BRACE:
-                self.nextToken()
-                self.nextToken()
-                return (DataTypes.BOOLEAN_ARRAY, None)
-            return (DataTypes.BOOLEAN_SCALAR, None)
+            scalar, array = DataTypes.CHAR_SCALAR, DataTypes.CHAR_ARRAY
+        elif self.match(Lexeme.KW_BOOLEAN, "Expected a type"):
+            scalar, array = DataTypes.BOOLEAN_SCALAR, DataTypes.BOOLEAN_ARRAY
+        if self.peek()[0] == Lexeme.SYMBOL_OPEN_BRACKET:
+            self.nextToken()
+            self.matchNext(Lexeme.SYMBOL_CLOSE_BRACKET, "Expected a ']'")
+            return (array, None)
+        return (scalar, None)
 
     def pVarArray(self):
         """<varArray> →  [ <expression> ] | epsilon"""
-        if self.lookaheadToken()[0] == Lexeme.SYMBOL_EQUAL:
+        if self.peek()[0] != Lexeme.SYMBOL_OPEN_BRACKET:
             return None
-        self.matchNext(Lexeme.SYMBOL_OPEN_BRACKET, "Expected a '['")
+        self.nextToken()
         expr = self.pExpression()
         self.matchNext(Lexeme.SYMBOL_CLOSE_BRACKET, "Expected a ']'")
         return expr
 
     def pVarDec(self):
-        """<varDec> →  <type><varList>"""
+        """<varDec> →  <type><varList> ;
+        Returns the (type, line number, list of names) triple."""
         typ = self.pType()
-        lk = self.lookaheadToken()[0] if self.__lookahead is None else self.__lookahead[0][0]
-        if lk == Lexeme.SYMBOL_EQUAL:
-            name = self.token[1]
-            self.matchNext(Lexeme.SYMBOL_EQUAL)
-            expr = self.pExpression()
-            self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_AssignmentStatement(self.lineNumber, name, None, expr), None
-        elif lk == Lexeme.SYMBOL_OPEN_BRACE:
-            self.nextToken()
-            array_expr = self.pVarArray()
-            self.matchNext(Lexeme.SYMBOL_EQUAL, "Expected a '='")
-            expr = self.pExpression()
-            self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-            self.__lineNumber = self.__scanner.getLineNumber()
-            return PIR_AssignmentStatement(self.lineNumber, variable, array_expr, expr), None
+        line = self.lineNumber
         varNames = self.pVarList()
         self.matchNext(Lexeme.SYMBOL_SEMICOLON, "Expected a ';'")
-        return typ, varNames
+        return typ, line, varNames
 
     def pVarList(self):
         """<varList> →  <varName><varList1>"""
-        varList = []
-        if self.matchNext(Lexeme.IDENTIFIER):
-            varList.append(self.token[1])
-        #TODO: raise parser error is not an identifier
-        varList = varList + self.pVarList1()
-        return varList
+        varList = [self.pVarName()]
+        return varList + self.pVarList1()
 
     def pVarList1(self):
-        """<varList1> →  <varList> | epsilon"""
-        varList = []
-        if self.lookaheadToken()[0] == Lexeme.SYMBOL_SEMICOLON:
+        """<varList1> →  , <varList> | epsilon"""
+        if self.peek()[0] != Lexeme.SYMBOL_COMMA:
             return []
-        self.matchNext(Lexeme.SYMBOL_COMMA, "Expected a ','")
+        self.nextToken()
         return self.pVarList()
 
     def pVarName(self):
         """<varName> →  identifier"""
-        #TODO: err message
-        self.matchNext(Lexeme.IDENTIFIER, "")
+        self.matchNext(Lexeme.IDENTIFIER, "Expected a variable name")
         return self.token[1]
 
     def pWhileStatement(self):
         """<whileStatement> →  while ( <expression> ) { <statements> }"""
-        # Consume keyword while
-        self.nextToken()
+        self.matchNext(Lexeme.KW_WHILE, "Expected while")
+        line = self.lineNumber
         self.matchNext(Lexeme.SYMBOL_OPEN_PAREN, "Expected a '('")
         expr = self.pExpression()
         self.matchNext(Lexeme.SYMBOL_CLOSE_PAREN, "Expected a ')'")
         self.matchNext(Lexeme.SYMBOL_OPEN_BRACE, "Expected a '{'")
         stmts = self.pStatements()
         self.matchNext(Lexeme.SYMBOL_CLOSE_BRACE, "Expected a '}'")
-        self.__lineNumber = self.__scanner.getLineNumber()
-        return PIR_WhileStatement(self.lineNumber, expr, stmts)
+        return PIR_WhileStatement(line, expr, stmts)
 
 if __name__ == "__main__":
     import io
@@ -731,19 +700,19 @@ if __name__ == "__main__":
     implement the rules for expressions, if you wish
     """
     # TODO: Change path names back (take out Parser/CS420_Homework_4/)
-    tester("Parser/CS420_Homework_4/ParserTests/ExpressionlessSquare/Main.eck")
-    #tester("Parser/CS420_Homework_4/ParserTests/ExpressionlessSquare/Square.eck")
-    #tester("Parser/CS420_Homework_4/ParserTests/ExpressionlessSquare/SquareGame.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/ExpressionLessSquare/Main.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/ExpressionLessSquare/Square.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/ExpressionLessSquare/SquareGame.eck")
 
     """
     These files test expressions
     """
-    #tester("Parser/CS420_Homework_4/ParserTests/ExpressionTests.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/ExpressionTests.eck")
 
     """
     These files require the full parser to be implemented
     """
-    #tester("Parser/CS420_Homework_4/ParserTests/Square/Main.eck")
-    #tester("Parser/CS420_Homework_4/ParserTests/Square/Square.eck")
-    #tester("Parser/CS420_Homework_4/ParserTests/Square/SquareGame.eck")
-    #tester("Parser/CS420_Homework_4/ParserTests/ArrayTests.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/Square/Main.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/Square/Square.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/Square/SquareGame.eck")
+    tester("Parser/CS420_Homework_4/ParserTests/ArrayTests.eck")
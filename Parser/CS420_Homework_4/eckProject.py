@@ -0,0 +1,113 @@
+"""
+Project-level parse driver for the Eck Compiler
+CS420, Spring 2025
+
+An Eck program is a directory of classes, one per .eck file.  This file
+parses all the classes of a program, spreading the files over a pool of
+worker processes, and collects the trees by class name.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from eckParser import Parser, ParserError
+from scanner import ScannerError
+
+
+class ProjectError(Exception):
+    """Custom error class for a program whose files did not all parse.
+    value is the list of "filename: message" strings for the files that
+    failed, and classes holds the trees of the files that parsed."""
+
+    def __init__(self, value, classes):
+        self.value = value
+        self.classes = classes
+
+    # __str__ is to print() the value
+    def __str__(self):
+        return (repr(self.value))
+
+
+def parseFile(filename):
+    """Parses one file in a worker process.  Returns the (filename,
+    PIR_Class or None, error message or None) triple."""
+    try:
+        return filename, Parser().parse(filename), None
+    except (ParserError, ScannerError) as err:
+        return filename, None, err.value
+    except OSError as err:
+        return filename, None, str(err)
+
+
+def projectFiles(paths):
+    """Returns the .eck files named by paths, a directory, a filename or
+    a list of them.  A directory contributes the .eck files directly in
+    it, in name order."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name)
+                         for name in sorted(os.listdir(path))
+                         if name.endswith(".eck"))
+        else:
+            files.append(path)
+    return files
+
+
+def parseProject(paths, workers=None, chunkSize=None):
+    """Parses every class of an Eck program.
+    Inputs:
+        paths       A directory, a filename, or a list of them
+        workers     Optional; number of worker processes, by default one
+                    per core.  1 parses the files in this process.
+        chunkSize   Optional; number of files handed to a worker at a
+                    time, by default enough for about four chunks per
+                    worker
+    Returns:
+        A dict mapping each class name to its PIR_Class.  If any file
+        does not parse, or two files declare the same class, a
+        ProjectError listing every such file is raised instead.
+    """
+    files = projectFiles(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(files)))
+    if workers == 1:
+        results = map(parseFile, files)
+    else:
+        if chunkSize is None:
+            chunkSize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(parseFile, files, chunksize=chunkSize))
+
+    classes = {}
+    sources = {}    # class name -> file declaring it
+    errors = []
+    for filename, pirClass, error in results:
+        if error is not None:
+            errors.append(f"{filename}: {error}")
+        elif pirClass.name in classes:
+            errors.append(f"{filename}: Line {pirClass.lineNumber}: class "
+                          f"{pirClass.name} is also declared in "
+                          f"{sources[pirClass.name]}")
+        else:
+            classes[pirClass.name] = pirClass
+            sources[pirClass.name] = filename
+    if errors:
+        raise ProjectError(errors, classes)
+    return classes
+
+
+if __name__ == "__main__":
+    import sys
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[1:] or [os.path.join(here, "ParserTests", "Square")]
+    try:
+        for name, pirClass in parseProject(paths).items():
+            print(f"{name}: {len(pirClass.subroutines)} subroutines")
+    except ProjectError as err:
+        for error in err.value:
+            print(error)
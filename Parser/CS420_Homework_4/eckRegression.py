@@ -0,0 +1,195 @@
+"""
+Golden-file regression runner for the Eck compiler front end
+CS420, Spring 2025
+
+This file finds every .eck test program that has an .answer file next to
+it in the scanner and parser test directories, runs the scanner or the
+parser on it, and compares the output with the answer in memory.  Each
+scanner test directory is run against the scanner.py of the homework it
+belongs to, loaded together with that homework's lexeme.py so that the
+scanners do not share modules.  The cases run concurrently in a pool of
+worker processes.  Run it as a script
+to print a pass/fail line with the time taken for every case, followed by
+a summary:
+
+    python eckRegression.py [workers]
+"""
+
+import glob
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from eckParser import Parser, ParserError
+from pirPrinter import PIR_Printer
+from scanner import ScannerError
+
+# directory holding this module; test directories are located relative to it
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (kind of test, directory of golden files, directory of the scanner.py that
+# runs them) for every directory of golden files.  HW1/ScannerTests is left
+# out: HW1/scanner.py is the unfinished assignment skeleton.
+TEST_DIRECTORIES = [
+    ("scanner", os.path.join(HERE, "..", "..", "Scanner", "ScannerTests"),
+     os.path.join(HERE, "..", "..", "Scanner")),
+    ("parser", os.path.join(HERE, "ParserTests"), HERE),
+]
+
+# scanner modules loaded by loadScanner, keyed by source directory
+SCANNERS = {}
+
+
+def discoverCases(directories=TEST_DIRECTORIES):
+    """Returns the (kind, .eck path, .answer path, source directory)
+    tuple of every test program with an answer file, searching the
+    directories recursively."""
+    cases = []
+    for kind, directory, source in directories:
+        source = os.path.normpath(source)
+        pattern = os.path.join(os.path.normpath(directory), "**", "*.eck")
+        for filename in sorted(glob.glob(pattern, recursive=True)):
+            answer = os.path.splitext(filename)[0] + ".answer"
+            if os.path.exists(answer):
+                cases.append((kind, filename, answer, source))
+    return cases
+
+
+def loadScanner(directory):
+    """Returns the scanner module in the directory, imported under a name
+    of its own along with the lexeme module beside it.  The module named
+    lexeme in sys.modules is left as it was."""
+    if directory in SCANNERS:
+        return SCANNERS[directory]
+    prefix = f"eckRegression_{len(SCANNERS)}_"
+    saved = sys.modules.get("lexeme")
+    try:
+        modules = {}
+        for name in ("lexeme", "scanner"):
+            spec = importlib.util.spec_from_file_location(
+                prefix + name, os.path.join(directory, name + ".py"))
+            modules[name] = importlib.util.module_from_spec(spec)
+            # the scanner's "from lexeme import ..." finds its own lexeme
+            sys.modules[name if name == "lexeme" else spec.name] = modules[name]
+            spec.loader.exec_module(modules[name])
+    finally:
+        if saved is None:
+            sys.modules.pop("lexeme", None)
+        else:
+            sys.modules["lexeme"] = saved
+    SCANNERS[directory] = modules["scanner"]
+    return modules["scanner"]
+
+
+def scanText(filename, directory=HERE):
+    """Returns the text the scanner tests expect for a file: one line per
+    lexeme, with the category and value if there is one, and the message
+    of every scanner error.  The file is scanned with the scanner.py in
+    the directory."""
+    module = loadScanner(os.path.normpath(directory))
+    lines = []
+    scanner = module.Scanner(filename)
+    while True:
+        try:
+            category, value = scanner.nextLexeme()
+        except module.ScannerError as err:
+            lines.append(err.value + "\n")
+            continue
+        if value is None:
+            lines.append(f"{category}\n")
+        else:
+            lines.append(f"{category}, {value}\n")
+        if category == module.Lexeme.EOF:
+            return "".join(lines)
+
+
+def compareScan(filename, answer, directory=HERE):
+    """Returns None if scanning the file with the scanner.py in the
+    directory gives the answer text, and otherwise a description of the
+    first difference."""
+    expected = answer.splitlines()
+    actual = scanText(filename, directory).splitlines()
+    return firstDifference(actual, expected, lambda line: line)
+
+
+def compareParse(filename, answer):
+    """Returns None if the printed tree for the file matches the answer
+    text, ignoring the 3-digit line number that starts each line, and
+    otherwise a description of the first difference."""
+    try:
+        pirClass = Parser().parse(filename)
+    except (ParserError, ScannerError) as err:
+        return err.value
+    actual = [line.rstrip("\n") for line in PIR_Printer().lines(pirClass)]
+    return firstDifference(actual, answer.splitlines(), lambda line: line[3:])
+
+
+def firstDifference(actual, expected, key):
+    """Compares two lists of output lines after applying key to each.
+    Returns None if they agree, and otherwise a description of the first
+    line that differs."""
+    for number, (line, answer) in enumerate(zip(actual, expected), 1):
+        if key(line) != key(answer):
+            return f"line {number}: got {line!r}, expected {answer!r}"
+    if len(actual) != len(expected):
+        return f"got {len(actual)} lines, expected {len(expected)}"
+    return None
+
+
+def runCase(case):
+    """Runs one (kind, .eck path, .answer path, source directory) case.
+    Returns the (case, description of the failure or None, seconds)
+    triple."""
+    kind, filename, answerFilename, source = case
+    start = time.perf_counter()
+    with open(answerFilename, "r") as answerFile:
+        answer = answerFile.read()
+    try:
+        if kind == "scanner":
+            failure = compareScan(filename, answer, source)
+        else:
+            failure = compareParse(filename, answer)
+    except Exception as err:
+        failure = f"{type(err).__name__}: {err}"
+    return case, failure, time.perf_counter() - start
+
+
+def runCases(cases, workers=None):
+    """Runs the cases concurrently in worker processes, one per core by
+    default; 1 runs them in this process.  Returns the list of runCase
+    results in the order of the cases."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(cases)))
+    if workers == 1:
+        return [runCase(case) for case in cases]
+    chunkSize = max(1, len(cases) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(runCase, cases, chunksize=chunkSize))
+
+
+def report(results, seconds):
+    """Prints a line for every case and a summary.  Returns the number of
+    failed cases."""
+    failed = 0
+    for (kind, filename, _, _), failure, caseSeconds in results:
+        name = os.path.relpath(filename)
+        if failure is None:
+            print(f"pass  {caseSeconds * 1000:8.2f} ms  {kind:<7}  {name}")
+        else:
+            failed += 1
+            print(f"FAIL  {caseSeconds * 1000:8.2f} ms  {kind:<7}  {name}: {failure}")
+    total = sum(caseSeconds for _, _, caseSeconds in results)
+    print(f"{len(results) - failed} passed, {failed} failed in {seconds:.3f} s "
+          f"({total:.3f} s of case time)")
+    return failed
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    start = time.perf_counter()
+    results = runCases(discoverCases(), workers)
+    failed = report(results, time.perf_counter() - start)
+    sys.exit(1 if failed else 0)
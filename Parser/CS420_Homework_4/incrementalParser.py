@@ -0,0 +1,478 @@
+"""
+Incremental re-scanning and re-parsing of Eck source text
+CS420, Spring 2025
+
+This file defines a parser for a class that is being edited, as in an
+editor that checks the file on every keystroke.  It keeps the text, its
+tokens and its PIR tree, and applies each edit, a range of the text and
+its replacement, by redoing as little work as possible:
+
+  * Only the tokens around the edit are scanned again.  Scanning restarts
+    at the end of the last token the edit cannot have changed and stops at
+    the first new token that begins past the edit at the position where an
+    old token began; from there on the old and new tokens are the same.
+  * When the changed tokens all lie inside one subroutine declaration,
+    only that PIR_SubroutineDeclaration is parsed again, and the trees of
+    the other subroutines are reused, their line numbers shifted by the
+    number of lines the edit added or removed.  Any other edit parses the
+    whole class again from the tokens, without scanning.
+
+Tokens are scanned with the master pattern of the Scanner's regex engine
+and have the line numbers the Scanner would report, so the tree is always
+the one Parser.parse returns for the edited text.  Tokens are kept in a
+list with a gap at the last edit: those before it hold their position and
+line number, and those after it hold them relative to the end of the text,
+so an edit does not have to renumber the tokens after it.  The token
+ranges of the subroutines are kept the same way.
+"""
+
+from eckParser import Parser, ParserError
+from lexeme import Lexeme, LexemeMap
+from pirSerializer import nodeFields
+from scanner import TOKEN, ScannerError
+
+# fields of a token tuple; the kind of a lexical error is None and its
+# value is the error message
+KIND, VALUE, START, LENGTH, LINE = range(5)
+
+# lexemes that begin a subroutine declaration and nothing else
+SPECIFIERS = (Lexeme.KW_CONSTRUCTOR, Lexeme.KW_FUNCTION, Lexeme.KW_METHOD)
+
+# attribute names of each PIR class besides lineNumber
+NODE_FIELDS = {}
+
+
+def lexText(text, cursor, line):
+    """Generates the tokens of text after a point, up to and including EOF,
+    as (kind, value, start, length, line) tuples.
+    Inputs:
+        text    The whole source text
+        cursor  Position of the end of the previous token, or -1 at the
+                start of the text
+        line    Line number of the previous token, or 1 at the start
+    """
+    pos = max(cursor, 0)
+    while True:
+        match = TOKEN.match(text, pos)
+        kind = match.lastgroup
+        end = match.end()
+        start = match.start(kind)
+        value = None
+        if kind == "word":
+            word = match.group(kind)
+            category = LexemeMap.keywords.get(word)
+            if category is None:
+                category = Lexeme.IDENTIFIER
+                value = word
+        elif kind == "symbol":
+            category = LexemeMap.symbols[match.group(kind)]
+        elif kind == "zero":
+            category = Lexeme.INTEGER_CONST
+            value = 0
+        elif kind == "integer":
+            value = int(match.group(kind))
+            if value > 32767:
+                category = None
+                value = "Integer too large"
+            else:
+                category = Lexeme.INTEGER_CONST
+        elif kind == "string":
+            category = Lexeme.STRING_CONST
+            value = match.group(kind)
+            start -= 1
+        elif kind == "eof":
+            category = Lexeme.EOF
+        elif kind == "openComment":
+            category = None
+            value = "end-of-file encountered in a multi-line comment"
+            end = len(text)
+        elif kind == "openString":
+            category = None
+            value = "end-of-file encountered in a string constant"
+            end = len(text)
+        else:
+            category = None
+            value = f"illegal character '{match.group(kind)}'"
+        # the Scanner counts the newlines up to the character after a lexeme
+        line += text.count("\n", cursor + 1, end + 1)
+        yield (category, value, start, end - start, line)
+        if category == Lexeme.EOF:
+            return
+        cursor = pos = end
+
+
+def shiftLines(node, delta):
+    """Adds delta to the line number of every node of a PIR tree."""
+    stack = [node]
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        node = pop()
+        fields = NODE_FIELDS.get(type(node))
+        if fields is None:
+            fields = NODE_FIELDS[type(node)] = nodeFields(type(node))
+        try:
+            node.lineNumber += delta
+        except AttributeError:
+            pass
+        for name in fields:
+            value = getattr(node, name)
+            # the lists of a PIR tree hold nothing but nodes
+            if type(value) is list:
+                extend(value)
+            elif hasattr(value, "__slots__"):
+                push(value)
+
+
+class TokenStream:
+    """
+    Delivers a sequence of token tuples, followed by EOF, through the
+    nextLexeme() and getLineNumber() methods of a Scanner, so a Parser can
+    parse them with parseFrom().
+    """
+
+    def __init__(self, tokens):
+        """tokens      An iterable of (kind, value, start, length, line)
+                    tuples with absolute positions and line numbers"""
+        self.__lineNumber = 1
+        self.__tokens = iter(tokens)
+
+    def getLineNumber(self):
+        return self.__lineNumber
+
+    def nextLexeme(self):
+        """Returns the next token as a (category, value) pair, raising a
+        ScannerError for a lexical error."""
+        token = next(self.__tokens, None)
+        if token is None:
+            return (Lexeme.EOF, None)
+        self.__lineNumber = token[LINE]
+        if token[KIND] is None:
+            raise ScannerError(f"Line {self.__lineNumber}: {token[VALUE]}")
+        return (token[KIND], token[VALUE])
+
+
+class IncrementalParser:
+    """
+    Parser for source text that is edited in place.  parseText() or
+    parse() parses a whole class; each edit() then returns the tree for the
+    edited text, which is the tree Parser.parse would build for it.  The
+    tree is updated in place, so references to it stay current.
+
+    After each call, relexed holds the number of tokens scanned and
+    reparsed names what was parsed: "class", "subroutine" or "nothing".
+    """
+
+    def __init__(self):
+        self.relexed = 0          # tokens scanned by the last call
+        self.reparsed = None      # what the last call parsed
+        self.text = ""            # the source text
+        self.tree = None          # PIR_Class for text, or None if it has errors
+        self.__broken = set()     # indexes of subroutines with errors
+        self.__class = None       # PIR_Class of the last text that parsed,
+                                  # with the subroutines parsed since
+        self.__gap = 0            # index of the first token stored relative to the end
+        self.__newlines = 0       # newlines in text
+        self.__rangeGap = 0       # index of the first range stored relative to the end
+        self.__ranges = None      # [first, last) token indexes of each subroutine
+        self.__tokens = []        # token tuples
+
+    def edit(self, start, end, replacement):
+        """Replaces text[start:end] with the replacement string.
+        Returns the tree for the new text; a ParserError or ScannerError is
+        raised, as by Parser.parse, if the new text does not parse."""
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f"edit range {start}:{end} is outside the text")
+        tokens = self.__tokens
+        # scan again from the end of the last token the edit cannot change;
+        # the line number of a token depends on the character after it
+        first = self.__findToken(start)
+        self.__moveGap(first)
+        # the tokens after the gap move with the end of the text
+        lineDelta = replacement.count("\n") - self.text.count("\n", start, end)
+        self.text = self.text[:start] + replacement + self.text[end:]
+        self.__newlines += lineDelta
+        length = len(self.text)
+        if first:
+            cursor = tokens[first - 1][START] + tokens[first - 1][LENGTH]
+            line = tokens[first - 1][LINE]
+        else:
+            cursor, line = -1, 1
+        editEnd = start + len(replacement)
+        old = first
+        count = len(tokens)
+        new = []
+        for token in lexText(self.text, cursor, line):
+            # skip the old tokens that began before this one
+            while old < count and tokens[old][START] + length < token[START]:
+                old += 1
+            if token[START] >= editEnd and old < count and \
+                    tokens[old][START] + length == token[START]:
+                break
+            new.append(token)
+        else:
+            old = count
+        self.relexed = len(new)
+
+        if self.__ranges is None:
+            tokens[first:old] = new
+            self.__gap = first + len(new)
+            return self.__parseAll()
+        index = None
+        if new or first != old or lineDelta:
+            # the subroutine holding the first changed token, found before
+            # the token count changes
+            index = self.__findSubroutine(first)
+            if index is not None and old > self.__range(index)[1]:
+                index = None
+            if index is not None:
+                self.__moveRangeGap(index + 1)
+        tokens[first:old] = new
+        self.__gap = first + len(new)
+        if index is None and (new or first != old or lineDelta):
+            return self.__parseAll()
+        if index is not None:
+            # the ranges after the gap move with the end of the tokens
+            self.__ranges[index][1] += len(new) - (old - first)
+            if lineDelta:
+                for subroutine in self.__class.subroutines[index + 1:]:
+                    shiftLines(subroutine, lineDelta)
+            self.reparsed = "subroutine"
+            if not self.__parseSubroutine(index):
+                return self.__parseAll()
+        else:
+            self.reparsed = "nothing"
+        if self.__broken:
+            # the first subroutine in error holds the class's first error
+            self.tree = None
+            if not self.__parseSubroutine(min(self.__broken), raiseError=True):
+                return self.__parseAll()
+        self.tree = self.__class
+        return self.tree
+
+    def offset(self, line, column):
+        """Returns the text position of a column, counted from 0, of a line,
+        counted from 1."""
+        pos = 0
+        for _ in range(line - 1):
+            pos = self.text.index("\n", pos) + 1
+        return pos + column
+
+    def parse(self, filename):
+        """Parse the specified file.  Returns a PIR abstract syntax tree."""
+        with open(filename, "r") as inFile:
+            return self.parseText(inFile.read())
+
+    def parseText(self, text):
+        """Scans and parses a whole class.  Returns the PIR tree; a
+        ParserError or ScannerError is raised if the text does not parse."""
+        self.text = text
+        self.__newlines = text.count("\n")
+        self.__tokens = list(lexText(text, -1, 1))
+        self.__gap = len(self.__tokens)
+        self.relexed = len(self.__tokens)
+        return self.__parseAll()
+
+    def tokens(self):
+        """Generates every token as a (kind, value, start, length, line)
+        tuple."""
+        return self.__absolute(0, len(self.__tokens))
+
+    def __absolute(self, first, last):
+        """Generates tokens[first:last] with their absolute positions and
+        line numbers."""
+        tokens = self.__tokens
+        gap = self.__gap
+        length = len(self.text)
+        newlines = self.__newlines
+        for index in range(first, last):
+            token = tokens[index]
+            if index < gap:
+                yield token
+            else:
+                yield (token[KIND], token[VALUE], token[START] + length,
+                       token[LENGTH], token[LINE] + newlines)
+
+    def __range(self, index):
+        """Returns the [first, last) token indexes of a subroutine."""
+        first, last = self.__ranges[index]
+        if index >= self.__rangeGap:
+            count = len(self.__tokens)
+            return first + count, last + count
+        return first, last
+
+    def __token(self, index):
+        """Returns token index with its absolute position and line number."""
+        return next(self.__absolute(index, index + 1))
+
+    def __findToken(self, offset):
+        """Returns the index of the first token that ends at or after a
+        text position."""
+        tokens = self.__tokens
+        gap = self.__gap
+        length = len(self.text)
+        low, high = 0, len(tokens)
+        while low < high:
+            middle = (low + high) // 2
+            token = tokens[middle]
+            start = token[START] if middle < gap else token[START] + length
+            if start + token[LENGTH] >= offset:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def __findSubroutine(self, index):
+        """Returns the index of the subroutine whose tokens hold a token
+        index, or None if no subroutine holds it."""
+        low, high = 0, len(self.__ranges)
+        while low < high:
+            middle = (low + high) // 2
+            if self.__range(middle)[1] <= index:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.__ranges) and self.__range(low)[0] <= index:
+            return low
+        return None
+
+    def __moveGap(self, index):
+        """Moves the gap to a token index, so the tokens before it hold
+        absolute positions and line numbers and the rest hold them relative
+        to the end of the text."""
+        tokens = self.__tokens
+        length = len(self.text)
+        newlines = self.__newlines
+        for i in range(index, self.__gap):
+            kind, value, start, size, line = tokens[i]
+            tokens[i] = (kind, value, start - length, size, line - newlines)
+        for i in range(self.__gap, index):
+            kind, value, start, size, line = tokens[i]
+            tokens[i] = (kind, value, start + length, size, line + newlines)
+        self.__gap = index
+
+    def __moveRangeGap(self, index):
+        """Moves the gap in the subroutine ranges to a subroutine index, so
+        the ranges before it hold token indexes and the rest hold them
+        relative to the number of tokens."""
+        count = len(self.__tokens)
+        ranges = self.__ranges
+        for i in range(index, self.__rangeGap):
+            ranges[i][0] -= count
+            ranges[i][1] -= count
+        for i in range(self.__rangeGap, index):
+            ranges[i][0] += count
+            ranges[i][1] += count
+        self.__rangeGap = index
+
+    def __parseAll(self):
+        """Parses the whole class from the tokens and finds the tokens of
+        each subroutine.  Returns the tree."""
+        self.reparsed = "class"
+        self.tree = None
+        self.__broken.clear()
+        self.__class = None
+        self.__ranges = None
+        parser = Parser()
+        self.tree = self.__class = parser.parseFrom(TokenStream(self.tokens()))
+        if parser.peek()[0] != Lexeme.EOF:
+            # text after the class; every edit parses the whole class
+            return self.tree
+        starts = [index for index, token in enumerate(self.__tokens)
+                  if token[KIND] in SPECIFIERS]
+        if len(starts) == len(self.tree.subroutines):
+            # the last subroutine ends at the class's closing brace, the
+            # token before EOF
+            ends = starts[1:] + [len(self.__tokens) - 2]
+            self.__ranges = [[first, last] for first, last in zip(starts, ends)]
+            self.__rangeGap = len(self.__ranges)
+        return self.tree
+
+    def __parseSubroutine(self, index, raiseError=False):
+        """Parses the tokens of one subroutine into its place in the class.
+        A subroutine with an error is added to the broken set, and the
+        error is raised if raiseError is True.  Returns False if the tokens
+        do not hold exactly one subroutine declaration, or the error is
+        found at their end, where the class as a whole may go on
+        differently; only parsing the whole class can tell then."""
+        first, last = self.__range(index)
+        if first == last or self.__token(first)[KIND] not in SPECIFIERS:
+            # the class's list of subroutines ends before these tokens
+            return False
+        # the parser starts on the token before the declaration
+        parser = Parser()
+        try:
+            subroutine = parser.parseFrom(TokenStream(self.__absolute(first - 1, last)),
+                                          "pSubroutineDec", self.__class.name)
+        except (ParserError, ScannerError):
+            if parser.token[0] == Lexeme.EOF:
+                return False
+            self.__broken.add(index)
+            if raiseError:
+                raise
+            return True
+        if parser.peek()[0] != Lexeme.EOF:
+            return False
+        self.__class.subroutines[index] = subroutine
+        self.__broken.discard(index)
+        return True
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import sys
+    import tempfile
+    import time
+    from pirPrinter import PIR_Printer
+
+    # replacement strings for the random edits
+    SNIPPETS = ["", " ", "\n", "x", "1", "99999", ";", "(", ")", "{", "}", "/*",
+                "*/", "//", '"', "%", "\n\n", "return;", " + y", "if (x) { }",
+                "method void g() { return; }\n"]
+
+    def outcome(function, *args):
+        """Returns the printed tree a parse returns, or its error message."""
+        try:
+            return PIR_Printer().render(function(*args))
+        except (ParserError, ScannerError) as err:
+            return err.value
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    files = sys.argv[1:]
+    for root, _, names in sorted(os.walk(os.path.join(here, "ParserTests"))):
+        files.extend(os.path.join(root, name) for name in sorted(names)
+                     if name.endswith(".eck"))
+    rng = random.Random(420)
+    with tempfile.TemporaryDirectory() as workDir:
+        scratch = os.path.join(workDir, "edited.eck")
+        for filename in files:
+            incremental = IncrementalParser()
+            if outcome(incremental.parse, filename) != outcome(Parser().parse, filename):
+                print(f"{filename}: parses differently")
+            edits = mismatches = 0
+            kinds = {}
+            seconds = 0.0
+            for _ in range(300):
+                text = incremental.text
+                start = rng.randrange(len(text) + 1)
+                end = min(len(text), start + rng.choice((0, 0, 1, 3, 20)))
+                replacement = rng.choice(SNIPPETS)
+                begin = time.perf_counter()
+                result = outcome(incremental.edit, start, end, replacement)
+                seconds += time.perf_counter() - begin
+                kinds[incremental.reparsed] = kinds.get(incremental.reparsed, 0) + 1
+                with open(scratch, "w") as outFile:
+                    outFile.write(incremental.text)
+                edits += 1
+                if result != outcome(Parser().parse, scratch):
+                    mismatches += 1
+                    print(f"{filename}: edit {start}:{end} {replacement!r} "
+                          f"differs from a full parse")
+                # undo the edit now and then so the text stays mostly valid
+                if rng.random() < 0.8:
+                    outcome(incremental.edit, start, start + len(replacement),
+                            text[start:end])
+            print(f"{os.path.relpath(filename, here)}: {edits} edits, {mismatches} "
+                  f"mismatches, {seconds / edits * 1e6:.0f} us/edit, {kinds}")
@@ -7,17 +7,21 @@ This module contains an enumerated type for the different lexemes
 created by the Eck tokenizer.
 """
 
-from enum import Enum, unique, auto
+from enum import Enum, IntEnum, unique, auto
 
 """
 The Lexeme enumerated type provides a symbolic constant for each of the
 possible lexeme categories in Eck.  The lexical description of Eck
 has been augmented to include the lexeme EOF to signify the end-of-file.
+
+The constants are small ints, so comparing two lexemes is an int
+comparison and a set of lexemes can be held in an int bitmask (see
+lexemeMask).  They still print as Lexeme.NAME, like plain Enum constants.
 """
 
 
 @unique
-class Lexeme(Enum):
+class Lexeme(IntEnum):
     EOF = auto()
     INTEGER_CONST = auto()
     STRING_CONST = auto()
@@ -61,6 +65,19 @@ class Lexeme(Enum):
     SYMBOL_EQUAL = auto()
     SYMBOL_NEGATE = auto()
 
+    # print as Lexeme.NAME rather than as the int value
+    __str__ = Enum.__str__
+    __format__ = Enum.__format__
+
+
+def lexemeMask(*lexemes):
+    """Returns an int with bit number lexeme set for each of the lexemes.
+    A lexeme lk is in the set when (1 << lk) & mask is nonzero."""
+    mask = 0
+    for lexeme in lexemes:
+        mask |= 1 << lexeme
+    return mask
+
 
 """
 The Eck scanner lumps keywords and identifiers together into a single
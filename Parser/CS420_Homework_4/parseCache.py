@@ -0,0 +1,200 @@
+"""
+On-disk cache of parse results for the Eck Compiler
+CS420, Spring 2025
+
+This file defines a cache that sits in front of Parser.parse.  A parse
+result is stored in a cache directory as a serialized PIR tree (see
+pirSerializer), under a key that hashes the source file's bytes together
+with a tag naming the parser and serialization format versions.  A file
+whose contents have not changed since it was last parsed is loaded from
+the cache without being scanned or parsed.
+
+Entries are written to a temporary file and renamed into place, so any
+number of processes can share one cache directory.  When the directory
+grows past its size limit, the least recently used entries are removed.
+The size of the directory is found by scanning it when the cache is opened
+and is then kept up to date as entries are stored, so the directory is
+only scanned again when it may have outgrown its limit.  Entries stored by
+other processes are counted at the next scan.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from eckParser import PARSER_VERSION, Parser
+from pirSerializer import FORMAT_VERSION, PIR_FormatError, PIR_Reader, PIR_Writer
+
+# mixed into every key, so entries written by another version of the
+# parser or of the serialization format are never read
+VERSION_TAG = f"eckParser {PARSER_VERSION}; PIR format {FORMAT_VERSION}".encode()
+
+# file name suffix of cache entries
+ENTRY_SUFFIX = ".pir"
+
+
+class ParseCache:
+    """
+    Content-addressed cache of PIR trees.  A call to the parse(filename)
+    method returns the same tree as Parser().parse(filename), loading it
+    from the cache directory when the file's contents have been parsed
+    before.
+
+    The counters hits, misses, bytesRead, bytesWritten and evictions
+    accumulate over the life of the object, and scans counts the scans of
+    the cache directory.
+    """
+
+    def __init__(self, directory, maxBytes=64 * 1024 * 1024):
+        """
+        directory   path of the cache directory; created if necessary
+        maxBytes    Optional; total size of the entries above which the
+                    least recently used ones are removed
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.bytesRead = 0        # bytes of entries loaded
+        self.bytesWritten = 0     # bytes of entries stored
+        self.directory = directory
+        self.evictions = 0        # entries removed to respect maxBytes
+        self.hits = 0             # parse() calls answered from the cache
+        self.maxBytes = maxBytes
+        self.misses = 0           # parse() calls that ran the parser
+        self.scans = 0            # scans of the cache directory
+        self.totalBytes = self.__scan()[1]  # size of the entries, as far as known
+
+    def entryPath(self, key):
+        """Returns the path of the cache entry for a key."""
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def evict(self):
+        """Removes the least recently used entries until the total size of
+        the cache directory is at most maxBytes."""
+        entries, total = self.__scan()
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.totalBytes = total
+
+    def key(self, source):
+        """Returns the cache key for the bytes of a source file."""
+        digest = hashlib.sha256(VERSION_TAG)
+        digest.update(b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def parse(self, filename):
+        """Parse the specified file, or load its tree from the cache.
+        Returns a PIR abstract syntax tree.  ParserError and ScannerError
+        propagate as they do from Parser.parse, and nothing is cached for
+        the file."""
+        with open(filename, "rb") as inFile:
+            source = inFile.read()
+        path = self.entryPath(self.key(source))
+        pirClass = self.__load(path)
+        if pirClass is not None:
+            self.hits += 1
+            return pirClass
+        self.misses += 1
+        pirClass = Parser().parse(filename)
+        self.__store(path, PIR_Writer().dumps(pirClass))
+        return pirClass
+
+    def __load(self, path):
+        """Returns the tree stored at path, or None if there is no usable
+        entry.  A hit marks the entry as recently used."""
+        try:
+            with open(path, "rb") as inFile:
+                data = inFile.read()
+            pirClass = PIR_Reader().loads(data)
+        except (OSError, PIR_FormatError):
+            # a missing, unreadable or corrupt entry is a miss, and parse()
+            # writes it again
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.bytesRead += len(data)
+        return pirClass
+
+    def __scan(self):
+        """Returns the list of (modification time, size, path) triples of
+        the entries in the cache directory, and their total size."""
+        self.scans += 1
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                info = entry.stat()
+            except FileNotFoundError:
+                # removed by another process
+                continue
+            entries.append((info.st_mtime, info.st_size, entry.path))
+            total += info.st_size
+        return entries, total
+
+    def __store(self, path, data):
+        """Atomically writes an entry, then evicts entries if the cache
+        has outgrown maxBytes."""
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        handle, tempPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as outFile:
+                outFile.write(data)
+            os.replace(tempPath, path)
+        except BaseException:
+            os.remove(tempPath)
+            raise
+        self.bytesWritten += len(data)
+        self.totalBytes += len(data) - replaced
+        if self.totalBytes > self.maxBytes:
+            self.evict()
+
+
+if __name__ == "__main__":
+    import time
+    from pirPrinter import PIR_Printer
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    files = []
+    for root, _, names in sorted(os.walk(os.path.join(here, "ParserTests"))):
+        files.extend(os.path.join(root, name) for name in sorted(names)
+                     if name.endswith(".eck"))
+
+    with tempfile.TemporaryDirectory() as cacheDir:
+        cache = ParseCache(cacheDir)
+        # a cold build fills the cache and a warm one reads it back
+        for build in ("cold", "warm"):
+            start = time.perf_counter()
+            trees = [cache.parse(filename) for filename in files]
+            print(f"{build} build: {time.perf_counter() - start:.4f} s, "
+                  f"{cache.hits} hits, {cache.misses} misses, "
+                  f"{cache.bytesRead} bytes read, {cache.bytesWritten} bytes written")
+        for filename, pirClass in zip(files, trees):
+            if PIR_Printer().render(pirClass) != PIR_Printer().render(
+                    Parser().parse(filename)):
+                print(f"{filename} does not match the parser's tree")
+
+        # a corrupt entry is a miss, and is written again
+        with open(files[0], "rb") as inFile:
+            path = cache.entryPath(cache.key(inFile.read()))
+        with open(path, "r+b") as entryFile:
+            entryFile.seek(-8, os.SEEK_END)
+            entryFile.write(b"\xff" * 8)
+        misses = cache.misses
+        cache.parse(files[0])
+        cache.parse(files[0])
+        print("corrupt entry: " + ("reparsed and rewritten" if cache.misses == misses + 1
+                                   else "NOT REPAIRED"))
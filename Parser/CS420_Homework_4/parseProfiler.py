@@ -0,0 +1,155 @@
+"""
+Per-rule profiler for the Eck Parser
+CS420, Spring 2025
+
+This file defines a profiler that records, for every p* grammar rule
+method of a Parser, the number of calls, the cumulative and self time, and
+the number of tokens consumed, along with the time spent in
+Scanner.nextLexeme.  It is opt-in:
+
+    profiler = ParseProfiler()
+    Parser(profiler=profiler).parse(filename)
+    print(profiler.report())
+    profiler.writeCollapsed("parse.folded")
+
+Only a Parser constructed with a profiler has its methods wrapped, as
+instance attributes, so a Parser without one runs the plain class methods
+and pays nothing for the feature.
+
+The Parser scans tokens ahead in batches (see Parser.LOOKAHEAD_SIZE), so
+Scanner.nextLexeme time is charged to whichever rule consumed the token
+that emptied the lookahead buffer.
+
+The collapsed-stack file has one "rule;rule;...;rule microseconds" line per
+distinct call stack, giving the self time spent with that stack, which
+flamegraph.pl and speedscope read directly.
+"""
+
+import time
+
+
+class RuleStats:
+    """The measurements for one rule.  Times are in nanoseconds; the
+    cumulative time and tokens count only the outermost call of a
+    recursive rule, so nothing is counted twice."""
+    __slots__ = ("calls", "cumulative", "name", "selfTime", "tokens")
+
+    def __init__(self, name):
+        self.calls = 0
+        self.cumulative = 0
+        self.name = name
+        self.selfTime = 0
+        self.tokens = 0
+
+
+class ParseProfiler:
+    """
+    This class accumulates rule measurements over every parse made by the
+    Parsers it is passed to.  rules maps each rule name to its RuleStats,
+    stacks maps each collapsed call stack to its self time in nanoseconds,
+    and tokens counts the tokens consumed.
+    """
+
+    def __init__(self):
+        self.rules = {}         # rule name -> RuleStats
+        self.stacks = {}        # "rule;rule;..." -> self time
+        self.tokens = 0         # tokens consumed by the profiled parsers
+        self.__active = {}      # rule name -> number of its calls in progress
+        # one [stack key, start time, child time, tokens at start] list
+        # per call in progress
+        self.__frames = []
+
+    def countTokens(self, method):
+        """Returns a replacement for a Parser's nextToken method that counts
+        each token it consumes."""
+        def counted():
+            self.tokens += 1
+            return method()
+        return counted
+
+    def reset(self):
+        """Discards every measurement.  Parsers already wrapped keep
+        recording into this profiler."""
+        for stats in self.rules.values():
+            stats.calls = stats.cumulative = stats.selfTime = stats.tokens = 0
+        self.stacks.clear()
+        self.tokens = 0
+
+    def wrap(self, name, method):
+        """Returns a replacement for a bound method that records a call of
+        the named rule every time it runs."""
+        stats = self.rules.setdefault(name, RuleStats(name))
+        active = self.__active
+        frames = self.__frames
+        stacks = self.stacks
+        clock = time.perf_counter_ns
+
+        def profiled(*args, **kwargs):
+            key = frames[-1][0] + ";" + name if frames else name
+            frame = [key, clock(), 0, self.tokens]
+            frames.append(frame)
+            active[name] = active.get(name, 0) + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - frame[1]
+                frames.pop()
+                active[name] -= 1
+                selfTime = elapsed - frame[2]
+                stats.calls += 1
+                stats.selfTime += selfTime
+                if not active[name]:
+                    stats.cumulative += elapsed
+                    stats.tokens += self.tokens - frame[3]
+                if frames:
+                    frames[-1][2] += elapsed
+                stacks[key] = stacks.get(key, 0) + selfTime
+
+        profiled.__name__ = getattr(method, "__name__", name)
+        profiled.__doc__ = getattr(method, "__doc__", None)
+        return profiled
+
+    def report(self, limit=None):
+        """Returns a table of the rules, hottest self time first.
+        Inputs:
+            limit   Optional; most rules to list
+        """
+        total = sum(stats.selfTime for stats in self.rules.values()) or 1
+        rules = sorted(self.rules.values(), key=lambda stats: -stats.selfTime)
+        lines = [f"{'rule':<24} {'calls':>9} {'cumulative ms':>14} {'self ms':>10}"
+                 f" {'self':>6} {'tokens':>9} {'tokens/call':>11}"]
+        for stats in rules[:limit]:
+            if not stats.calls:
+                continue
+            lines.append(f"{stats.name:<24} {stats.calls:9,} "
+                         f"{stats.cumulative / 1e6:14.3f} {stats.selfTime / 1e6:10.3f} "
+                         f"{stats.selfTime / total:6.1%} {stats.tokens:9,} "
+                         f"{stats.tokens / stats.calls:11.2f}")
+        lines.append(f"{self.tokens:,} tokens consumed")
+        return "\n".join(lines) + "\n"
+
+    def writeCollapsed(self, filename):
+        """Writes the call stacks in the collapsed-stack format read by
+        flamegraph tools, weighted by self time in microseconds."""
+        with open(filename, "w") as outFile:
+            for key, selfTime in sorted(self.stacks.items()):
+                if selfTime >= 1000:
+                    outFile.write(f"{key} {selfTime // 1000}\n")
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+    from eckParser import Parser
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    files = sys.argv[1:] or [os.path.join(here, "ParserTests", "Square", "SquareGame.eck"),
+                             os.path.join(here, "ParserTests", "ExpressionTests.eck")]
+    profiler = ParseProfiler()
+    for filename in files:
+        Parser(profiler=profiler).parse(filename)
+    print(profiler.report(limit=20), end="")
+    folded = os.path.join(tempfile.gettempdir(), "parse.folded")
+    profiler.writeCollapsed(folded)
+    print(f"{len(profiler.stacks)} call stacks written to {folded}")
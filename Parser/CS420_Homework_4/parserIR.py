@@ -13,6 +13,10 @@ description of Eck.
 class PIR_Base:
     """Base class for the Parser Intermediate Representation"""
 
+    # every PIR class lists its attributes in __slots__, so nodes carry no
+    # per-instance __dict__; a subclass must only list the attributes it adds
+    __slots__ = ("lineNumber",)
+
     def __init__(self, line):
         # line number in the source code for the start of this syntax element
         self.lineNumber = line
@@ -21,6 +25,8 @@ class PIR_Base:
 class PIR_AssignmentStatement(PIR_Base):
     """<assignmentStatement> AST"""
 
+    __slots__ = ("arrayExpression", "expression", "variable")
+
     def __init__(self, line, variable, arrayExp, expression):
         """
         line            line number where assignment occurs
@@ -37,6 +43,8 @@ class PIR_AssignmentStatement(PIR_Base):
 class PIR_Class(PIR_Base):
     """<classDec> AST"""
 
+    __slots__ = ("name", "subroutines", "variables")
+
     def __init__(self, line, name, varList, subroutineList):
         """
         line            line number where class definition starts
@@ -53,6 +61,8 @@ class PIR_Class(PIR_Base):
 class PIR_DoStatement(PIR_Base):
     """<doStatement> AST"""
 
+    __slots__ = ("subprogram",)
+
     def __init__(self, line, subOrMethod):
         """
         line             Line number where do statement begins
@@ -67,6 +77,8 @@ class PIR_ExpressionBinop(PIR_Base):
     <expression>, <exp1>, <exp2>, <exp3>
     """
 
+    __slots__ = ("leftExp", "operator", "rightExp")
+
     def __init__(self, line, op, leftExp, rightExp):
         """
         line        Line number where expression begins
@@ -84,6 +96,8 @@ class PIR_ExpressionConstant(PIR_Base):
     """AST for integer, string, boolean, and keyword constants used by
     rule <exp4>"""
 
+    __slots__ = ("type", "value")
+
     def __init__(self, line, typ, value):
         """
         line    Line number where expression begins
@@ -103,6 +117,8 @@ class PIR_ExpressionConstant(PIR_Base):
 class PIR_ExpressionUnop(PIR_Base):
     """AST for unary expressions used in rule <exp4>"""
 
+    __slots__ = ("expression", "operator")
+
     def __init__(self, line, op, expr):
         """
         line        Line number where expression begins
@@ -117,6 +133,8 @@ class PIR_ExpressionUnop(PIR_Base):
 class PIR_ExpressionVariable(PIR_Base):
     """AST representation of a variable expression used in rule <exp4>"""
 
+    __slots__ = ("arrayExpression", "name")
+
     def __init__(self, line, name, aryExpr=None):
         """
         line        Line number where expression begins
@@ -132,6 +150,8 @@ class PIR_ExpressionVariable(PIR_Base):
 class PIR_IfStatement(PIR_Base):
     """AST combining the <ifStatement> and <elseStatement> rules."""
 
+    __slots__ = ("condition", "elseBranch", "thenBranch")
+
     def __init__(self, line, condExp, thenExp, elseExp=None):
         """
         line        Line number where if begins
@@ -150,6 +170,8 @@ class PIR_None:
     implemented a parsing method yet, you can always return an
     object of this type from your method stub."""
 
+    __slots__ = ()
+
     def write(self, ioStream, indentation=0):
         indent = " " * indentation
         ioStream.write(f"{indent}None\n")
@@ -158,6 +180,8 @@ class PIR_None:
 class PIR_ReturnStatement(PIR_Base):
     """AST for rules <returnStatement> and <returnStatement1>"""
 
+    __slots__ = ("expression",)
+
     def __init__(self, line, expr=None):
         """
         line    Line number where return statement appears
@@ -171,6 +195,8 @@ class PIR_ReturnStatement(PIR_Base):
 class PIR_SubroutineBody(PIR_Base):
     """<subroutineBody> AST"""
 
+    __slots__ = ("statements", "variables")
+
     def __init__(self, line, varList, statementList):
         """
         line            Line number for start of subroutine
@@ -186,6 +212,9 @@ class PIR_SubroutineCall(PIR_Base):
     """AST for subroutine calls, used in rules:
     < doStatement > , <doStatement1 > , <exp4 > , <exp4Id > """
 
+    __slots__ = ("actualParameters", "mangledSubrName", "subroutineName",
+                 "varOrClass")
+
     def __init__(self, line, varOrClass, subName, exprList):
         """
         line            Line number where call appears
@@ -205,6 +234,9 @@ class PIR_SubroutineCall(PIR_Base):
 class PIR_SubroutineDeclaration(PIR_Base):
     """<subroutineDec> AST"""
 
+    __slots__ = ("body", "mangledName", "name", "parameters", "returnFound",
+                 "specifier", "type")
+
     def __init__(self, line, specifier, typ, name, paramList, body):
         """
         line            Line number where subroutine declaration begins
@@ -228,6 +260,8 @@ class PIR_VariableDeclaration(PIR_Base):
     """AST for variable declarations used in <parameterList> and
     <subroutineBody>"""
 
+    __slots__ = ("name", "scope", "type")
+
     def __init__(self, line, typ, name, scope):
         """
         line    Line number where variable is declared
@@ -244,6 +278,8 @@ class PIR_VariableDeclaration(PIR_Base):
 class PIR_WhileStatement(PIR_Base):
     """<whileStatement> AST"""
 
+    __slots__ = ("condition", "statements")
+
     def __init__(self, line, condExp, statementList):
         """
         line                Line number where while statement starts
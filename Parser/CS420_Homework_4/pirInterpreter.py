@@ -0,0 +1,949 @@
+"""
+Interpreter for PIR trees
+CS420, Spring 2025
+
+This file defines an interpreter that runs an Eck program from the PIR
+trees of its classes, starting at Main.main(), without compiling it for a
+virtual machine.  The program is type checked first, which resolves every
+call to the mangled name of the subroutine it calls.
+
+The interpreter has two modes, chosen when it is constructed:
+
+  * "visitor" walks the tree as it runs.  Every node it reaches is
+    dispatched on its class through a table, as PIR_Printer does, and
+    every variable is looked up by name in the SymbolTableManager.
+  * "closures" compiles each subroutine once, when the program is loaded,
+    into nested Python closures, one per node, with every operator,
+    variable slot and called subroutine already bound.  Running a loop
+    then pays no dispatch or lookup for its nodes, however many times it
+    goes around.
+
+Values follow the Eck language description: ints and chars are Python
+ints kept to 16-bit 2's complement, booleans are Python bools, objects are
+EckObjects, arrays are EckArrays, strings are EckStrings, and null is
+None.  The classes of the standard library are implemented in Python by
+StandardLibrary.  Keyboard input comes from a list of key codes, so
+interactive programs such as SquareGame can be run with a script.
+
+Every Eck call nests several Python calls, so very deep Eck recursion
+ends in an EckRuntimeError reporting a stack overflow.
+"""
+
+import sys
+
+from constantFolder import INT_OPERATIONS, divide16, toInt16
+from eckTypes import DataTypes, SubroutineSpecifiers, VariableScopes
+from lexeme import Lexeme
+from parserIR import (PIR_AssignmentStatement, PIR_DoStatement, PIR_ExpressionBinop,
+                      PIR_ExpressionConstant, PIR_ExpressionUnop,
+                      PIR_ExpressionVariable, PIR_IfStatement, PIR_ReturnStatement,
+                      PIR_SubroutineCall, PIR_WhileStatement)
+from typeChecker import BOOLEAN, NULL, STRING, VOID, TypeChecker, standardLibrary
+
+# key codes of the characters the standard library gives special meanings
+NEWLINE = 128
+BACKSPACE = 129
+DOUBLE_QUOTE = 34
+
+# the character codes Output.printChar() and String accept
+MAX_CHAR = 32767
+
+# what a statement returns after a "return;"
+RETURN_NOTHING = (None,)
+
+
+class EckRuntimeError(Exception):
+    """Custom error class for errors found while running a program."""
+
+    def __init__(self, value):
+        self.value = value
+
+    # __str__ is to print() the value
+    def __str__(self):
+        return (repr(self.value))
+
+
+class Halt(Exception):
+    """Raised by Sys.halt() to end the program."""
+
+
+class EckObject:
+    """An instance of an Eck class: its class name and the values of its
+    fields, in the order of their Symbol indexes."""
+
+    __slots__ = ("className", "fields")
+
+    def __init__(self, className, fields):
+        self.className = className
+        self.fields = fields
+
+
+class EckArray(list):
+    """An Eck array: a list of element values that, like any Eck object,
+    is only equal to itself."""
+
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+    __ne__ = object.__ne__
+
+
+class EckString:
+    """An instance of the standard library's String class: a list of
+    character codes and the most characters it may hold."""
+
+    __slots__ = ("chars", "maxLength")
+
+    def __init__(self, maxLength, chars=None):
+        self.chars = [] if chars is None else chars
+        self.maxLength = maxLength
+
+    def __str__(self):
+        return "".join(map(chr, self.chars))
+
+
+def initialValue(typ):
+    """Returns the value a variable of a type holds when it is declared:
+    zero for ints and chars, false for booleans, and null for the rest."""
+    if typ == BOOLEAN:
+        return False
+    if typ[0] in (DataTypes.INT_SCALAR, DataTypes.CHAR_SCALAR):
+        return 0
+    return None
+
+
+def checkString(name, s):
+    """Raises an EckRuntimeError if the string passed to a standard library
+    subroutine is null."""
+    if s is None:
+        raise EckRuntimeError(f"{name}: null string")
+
+
+def checkChar(name, c):
+    """Raises an EckRuntimeError unless c is a character code."""
+    if not 0 <= c <= MAX_CHAR:
+        raise EckRuntimeError(f"{name}: {c} is not a character code")
+
+
+def checkIndex(line, array, index):
+    """Raises an EckRuntimeError unless index is inside an array."""
+    if array is None:
+        raise EckRuntimeError(f"Line {line}: null array")
+    if not 0 <= index < len(array):
+        raise EckRuntimeError(f"Line {line}: array index {index} is out of "
+                              f"bounds 0..{len(array) - 1}")
+
+
+class StandardLibrary:
+    """
+    Python implementations of the subroutines of the standard library
+    classes.  Each is a method named Class_subroutine, taking the object
+    first for a method.  Output is written to output, Keyboard.keyPressed()
+    returns the successive codes of keys and halts the program once they
+    run out, and the Keyboard.read subroutines read lines from input.
+    screenCalls counts the calls of the Screen class.
+
+    The arguments are checked as the machine's library would check them,
+    and errors are raised as EckRuntimeErrors naming the subroutine; the
+    interpreter adds the line of the call.
+    """
+
+    def __init__(self, output=None, input=None, keys=()):
+        self.input = input if input is not None else sys.stdin
+        self.keys = iter(keys)
+        self.memory = {}
+        self.output = output if output is not None else sys.stdout
+        self.screenCalls = 0
+        self.color = True
+
+    def Array_new(self, size):
+        if size < 0:
+            raise EckRuntimeError(f"Array.new: negative size {size}")
+        return EckArray([0] * size)
+
+    def Array_dispose(self, array):
+        return None
+
+    def Keyboard_init(self):
+        return None
+
+    def Keyboard_keyPressed(self):
+        key = next(self.keys, None)
+        if key is None:
+            raise Halt()
+        return key
+
+    def Keyboard_readChar(self):
+        char = self.input.read(1)
+        return ord(char) if char else 0
+
+    def Keyboard_readLine(self, message):
+        checkString("Keyboard.readLine", message)
+        self.Output_printString(message)
+        line = self.input.readline().rstrip("\n")
+        return EckString(len(line), [ord(char) for char in line])
+
+    def Keyboard_readInt(self, message):
+        checkString("Keyboard.readInt", message)
+        return self.String_intValue(self.Keyboard_readLine(message))
+
+    def Math_init(self):
+        return None
+
+    def Math_abs(self, x):
+        return toInt16(abs(x))
+
+    def Math_multiply(self, x, y):
+        return toInt16(x * y)
+
+    def Math_divide(self, x, y):
+        if y == 0:
+            raise EckRuntimeError("Math.divide: division by zero")
+        return divide16(x, y)
+
+    def Math_min(self, x, y):
+        return min(x, y)
+
+    def Math_max(self, x, y):
+        return max(x, y)
+
+    def Math_sqrt(self, x):
+        if x < 0:
+            raise EckRuntimeError(f"Math.sqrt: negative argument {x}")
+        return int(x ** 0.5)
+
+    def Memory_init(self):
+        return None
+
+    def Memory_peek(self, address):
+        return self.memory.get(address, 0)
+
+    def Memory_poke(self, address, value):
+        self.memory[address] = value
+
+    def Memory_alloc(self, size):
+        return self.Array_new(size)
+
+    def Memory_deAlloc(self, reference):
+        return None
+
+    def Output_init(self):
+        return None
+
+    def Output_moveCursor(self, i, j):
+        return None
+
+    def Output_printChar(self, c):
+        checkChar("Output.printChar", c)
+        if c == NEWLINE:
+            self.output.write("\n")
+        elif c != BACKSPACE:
+            self.output.write(chr(c))
+
+    def Output_printString(self, s):
+        checkString("Output.printString", s)
+        for c in s.chars:
+            self.Output_printChar(c)
+
+    def Output_printInt(self, i):
+        self.output.write(str(i))
+
+    def Output_println(self):
+        self.output.write("\n")
+
+    def Output_backSpace(self):
+        return None
+
+    def Screen_init(self):
+        self.screenCalls += 1
+
+    def Screen_clearScreen(self):
+        self.screenCalls += 1
+
+    def Screen_setColor(self, b):
+        self.screenCalls += 1
+        self.color = b
+
+    def Screen_drawPixel(self, x, y):
+        self.screenCalls += 1
+
+    def Screen_drawLine(self, x1, y1, x2, y2):
+        self.screenCalls += 1
+
+    def Screen_drawRectangle(self, x1, y1, x2, y2):
+        self.screenCalls += 1
+
+    def Screen_drawCircle(self, x, y, r):
+        self.screenCalls += 1
+
+    def String_new(self, maxLength):
+        if maxLength < 0:
+            raise EckRuntimeError(f"String.new: negative length {maxLength}")
+        return EckString(maxLength)
+
+    def String_dispose(self, s):
+        checkString("String.dispose", s)
+
+    def String_length(self, s):
+        checkString("String.length", s)
+        return len(s.chars)
+
+    def String_charAt(self, s, j):
+        self.__checkPosition("charAt", s, j)
+        return s.chars[j]
+
+    def String_setCharAt(self, s, j, c):
+        self.__checkPosition("setCharAt", s, j)
+        checkChar("String.setCharAt", c)
+        s.chars[j] = c
+
+    def String_appendChar(self, s, c):
+        checkString("String.appendChar", s)
+        checkChar("String.appendChar", c)
+        if len(s.chars) >= s.maxLength:
+            raise EckRuntimeError("String.appendChar: string is full")
+        s.chars.append(c)
+        return s
+
+    def String_eraseLastChar(self, s):
+        checkString("String.eraseLastChar", s)
+        if not s.chars:
+            raise EckRuntimeError("String.eraseLastChar: string is empty")
+        s.chars.pop()
+
+    def String_intValue(self, s):
+        checkString("String.intValue", s)
+        text = str(s)
+        digits = 1 if text.startswith("-") else 0
+        while digits < len(text) and text[digits].isdigit():
+            digits += 1
+        try:
+            return toInt16(int(text[:digits]))
+        except ValueError:
+            return 0
+
+    def String_setInt(self, s, j):
+        checkString("String.setInt", s)
+        if len(str(j)) > s.maxLength:
+            raise EckRuntimeError(f"String.setInt: {j} does not fit in the string")
+        s.chars = [ord(char) for char in str(j)]
+
+    def String_backSpace(self):
+        return BACKSPACE
+
+    def String_doubleQuote(self):
+        return DOUBLE_QUOTE
+
+    def String_newLine(self):
+        return NEWLINE
+
+    def Sys_init(self):
+        return None
+
+    def Sys_halt(self):
+        raise Halt()
+
+    def Sys_error(self, errorCode):
+        raise EckRuntimeError(f"Sys.error({errorCode})")
+
+    def Sys_wait(self, duration):
+        return None
+
+    def __checkPosition(self, name, s, j):
+        checkString(f"String.{name}", s)
+        if not 0 <= j < len(s.chars):
+            raise EckRuntimeError(f"String.{name}: index {j} is out of bounds "
+                                  f"0..{len(s.chars) - 1}")
+
+
+class Routine:
+    """What the interpreter knows of one subroutine: its declaration, its
+    class, the values its locals start with, and, in closure mode, the
+    function that runs it on a frame."""
+
+    __slots__ = ("className", "declaration", "initial", "isConstructor",
+                 "isMethod", "native", "run", "table")
+
+    def __init__(self, className, declaration, table, native=None):
+        self.className = className
+        self.declaration = declaration
+        self.initial = [initialValue(variable.type)
+                        for variable in declaration.body.variables]
+        self.isConstructor = declaration.specifier == SubroutineSpecifiers.CONSTRUCTOR
+        self.isMethod = declaration.specifier == SubroutineSpecifiers.METHOD
+        self.native = native      # the StandardLibrary method, if it is one
+        self.run = None           # closure mode: frame -> value
+        self.table = table        # SymbolTable of its parameters and locals
+
+
+class PIR_Interpreter:
+    """
+    This class runs Eck programs.  load() type checks the classes of a
+    program and prepares them to run, and run() calls Main.main().
+
+    A frame is a list holding the object of a method or constructor, or
+    None, then the values of the parameters, then those of the locals.
+    """
+
+    def __init__(self, mode="closures", output=None, input=None, keys=()):
+        """
+        mode        Optional; "closures" to compile each subroutine into
+                    closures when the program is loaded, or "visitor" to
+                    walk the tree as the program runs
+        output      Optional; file the Output class writes to, by default
+                    standard output
+        input       Optional; file the Keyboard class reads lines from, by
+                    default standard input
+        keys        Optional; the key codes Keyboard.keyPressed() returns,
+                    one per call, 0 for no key.  The program halts when
+                    they run out.
+        """
+        if mode not in ("closures", "visitor"):
+            raise ValueError(f"unknown interpreter mode '{mode}'")
+        self.library = StandardLibrary(output, input, keys)
+        self.mode = mode
+        self.routines = {}      # mangled name -> Routine
+        self.statics = {}       # class name -> list of static variable values
+        self.symbols = None     # SymbolTableManager of the program
+        self.__fields = {}      # class name -> initial field values
+        self.__evaluators = {
+            PIR_ExpressionBinop: self.__visitBinop,
+            PIR_ExpressionConstant: self.__visitConstant,
+            PIR_ExpressionUnop: self.__visitUnop,
+            PIR_ExpressionVariable: self.__visitVariable,
+            PIR_SubroutineCall: self.__visitCall,
+        }
+        self.__executors = {
+            PIR_AssignmentStatement: self.__visitAssignment,
+            PIR_DoStatement: self.__visitDo,
+            PIR_IfStatement: self.__visitIf,
+            PIR_ReturnStatement: self.__visitReturn,
+            PIR_WhileStatement: self.__visitWhile,
+        }
+
+    def load(self, classes):
+        """Type checks the classes of a program and prepares them to run.
+        Inputs:
+            classes     An iterable of PIR_Class objects, or a dict of them
+                        such as parseProject returns
+        A TypeCheckError is raised if the program does not check.
+        """
+        self.symbols = TypeChecker().check(classes)
+        library = {pirClass.name for pirClass in standardLibrary()}
+        for className, pirClass in self.symbols.classes.items():
+            variables = self.symbols.classTables[className].symbols.values()
+            self.__fields[className] = [initialValue(symbol.type) for symbol in variables
+                                        if symbol.scope == VariableScopes.FIELD]
+            self.statics[className] = [initialValue(symbol.type) for symbol in variables
+                                       if symbol.scope == VariableScopes.STATIC]
+            for subroutine in pirClass.subroutines:
+                native = None
+                if className in library:
+                    native = getattr(self.library, f"{className}_{subroutine.name}")
+                self.routines[subroutine.mangledName] = Routine(
+                    className, subroutine, self.symbols.tables[subroutine.mangledName],
+                    native)
+        if self.mode == "closures":
+            for routine in self.routines.values():
+                routine.run = self.__compileRoutine(routine)
+
+    def run(self, entry="Main.main"):
+        """Runs the program from a function without parameters, Main.main()
+        by default, until it returns or calls Sys.halt().  Returns the value
+        the function returns."""
+        routine = self.routines.get(entry)
+        if routine is None or routine.isMethod or routine.declaration.parameters:
+            raise EckRuntimeError(f"{entry}() is not a function of the program")
+        try:
+            return self.call(routine, [None])
+        except Halt:
+            return None
+        except RecursionError:
+            raise EckRuntimeError(f"stack overflow running {entry}()") from None
+
+    def call(self, routine, frame):
+        """Runs a subroutine on a frame holding its object, or None, and its
+        arguments.  Returns the value it returns."""
+        if routine.native is not None:
+            if routine.isMethod:
+                return routine.native(*frame)
+            return routine.native(*frame[1:])
+        frame.extend(routine.initial)
+        if routine.isConstructor:
+            frame[0] = EckObject(routine.className, list(self.__fields[routine.className]))
+        if routine.run is not None:
+            return routine.run(frame)
+        result = self.__execute(routine.declaration.body.statements, routine, frame)
+        return None if result is None else result[0]
+
+    # ----- visitor mode -----
+
+    def __execute(self, statements, routine, frame):
+        """Runs a list of statements.  Returns None, or a 1-tuple holding
+        the value of the return statement that ended them."""
+        executors = self.__executors
+        for statement in statements:
+            result = executors[type(statement)](statement, routine, frame)
+            if result is not None:
+                return result
+        return None
+
+    def __evaluate(self, node, routine, frame):
+        return self.__evaluators[type(node)](node, routine, frame)
+
+    def __slot(self, name, routine):
+        """Returns the (VariableScopes constant, index) pair of a variable
+        used in a subroutine: its place in the frame for a parameter or
+        local, in the fields of the object for a field, or in the statics
+        of the class for a static."""
+        symbol = routine.table.lookup(name)
+        scope = symbol.scope
+        if scope == VariableScopes.LOCAL:
+            return scope, 1 + len(routine.declaration.parameters) + symbol.index
+        if scope == VariableScopes.PARAMETER:
+            return scope, 1 + symbol.index
+        return scope, symbol.index
+
+    def __load(self, name, routine, frame):
+        scope, index = self.__slot(name, routine)
+        if scope == VariableScopes.FIELD:
+            return frame[0].fields[index]
+        if scope == VariableScopes.STATIC:
+            return self.statics[routine.className][index]
+        return frame[index]
+
+    def __store(self, name, value, routine, frame):
+        scope, index = self.__slot(name, routine)
+        if scope == VariableScopes.FIELD:
+            frame[0].fields[index] = value
+        elif scope == VariableScopes.STATIC:
+            self.statics[routine.className][index] = value
+        else:
+            frame[index] = value
+
+    def __visitAssignment(self, statement, routine, frame):
+        if statement.arrayExpression is None:
+            value = self.__evaluate(statement.expression, routine, frame)
+            self.__store(statement.variable, value, routine, frame)
+        else:
+            array = self.__load(statement.variable, routine, frame)
+            index = self.__evaluate(statement.arrayExpression, routine, frame)
+            value = self.__evaluate(statement.expression, routine, frame)
+            checkIndex(statement.lineNumber, array, index)
+            array[index] = value
+        return None
+
+    def __visitDo(self, statement, routine, frame):
+        self.__evaluate(statement.subprogram, routine, frame)
+        return None
+
+    def __visitIf(self, statement, routine, frame):
+        if self.__evaluate(statement.condition, routine, frame):
+            return self.__execute(statement.thenBranch, routine, frame)
+        if statement.elseBranch is not None:
+            return self.__execute(statement.elseBranch, routine, frame)
+        return None
+
+    def __visitReturn(self, statement, routine, frame):
+        if statement.expression is None:
+            return RETURN_NOTHING
+        return (self.__evaluate(statement.expression, routine, frame),)
+
+    def __visitWhile(self, statement, routine, frame):
+        while self.__evaluate(statement.condition, routine, frame):
+            result = self.__execute(statement.statements, routine, frame)
+            if result is not None:
+                return result
+        return None
+
+    def __visitBinop(self, node, routine, frame):
+        left = self.__evaluate(node.leftExp, routine, frame)
+        right = self.__evaluate(node.rightExp, routine, frame)
+        if node.operator == Lexeme.SYMBOL_DIVIDE and right == 0:
+            raise EckRuntimeError(f"Line {node.lineNumber}: division by zero")
+        return INT_OPERATIONS[node.operator](left, right)
+
+    def __visitUnop(self, node, routine, frame):
+        value = self.__evaluate(node.expression, routine, frame)
+        if node.operator == Lexeme.SYMBOL_MINUS:
+            return toInt16(-value)
+        return (not value) if type(value) is bool else ~value
+
+    def __visitConstant(self, node, routine, frame):
+        if node.value is Lexeme.KW_THIS:
+            return frame[0]
+        if node.type == STRING:
+            return EckString(len(node.value), [ord(char) for char in node.value])
+        return node.value
+
+    def __visitVariable(self, node, routine, frame):
+        value = self.__load(node.name, routine, frame)
+        if node.arrayExpression is None:
+            return value
+        index = self.__evaluate(node.arrayExpression, routine, frame)
+        checkIndex(node.lineNumber, value, index)
+        return value[index]
+
+    def __visitCall(self, node, routine, frame):
+        callee = self.routines[node.mangledSubrName]
+        if not callee.isMethod:
+            this = None
+        elif node.varOrClass is None:
+            this = frame[0]
+        else:
+            this = self.__load(node.varOrClass, routine, frame)
+            if this is None:
+                raise EckRuntimeError(f"Line {node.lineNumber}: {node.varOrClass} is "
+                                      f"null")
+        newFrame = [this]
+        for argument in node.actualParameters:
+            newFrame.append(self.__evaluate(argument, routine, frame))
+        if callee.native is None:
+            return self.call(callee, newFrame)
+        try:
+            return self.call(callee, newFrame)
+        except EckRuntimeError as err:
+            raise EckRuntimeError(f"Line {node.lineNumber}: {err.value}") from None
+
+    # ----- closure mode -----
+
+    def __compileRoutine(self, routine):
+        """Returns the function that runs a subroutine's body on a frame
+        and returns its value."""
+        block = self.__compileBlock(routine.declaration.body.statements, routine)
+
+        def run(frame):
+            result = block(frame)
+            return None if result is None else result[0]
+        return run
+
+    def __compileBlock(self, statements, routine):
+        """Returns the function that runs a list of statements, returning
+        None or a 1-tuple holding the value of a return statement."""
+        compiled = [self.__compileStatement(statement, routine)
+                    for statement in statements]
+        if not compiled:
+            return lambda frame: None
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def block(frame):
+            for statement in compiled:
+                result = statement(frame)
+                if result is not None:
+                    return result
+            return None
+        return block
+
+    def __compileStatement(self, statement, routine):
+        kind = type(statement)
+        if kind is PIR_AssignmentStatement:
+            return self.__compileAssignment(statement, routine)
+        if kind is PIR_DoStatement:
+            call = self.__compileExpression(statement.subprogram, routine)
+
+            def do(frame):
+                call(frame)
+            return do
+        if kind is PIR_IfStatement:
+            condition = self.__compileExpression(statement.condition, routine)
+            thenBlock = self.__compileBlock(statement.thenBranch, routine)
+            if statement.elseBranch is None:
+                def ifThen(frame):
+                    if condition(frame):
+                        return thenBlock(frame)
+                    return None
+                return ifThen
+            elseBlock = self.__compileBlock(statement.elseBranch, routine)
+
+            def ifElse(frame):
+                if condition(frame):
+                    return thenBlock(frame)
+                return elseBlock(frame)
+            return ifElse
+        if kind is PIR_WhileStatement:
+            condition = self.__compileExpression(statement.condition, routine)
+            body = self.__compileBlock(statement.statements, routine)
+
+            def loop(frame):
+                while condition(frame):
+                    result = body(frame)
+                    if result is not None:
+                        return result
+                return None
+            return loop
+        if statement.expression is None:
+            return lambda frame: RETURN_NOTHING
+        value = self.__compileExpression(statement.expression, routine)
+        return lambda frame: (value(frame),)
+
+    def __compileAssignment(self, statement, routine):
+        value = self.__compileExpression(statement.expression, routine)
+        scope, index = self.__slot(statement.variable, routine)
+        if statement.arrayExpression is not None:
+            array = self.__compileLoad(scope, index, routine)
+            subscript = self.__compileExpression(statement.arrayExpression, routine)
+            line = statement.lineNumber
+
+            def storeElement(frame):
+                target = array(frame)
+                i = subscript(frame)
+                result = value(frame)
+                if target is None or not 0 <= i < len(target):
+                    checkIndex(line, target, i)
+                target[i] = result
+            return storeElement
+        if scope == VariableScopes.FIELD:
+            def storeField(frame):
+                frame[0].fields[index] = value(frame)
+            return storeField
+        if scope == VariableScopes.STATIC:
+            statics = self.statics[routine.className]
+
+            def storeStatic(frame):
+                statics[index] = value(frame)
+            return storeStatic
+
+        def storeLocal(frame):
+            frame[index] = value(frame)
+        return storeLocal
+
+    def __compileLoad(self, scope, index, routine):
+        if scope == VariableScopes.FIELD:
+            return lambda frame: frame[0].fields[index]
+        if scope == VariableScopes.STATIC:
+            statics = self.statics[routine.className]
+            return lambda frame: statics[index]
+        return lambda frame: frame[index]
+
+    def __compileExpression(self, node, routine):
+        """Returns the function that computes an expression's value from a
+        frame."""
+        kind = type(node)
+        if kind is PIR_ExpressionConstant:
+            if node.value is Lexeme.KW_THIS:
+                return lambda frame: frame[0]
+            if node.type == STRING:
+                codes = [ord(char) for char in node.value]
+                return lambda frame: EckString(len(codes), list(codes))
+            value = None if node.type in (NULL, VOID) else node.value
+            return lambda frame: value
+        if kind is PIR_ExpressionVariable:
+            scope, index = self.__slot(node.name, routine)
+            load = self.__compileLoad(scope, index, routine)
+            if node.arrayExpression is None:
+                return load
+            subscript = self.__compileExpression(node.arrayExpression, routine)
+            line = node.lineNumber
+
+            def element(frame):
+                array = load(frame)
+                i = subscript(frame)
+                if array is None or not 0 <= i < len(array):
+                    checkIndex(line, array, i)
+                return array[i]
+            return element
+        if kind is PIR_ExpressionUnop:
+            operand = self.__compileExpression(node.expression, routine)
+            if node.operator == Lexeme.SYMBOL_MINUS:
+                return lambda frame: toInt16(-operand(frame))
+
+            def negate(frame):
+                value = operand(frame)
+                return (not value) if type(value) is bool else ~value
+            return negate
+        if kind is PIR_ExpressionBinop:
+            return self.__compileBinop(node, routine)
+        return self.__compileCall(node, routine)
+
+    def __compileBinop(self, node, routine):
+        left = self.__compileExpression(node.leftExp, routine)
+        right = self.__compileExpression(node.rightExp, routine)
+        op = node.operator
+        # the commonest operators are written out, to save a call
+        if op == Lexeme.SYMBOL_PLUS:
+            def add(frame):
+                value = left(frame) + right(frame)
+                if -32768 <= value <= 32767:
+                    return value
+                return (value + 32768) % 65536 - 32768
+            return add
+        if op == Lexeme.SYMBOL_MINUS:
+            def subtract(frame):
+                value = left(frame) - right(frame)
+                if -32768 <= value <= 32767:
+                    return value
+                return (value + 32768) % 65536 - 32768
+            return subtract
+        if op == Lexeme.SYMBOL_LT:
+            return lambda frame: left(frame) < right(frame)
+        if op == Lexeme.SYMBOL_GT:
+            return lambda frame: left(frame) > right(frame)
+        if op == Lexeme.SYMBOL_EQUAL:
+            return lambda frame: left(frame) == right(frame)
+        if op == Lexeme.SYMBOL_DIVIDE:
+            line = node.lineNumber
+
+            def divide(frame):
+                dividend = left(frame)
+                divisor = right(frame)
+                if divisor == 0:
+                    raise EckRuntimeError(f"Line {line}: division by zero")
+                return divide16(dividend, divisor)
+            return divide
+        operation = INT_OPERATIONS[op]
+        return lambda frame: operation(left(frame), right(frame))
+
+    def __compileCall(self, node, routine):
+        callee = self.routines[node.mangledSubrName]
+        arguments = [self.__compileExpression(argument, routine)
+                     for argument in node.actualParameters]
+        call = self.call
+        if not callee.isMethod:
+            receiver = None
+        elif node.varOrClass is None:
+            receiver = lambda frame: frame[0]
+        else:
+            scope, index = self.__slot(node.varOrClass, routine)
+            receiver = self.__compileLoad(scope, index, routine)
+        line = node.lineNumber
+        name = node.varOrClass
+
+        if callee.native is not None:
+            native = callee.native
+            if receiver is None:
+                def callNativeFunction(frame):
+                    values = [argument(frame) for argument in arguments]
+                    try:
+                        return native(*values)
+                    except EckRuntimeError as err:
+                        raise EckRuntimeError(f"Line {line}: {err.value}") from None
+                return callNativeFunction
+
+            def callNative(frame):
+                this = receiver(frame)
+                if this is None:
+                    raise EckRuntimeError(f"Line {line}: {name} is null")
+                values = [argument(frame) for argument in arguments]
+                try:
+                    return native(this, *values)
+                except EckRuntimeError as err:
+                    raise EckRuntimeError(f"Line {line}: {err.value}") from None
+            return callNative
+
+        initial = callee.initial
+        if callee.isConstructor:
+            fields = self.__fields[callee.className]
+            className = callee.className
+
+            def construct(frame):
+                newFrame = [EckObject(className, list(fields))]
+                for argument in arguments:
+                    newFrame.append(argument(frame))
+                newFrame.extend(initial)
+                return callee.run(newFrame)
+            return construct
+        if receiver is None:
+            def callFunction(frame):
+                newFrame = [None]
+                for argument in arguments:
+                    newFrame.append(argument(frame))
+                newFrame.extend(initial)
+                return callee.run(newFrame)
+            return callFunction
+
+        def callMethod(frame):
+            this = receiver(frame)
+            if this is None:
+                raise EckRuntimeError(f"Line {line}: {name} is null")
+            newFrame = [this]
+            for argument in arguments:
+                newFrame.append(argument(frame))
+            newFrame.extend(initial)
+            return callee.run(newFrame)
+        return callMethod
+
+
+if __name__ == "__main__":
+    import io
+    import os
+    import tempfile
+    import time
+    from eckProject import ProjectError, parseProject
+    from typeChecker import TypeCheckError
+
+    # python pirInterpreter.py [program directory [mode]]
+    here = os.path.dirname(os.path.abspath(__file__))
+    if len(sys.argv) > 1:
+        interpreter = PIR_Interpreter(sys.argv[2] if len(sys.argv) > 2 else "closures")
+        try:
+            interpreter.load(parseProject(sys.argv[1], workers=1))
+            interpreter.run()
+        except (ProjectError, TypeCheckError) as err:
+            for error in err.value:
+                print(error)
+            sys.exit(1)
+        except EckRuntimeError as err:
+            print(f"\nRuntime error: {err.value}")
+            sys.exit(1)
+        sys.exit()
+
+    # hold the right arrow for a while, grow the square, hold the down
+    # arrow, then quit
+    keys = [132] * 100 + [0] * 20 + [88] * 5 + [0] * 5 + [133] * 100 + [0] * 20 + [81]
+    results = {}
+    with tempfile.TemporaryDirectory() as workDir:
+        for name in ("Main.eck", "Square.eck", "SquareGame.eck"):
+            with open(os.path.join(here, "ParserTests", "Square", name)) as inFile, \
+                    open(os.path.join(workDir, name), "w") as outFile:
+                # the test program calls draw with undeclared variables
+                outFile.write(inFile.read().replace("do draw(a, b);", "do draw();"))
+        for mode in ("visitor", "closures"):
+            interpreter = PIR_Interpreter(mode, output=io.StringIO(), keys=keys)
+            interpreter.load(parseProject(workDir, workers=1))
+            start = time.perf_counter()
+            interpreter.run()
+            seconds = time.perf_counter() - start
+            results[mode] = interpreter.library.screenCalls
+            print(f"{mode:<9} SquareGame: {results[mode]} screen calls in "
+                  f"{seconds:.3f} s")
+    print("modes agree" if len(set(results.values())) == 1 else "modes DISAGREE")
+
+    # each body of Main.main() and the error it must raise in both modes
+    ERRORS = [
+        ("String s; do Output.printString(s);", "Line 3: Output.printString: null string"),
+        ("do Output.printChar(-1);", "Line 3: Output.printChar: -1 is not a character code"),
+        ("do Output.printChar(32767 + 1);",
+         "Line 3: Output.printChar: -32768 is not a character code"),
+        ("String s; do s.length();", "Line 3: s is null"),
+        ("String s; s = String.new(1); do s.appendChar(-5);",
+         "Line 3: String.appendChar: -5 is not a character code"),
+        ("String s; s = String.new(1); do s.setCharAt(0, 65);",
+         "Line 3: String.setCharAt: index 0 is out of bounds 0..-1"),
+        ("String s; s = String.new(2); do s.eraseLastChar();",
+         "Line 3: String.eraseLastChar: string is empty"),
+        ("String s; s = String.new(2); do s.setInt(-100);",
+         "Line 3: String.setInt: -100 does not fit in the string"),
+        ("String s; do Keyboard.readInt(s);", "Line 3: Keyboard.readInt: null string"),
+        ("do Math.divide(1, 0);", "Line 3: Math.divide: division by zero"),
+        ("Array a; a = Array.new(2); a[2] = 0;", "Line 3: array index 2 is out of bounds 0..1"),
+    ]
+    failures = 0
+    with tempfile.TemporaryDirectory() as workDir:
+        filename = os.path.join(workDir, "Main.eck")
+        for body, expected in ERRORS:
+            with open(filename, "w") as outFile:
+                outFile.write(f"class Main {{\n  function void main() {{\n    {body} "
+                              f"return;\n  }}\n}}\n")
+            for mode in ("visitor", "closures"):
+                interpreter = PIR_Interpreter(mode, output=io.StringIO(),
+                                              input=io.StringIO("12\n"))
+                try:
+                    interpreter.load(parseProject(workDir, workers=1))
+                    interpreter.run()
+                    got = "no error"
+                except EckRuntimeError as err:
+                    got = err.value
+                if got != expected:
+                    failures += 1
+                    print(f"{mode} {body}: got {got!r}")
+    print(f"{len(ERRORS) * 2 - failures} of {len(ERRORS) * 2} run time errors as expected")
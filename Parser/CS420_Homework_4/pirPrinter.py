@@ -13,162 +13,233 @@ from functools import singledispatchmethod
 from parserIR import *
 
 
+class IndentCache(dict):
+    """Maps an indentation width to a string of that many spaces, building
+    each string the first time it is asked for."""
+
+    def __missing__(self, width):
+        indent = self[width] = " " * width
+        return indent
+
+
 class PIR_Printer:
     """
     This class implements a print method for objects derived from the
     PIR_Base class.
+
+    lines(pirObject) walks the tree with an explicit stack instead of
+    recursion and yields the output one line at a time, so a dump can be
+    streamed without holding its whole text, however deep the tree is.
+    print() and render() are built on it.
+
+    The handler for each node class, reached through expandNode(), returns
+    the node's output items in order: a string is a finished line and a
+    (node, indentation) pair is a child still to be expanded.
+
+    By default, expandNode() finds the handler for a node in HANDLERS, a
+    plain dict keyed by the node's exact class, rather than going through
+    singledispatchmethod on every call.  Passing dispatch="singledispatch"
+    restores the original dispatch; both use the same handlers.
     """
     # number of spaces between each printing indentation level
     INDENTATION_INCR = 3
-
-    def __init__(self):
+    # indentation strings shared by all printers
+    INDENTS = IndentCache()
+
+    def __init__(self, dispatch="table"):
+        """
+        dispatch    Optional; "table" to find handlers in HANDLERS or
+                    "singledispatch" to dispatch through expandNode's
+                    singledispatchmethod registry.
+        """
+        if dispatch not in ("table", "singledispatch"):
+            raise ValueError(f"unknown printer dispatch '{dispatch}'")
         self.__filename = None   # pathname for output file
-        self.__ioStream = None   # I/O stream object used for writing
+        if dispatch == "table":
+            self.expandNode = self._expandNodeFromTable
+
+    def lines(self, pirObject, indentation=0):
+        """Generates the output for pirObject one line at a time, each
+        ending with a newline, indented by indentation spaces."""
+        expandNode = self.expandNode
+        stack = [(pirObject, indentation)]
+        pop = stack.pop
+        push = stack.extend
+        while stack:
+            item = pop()
+            if type(item) is str:
+                yield item
+            else:
+                # push the node's items so that the first is popped next
+                items = expandNode(*item)
+                items.reverse()
+                push(items)
+
+    def printNode(self, arg, indentation=0):
+        """Returns the text for a node and its children, indented by
+        indentation spaces.  The recursive printer this replaced wrote
+        through printNode(); callers of it now get the text instead."""
+        return "".join(self.lines(arg, indentation))
 
     def print(self, filename, pirObject):
+        """Writes the text for pirObject to the named file, one line at a
+        time as lines() produces it."""
         self.__filename = filename
-        self.__ioStream = open(self.__filename, "w")
-        self.printNode(pirObject)
-        self.__ioStream.close()
+        with open(self.__filename, "w") as outFile:
+            outFile.writelines(self.lines(pirObject))
+
+    def render(self, pirObject):
+        """Returns the text for pirObject as one string."""
+        return "".join(self.lines(pirObject))
+
+    def _expandNodeFromTable(self, arg, indentation=0):
+        """Table dispatch replacement for expandNode(), installed by the
+        constructor.  A class missing from HANDLERS is resolved through the
+        singledispatch registry, which keeps its own cache; HANDLERS itself
+        is never modified."""
+        handler = PIR_Printer.HANDLERS.get(type(arg))
+        if handler is None:
+            handler = PIR_Printer.DISPATCHER.dispatch(type(arg))
+        return handler(self, arg, indentation)
 
     @singledispatchmethod
-    def printNode(self, arg, indentation=0):
+    def expandNode(self, arg, indentation=0):
         print(f"printNode not implemented yet for objects of type {type(arg)}")
+        return []
 
-    @printNode.register(PIR_AssignmentStatement)
+    @expandNode.register(PIR_AssignmentStatement)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        nextIndent = " " * nextIndentation
-        self.__ioStream.write(
-            f"{arg.lineNumber:3d}{indent}assignment {arg.variable}\n")
+        nextIndent = PIR_Printer.INDENTS[nextIndentation]
+        items = [f"{arg.lineNumber:3d}{indent}assignment {arg.variable}\n"]
         if arg.arrayExpression is not None:
-            self.__ioStream.write(
-                f"{arg.lineNumber:3d}{nextIndent}array index\n")
-            self.printNode(arg.arrayExpression,
-                           nextIndentation + PIR_Printer.INDENTATION_INCR)
-        self.printNode(arg.expression, nextIndentation)
+            items.append(f"{arg.lineNumber:3d}{nextIndent}array index\n")
+            items.append((arg.arrayExpression,
+                          nextIndentation + PIR_Printer.INDENTATION_INCR))
+        items.append((arg.expression, nextIndentation))
+        return items
 
-    @printNode.register(PIR_Class)
+    @expandNode.register(PIR_Class)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}class {arg.name}\n")
-        for var in arg.variables:
-            self.printNode(var, nextIndentation)
-        for sub in arg.subroutines:
-            self.printNode(sub, nextIndentation)
+        items = [f"{arg.lineNumber:3d}{indent}class {arg.name}\n"]
+        items.extend((var, nextIndentation) for var in arg.variables)
+        items.extend((sub, nextIndentation) for sub in arg.subroutines)
+        return items
 
-    @printNode.register(PIR_DoStatement)
+    @expandNode.register(PIR_DoStatement)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}do\n")
-        self.printNode(arg.subprogram, nextIndentation)
+        return [f"{arg.lineNumber:3d}{indent}do\n",
+                (arg.subprogram, nextIndentation)]
 
-    @printNode.register(PIR_ExpressionBinop)
+    @expandNode.register(PIR_ExpressionBinop)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}exprBinop {arg.operator}\n")
-        self.printNode(arg.leftExp, nextIndentation)
-        self.printNode(arg.rightExp, nextIndentation)
+        return [f"{arg.lineNumber:3d}{indent}exprBinop {arg.operator}\n",
+                (arg.leftExp, nextIndentation),
+                (arg.rightExp, nextIndentation)]
 
-    @printNode.register(PIR_ExpressionConstant)
+    @expandNode.register(PIR_ExpressionConstant)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}constant {arg.type} {arg.value}\n")
+        indent = PIR_Printer.INDENTS[indentation]
+        return [f"{arg.lineNumber:3d}{indent}constant {arg.type} {arg.value}\n"]
 
-    @printNode.register(PIR_ExpressionUnop)
+    @expandNode.register(PIR_ExpressionUnop)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}exprUnop {arg.operator}\n")
-        print(f"{arg.lineNumber:3d}{indent}exprUnop {arg.operator}\n")
-        self.printNode(arg.expression, nextIndentation)
+        return [f"{arg.lineNumber:3d}{indent}exprUnop {arg.operator}\n",
+                (arg.expression, nextIndentation)]
 
-    @printNode.register(PIR_ExpressionVariable)
+    @expandNode.register(PIR_ExpressionVariable)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}expVar {arg.name}")
         if arg.arrayExpression is not None:
-            self.__ioStream.write(" array index\n")
-            self.printNode(arg.arrayExpression, nextIndentation)
-        else:
-            self.__ioStream.write("\n")
+            return [f"{arg.lineNumber:3d}{indent}expVar {arg.name} array index\n",
+                    (arg.arrayExpression, nextIndentation)]
+        return [f"{arg.lineNumber:3d}{indent}expVar {arg.name}\n"]
 
-    @printNode.register(PIR_IfStatement)
+    @expandNode.register(PIR_IfStatement)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        nextIndent = " " * nextIndentation
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}if\n")
-        self.__ioStream.write(f"{arg.lineNumber:3d}{nextIndent}condition\n")
-        self.printNode(arg.condition, nextIndentation + PIR_Printer.INDENTATION_INCR)
-        self.__ioStream.write(f"{arg.lineNumber:3d}{nextIndent}then\n")
-        for s in arg.thenBranch:
-            self.printNode(s, indentation + 2*PIR_Printer.INDENTATION_INCR)
+        nextIndent = PIR_Printer.INDENTS[nextIndentation]
+        bodyIndentation = indentation + 2*PIR_Printer.INDENTATION_INCR
+        items = [f"{arg.lineNumber:3d}{indent}if\n",
+                 f"{arg.lineNumber:3d}{nextIndent}condition\n",
+                 (arg.condition, nextIndentation + PIR_Printer.INDENTATION_INCR),
+                 f"{arg.lineNumber:3d}{nextIndent}then\n"]
+        items.extend((s, bodyIndentation) for s in arg.thenBranch)
         if arg.elseBranch is not None:
-            self.__ioStream.write(f"{arg.lineNumber:3d}{nextIndent}else\n")
-            print(f"{arg.lineNumber:3d}{nextIndent}else\n")
-            for s in arg.elseBranch:
-                self.printNode(s, indentation + 2*PIR_Printer.INDENTATION_INCR)
+            items.append(f"{arg.lineNumber:3d}{nextIndent}else\n")
+            items.extend((s, bodyIndentation) for s in arg.elseBranch)
+        return items
 
-    @printNode.register(PIR_None)
+    @expandNode.register(PIR_None)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
-        self.__ioStream.write(f"{indent}None\n")
+        indent = PIR_Printer.INDENTS[indentation]
+        return [f"{indent}None\n"]
 
-    @printNode.register(PIR_ReturnStatement)
+    @expandNode.register(PIR_ReturnStatement)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}return\n")
+        indent = PIR_Printer.INDENTS[indentation]
+        items = [f"{arg.lineNumber:3d}{indent}return\n"]
         if arg.expression is not None:
             nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-            self.printNode(arg.expression, nextIndentation)
+            items.append((arg.expression, nextIndentation))
+        return items
 
-    @printNode.register(PIR_SubroutineBody)
+    @expandNode.register(PIR_SubroutineBody)
     def _(self, arg, indentation=0):
-        for v in arg.variables:
-            self.printNode(v, indentation)
-        for s in arg.statements:
-            self.printNode(s, indentation)
+        items = [(v, indentation) for v in arg.variables]
+        items.extend((s, indentation) for s in arg.statements)
+        return items
 
-    @printNode.register(PIR_SubroutineCall)
+    @expandNode.register(PIR_SubroutineCall)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
         if arg.varOrClass is None:
-            self.__ioStream.write(f"{arg.lineNumber:3d}{indent}subroutineCall {arg.subroutineName}\n")
+            items = [f"{arg.lineNumber:3d}{indent}subroutineCall {arg.subroutineName}\n"]
         else:
-            self.__ioStream.write(f"{arg.lineNumber:3d}{indent}subroutineCall {arg.varOrClass}.{arg.subroutineName}\n")
-        for p in arg.actualParameters:
-            self.printNode(p, nextIndentation)
+            items = [f"{arg.lineNumber:3d}{indent}subroutineCall {arg.varOrClass}.{arg.subroutineName}\n"]
+        items.extend((p, nextIndentation) for p in arg.actualParameters)
+        return items
 
-    @printNode.register(PIR_SubroutineDeclaration)
+    @expandNode.register(PIR_SubroutineDeclaration)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        self.__ioStream.write(
-            f"{arg.lineNumber:3d}{indent}subroutine {arg.specifier} {arg.type[0]} {arg.name}\n")
-        for p in arg.parameters:
-            self.printNode(p, nextIndentation)
-        self.printNode(arg.body, nextIndentation)
+        items = [f"{arg.lineNumber:3d}{indent}subroutine {arg.specifier} {arg.type[0]} {arg.name}\n"]
+        items.extend((p, nextIndentation) for p in arg.parameters)
+        items.append((arg.body, nextIndentation))
+        return items
 
-    @printNode.register(PIR_VariableDeclaration)
+    @expandNode.register(PIR_VariableDeclaration)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}variable {arg.scope} {arg.type[0]} {arg.name}\n")
+        indent = PIR_Printer.INDENTS[indentation]
+        return [f"{arg.lineNumber:3d}{indent}variable {arg.scope} {arg.type[0]} {arg.name}\n"]
 
-    @printNode.register(PIR_WhileStatement)
+    @expandNode.register(PIR_WhileStatement)
     def _(self, arg, indentation=0):
-        indent = " " * indentation
+        indent = PIR_Printer.INDENTS[indentation]
         nextIndentation = indentation + PIR_Printer.INDENTATION_INCR
-        nextIndent = " " * nextIndentation
-        self.__ioStream.write(f"{arg.lineNumber:3d}{indent}while\n")
-        self.__ioStream.write(f"{arg.lineNumber:3d}{nextIndent}condition\n")
-        self.printNode(arg.condition, nextIndentation + PIR_Printer.INDENTATION_INCR)
-        self.__ioStream.write(f"{arg.lineNumber:3d}{nextIndent}statements\n")
-        for s in arg.statements:
-            self.printNode(s, nextIndentation + PIR_Printer.INDENTATION_INCR)
+        nextIndent = PIR_Printer.INDENTS[nextIndentation]
+        items = [f"{arg.lineNumber:3d}{indent}while\n",
+                 f"{arg.lineNumber:3d}{nextIndent}condition\n",
+                 (arg.condition, nextIndentation + PIR_Printer.INDENTATION_INCR),
+                 f"{arg.lineNumber:3d}{nextIndent}statements\n"]
+        items.extend((s, nextIndentation + PIR_Printer.INDENTATION_INCR)
+                     for s in arg.statements)
+        return items
+
+    # the singledispatch registry of the handlers above, and a copy of it
+    # made once at import, keyed by exact class
+    DISPATCHER = expandNode.dispatcher
+    HANDLERS = dict(DISPATCHER.registry)
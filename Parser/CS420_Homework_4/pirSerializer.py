@@ -0,0 +1,311 @@
+"""
+Binary serialization for PIR trees
+CS420, Spring 2025
+
+This file defines a writer and a reader for a compact binary form of PIR
+(Parser Intermediate Representation) abstract syntax trees, so a class that
+has not changed can be loaded instead of parsed again.
+
+The format is a header followed by a string table and a program for a
+small stack machine:
+
+    magic       the bytes b"PIR\\0"
+    version     varint; FORMAT_VERSION of the writer
+    strings     varint count, then each string as a varint byte length
+                and its UTF-8 bytes
+    operations  a varint count, then the operations
+
+Each operation is a one-byte opcode, sometimes followed by a varint
+operand, and pushes one value.  The tree is written in postorder: the
+values of a node's attributes are pushed first, then a NODE operation pops
+them and pushes the node.  Reading therefore needs no recursion, however
+deep the tree.  Attributes are stored in __slots__ order, which includes
+the mangledName, mangledSubrName and returnFound values filled in by
+later passes.
+
+Varints are unsigned LEB128; signed integers are zigzag encoded first.
+FORMAT_VERSION must change whenever the opcodes, NODE_CLASSES or the
+__slots__ of a PIR class change.
+"""
+
+from eckTypes import DataTypes, SubroutineSpecifiers, VariableScopes
+from lexeme import Lexeme
+from parserIR import *
+
+# first bytes of every serialized PIR tree
+MAGIC = b"PIR\0"
+FORMAT_VERSION = 1
+
+# opcodes; each pushes one value
+OP_NONE = 0         # None
+OP_FALSE = 1        # False
+OP_TRUE = 2         # True
+OP_INT = 3          # varint operand: zigzag encoded int
+OP_STRING = 4       # varint operand: string table index
+OP_LEXEME = 5       # varint operand: Lexeme value
+OP_DATA_TYPE = 6    # varint operand: DataTypes value
+OP_SPECIFIER = 7    # varint operand: SubroutineSpecifiers value
+OP_SCOPE = 8        # varint operand: VariableScopes value
+OP_TUPLE = 9        # varint operand: number of values popped into a tuple
+OP_LIST = 10        # varint operand: number of values popped into a list
+OP_NODE = 11        # varint operands: NODE_CLASSES index and line number;
+                    # pops the node's other attributes
+OP_NODE_NO_LINE = 12    # varint operand: NODE_CLASSES index of a node
+                        # without a line number, such as PIR_None
+
+# node classes by their index in the format; append only
+NODE_CLASSES = (PIR_AssignmentStatement, PIR_Class, PIR_DoStatement,
+                PIR_ExpressionBinop, PIR_ExpressionConstant,
+                PIR_ExpressionUnop, PIR_ExpressionVariable, PIR_IfStatement,
+                PIR_None, PIR_ReturnStatement, PIR_SubroutineBody,
+                PIR_SubroutineCall, PIR_SubroutineDeclaration,
+                PIR_VariableDeclaration, PIR_WhileStatement)
+
+# enumerated types with their own opcode
+ENUM_OPCODES = {Lexeme: OP_LEXEME, DataTypes: OP_DATA_TYPE,
+                SubroutineSpecifiers: OP_SPECIFIER, VariableScopes: OP_SCOPE}
+# constants of those types by opcode and value
+ENUM_MEMBERS = {opcode: {member.value: member for member in enumType}
+                for enumType, opcode in ENUM_OPCODES.items()}
+
+
+def nodeFields(cls):
+    """Returns the attribute names of a PIR class after lineNumber, in the
+    order they are serialized."""
+    fields = []
+    for base in reversed(cls.__mro__):
+        fields.extend(name for name in base.__dict__.get("__slots__", ())
+                      if name != "lineNumber")
+    return tuple(fields)
+
+
+class PIR_FormatError(Exception):
+    """Custom error class for malformed serialized PIR data."""
+
+    def __init__(self, value):
+        self.value = value
+
+    # __str__ is to print() the value
+    def __str__(self):
+        return (repr(self.value))
+
+
+class PIR_Writer:
+    """
+    This class serializes objects derived from the PIR_Base class, along
+    with the lists, tuples, strings, ints, bools and enumerated constants
+    they hold.
+    """
+    # NODE_CLASSES index and attribute names of each node class
+    NODES = {cls: (index, nodeFields(cls)) for index, cls in enumerate(NODE_CLASSES)}
+
+    def write(self, filename, pirObject):
+        """Serializes pirObject into the named file."""
+        with open(filename, "wb") as outFile:
+            outFile.write(self.dumps(pirObject))
+
+    def dumps(self, pirObject):
+        """Returns the serialized bytes for pirObject."""
+        strings = {}        # string -> string table index
+        operations = bytearray()
+        count = 0
+        # work items: a value still to be written, or the bytes of the
+        # operation that completes a node, tuple or list once the values
+        # above it have been written (PIR trees never hold bytes values)
+        stack = [pirObject]
+        while stack:
+            item = stack.pop()
+            count += 1
+            kind = type(item)
+            if kind is bytes:
+                operations += item
+            elif item is None:
+                operations.append(OP_NONE)
+            elif item is False:
+                operations.append(OP_FALSE)
+            elif item is True:
+                operations.append(OP_TRUE)
+            elif kind in ENUM_OPCODES:
+                operations.append(ENUM_OPCODES[kind])
+                writeVarint(operations, item.value)
+            elif kind is int:
+                operations.append(OP_INT)
+                writeVarint(operations, item << 1 if item >= 0 else (~item << 1) | 1)
+            elif kind is str:
+                operations.append(OP_STRING)
+                writeVarint(operations, strings.setdefault(item, len(strings)))
+            elif kind is tuple or kind is list:
+                count -= 1
+                finish = bytearray([OP_TUPLE if kind is tuple else OP_LIST])
+                writeVarint(finish, len(item))
+                stack.append(bytes(finish))
+                stack.extend(reversed(item))
+            elif kind in PIR_Writer.NODES:
+                count -= 1
+                index, fields = PIR_Writer.NODES[kind]
+                if hasattr(item, "lineNumber"):
+                    finish = bytearray([OP_NODE])
+                    writeVarint(finish, index)
+                    writeVarint(finish, item.lineNumber)
+                else:
+                    finish = bytearray([OP_NODE_NO_LINE])
+                    writeVarint(finish, index)
+                stack.append(bytes(finish))
+                stack.extend(getattr(item, name) for name in reversed(fields))
+            else:
+                raise PIR_FormatError(f"cannot serialize objects of type {kind}")
+
+        data = bytearray(MAGIC)
+        writeVarint(data, FORMAT_VERSION)
+        writeVarint(data, len(strings))
+        for string in strings:
+            encoded = string.encode("utf-8")
+            writeVarint(data, len(encoded))
+            data += encoded
+        writeVarint(data, count)
+        data += operations
+        return bytes(data)
+
+
+class PIR_Reader:
+    """
+    This class rebuilds PIR trees from the bytes written by PIR_Writer.
+    """
+    # attribute names of each node class in reverse, by NODE_CLASSES index
+    FIELDS = [nodeFields(cls)[::-1] for cls in NODE_CLASSES]
+
+    def read(self, filename):
+        """Returns the PIR tree serialized in the named file."""
+        with open(filename, "rb") as inFile:
+            return self.loads(inFile.read())
+
+    def loads(self, data):
+        """Returns the PIR tree serialized in data, a bytes object."""
+        if data[:len(MAGIC)] != MAGIC:
+            raise PIR_FormatError("not a serialized PIR tree")
+        try:
+            version, pos = readVarint(data, len(MAGIC))
+            if version != FORMAT_VERSION:
+                raise PIR_FormatError(
+                    f"PIR format version {version} is not supported; "
+                    f"expected version {FORMAT_VERSION}")
+            size, pos = readVarint(data, pos)
+            strings = []
+            for _ in range(size):
+                length, pos = readVarint(data, pos)
+                strings.append(data[pos:pos + length].decode("utf-8"))
+                pos += length
+            count, pos = readVarint(data, pos)
+            return self.__run(data, pos, count, strings)
+        except (AttributeError, IndexError, KeyError, UnicodeDecodeError,
+                ValueError) as err:
+            raise PIR_FormatError(f"truncated or corrupt PIR data ({err})")
+
+    def __run(self, data, pos, count, strings):
+        """Executes count operations starting at data[pos].  Returns the
+        single value they leave on the stack."""
+        enums = ENUM_MEMBERS
+        fields = PIR_Reader.FIELDS
+        stack = []
+        pop = stack.pop
+        push = stack.append
+        for _ in range(count):
+            opcode = data[pos]
+            pos += 1
+            if opcode <= OP_TRUE:
+                push((None, False, True)[opcode])
+                continue
+            # every other operation has a varint operand
+            operand = data[pos]
+            pos += 1
+            if operand & 0x80:
+                operand, pos = readVarint(data, pos - 1)
+            if opcode == OP_NODE or opcode == OP_NODE_NO_LINE:
+                cls = NODE_CLASSES[operand]
+                node = cls.__new__(cls)
+                if opcode == OP_NODE:
+                    line = data[pos]
+                    pos += 1
+                    if line & 0x80:
+                        line, pos = readVarint(data, pos - 1)
+                    node.lineNumber = line
+                # the last attribute is on top of the stack
+                for name in fields[operand]:
+                    setattr(node, name, pop())
+                push(node)
+            elif opcode == OP_STRING:
+                push(strings[operand])
+            elif opcode in enums:
+                push(enums[opcode][operand])
+            elif opcode == OP_INT:
+                push(operand >> 1 if not operand & 1 else ~(operand >> 1))
+            elif opcode == OP_LIST or opcode == OP_TUPLE:
+                values = stack[len(stack) - operand:]
+                del stack[len(stack) - operand:]
+                push(values if opcode == OP_LIST else tuple(values))
+            else:
+                raise PIR_FormatError(f"unknown opcode {opcode} at byte {pos - 2}")
+        if len(stack) != 1 or pos != len(data):
+            raise PIR_FormatError("PIR data does not hold exactly one tree")
+        return stack[0]
+
+
+def readVarint(data, pos):
+    """Decodes the unsigned varint starting at data[pos].  Returns the
+    (value, position after the varint) pair."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def writeVarint(buffer, value):
+    """Appends the unsigned varint encoding of value to a bytearray."""
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+if __name__ == "__main__":
+    import os
+    from eckParser import Parser
+    from pirPrinter import PIR_Printer
+
+    def tester(filename):
+        """
+        Round trip test for the serializer.  The file is parsed, the tree
+        is serialized and read back, and a message is printed to the
+        console indicating if the printer output of both trees is the same.
+        Then each byte in turn is set to 255, which corrupts operands such
+        as enum values, and the data is cut short at each byte; reading it
+        must give a tree or raise a PIR_FormatError.
+        """
+        pirClass = Parser().parse(filename)
+        data = PIR_Writer().dumps(pirClass)
+        copy = PIR_Reader().loads(data)
+        printer = PIR_Printer()
+        if printer.render(copy) == printer.render(pirClass):
+            print(f"{filename} round trips in {len(data)} bytes")
+        else:
+            print(f"{filename} does not round trip")
+        for i in range(len(data)):
+            for change, corrupt in (("set to 255", data[:i] + b"\xff" + data[i + 1:]),
+                                    ("truncated", data[:i])):
+                try:
+                    PIR_Reader().loads(corrupt)
+                except PIR_FormatError:
+                    pass
+                except Exception as err:
+                    print(f"{filename}: byte {i} {change} raises {err!r}")
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for root, _, names in sorted(os.walk(os.path.join(here, "ParserTests"))):
+        for name in sorted(names):
+            if name.endswith(".eck"):
+                tester(os.path.join(root, name))
@@ -4,9 +4,40 @@ Dr. Hilton
 CS420, Spring 2025
 
 """
+import mmap
+import re
 import string
+from array import array
 from lexeme import Lexeme, LexemeMap
 
+# patterns used by the buffered mode to consume a run of characters at once
+IDENTIFIER_TAIL = re.compile(r"\w*")       # str.isalnum() characters and "_"
+WHITESPACE = re.compile(f"[{re.escape(string.whitespace)}]*")
+
+# the memory-mapped mode scans raw bytes, so it needs bytes versions of the
+# patterns and keyword table; non-ASCII bytes are UTF-8 sequences
+MAPPED_DIGITS = re.compile(rb"[0-9]*")
+MAPPED_IDENTIFIER_TAIL = re.compile(rb"[0-9A-Za-z_\x80-\xff]*")
+MAPPED_KEYWORDS = {word.encode(): lexeme
+                   for word, lexeme in LexemeMap.keywords.items()}
+MAPPED_LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+MAPPED_LINE_REST = re.compile(rb"[^\r\n]*")
+MAPPED_WHITESPACE = re.compile(WHITESPACE.pattern.encode())
+
+# master pattern for the regex engine: skips any white space and comments,
+# then matches one whole lexeme; the name of the matching group tells which
+TOKEN = re.compile(
+    f"(?:[{re.escape(string.whitespace)}]|//[^\\n]*\\n?|/\\*.*?\\*/)*"
+    r"(?:(?P<word>[^\W\d]\w*)"
+    r"|(?P<openComment>/\*)"
+    f"|(?P<symbol>[{re.escape(''.join(LexemeMap.symbols))}])"
+    r"|(?P<zero>0)"
+    r"|(?P<integer>\d+)"
+    r'|"(?P<string>[^"]*)"'
+    r'|(?P<openString>")'
+    r"|(?P<eof>\Z)"
+    r"|(?P<illegal>.))", re.DOTALL)
+
 
 class ScannerError(Exception):
     """Custom error class for lexical errors in a Eck source code file."""
@@ -21,18 +52,87 @@ class ScannerError(Exception):
 class Scanner:
     """Lexical analyzer for the Eck programming language.  Each call to the
     nextLexeme() method will return one Eck lexeme, as a (category, value)
-    pair. """
+    pair.
+
+    By default characters are read from the file one at a time.  Passing a
+    blockSize other than 1 switches the scanner to buffered mode: the file is
+    read blockSize characters at a time (or all at once when blockSize is
+    not positive) into a buffer that is walked with an integer cursor, so
+    whole lexemes are sliced out of the buffer instead of being assembled
+    one character at a time.
+
+    Passing memoryMap=True scans the bytes of a read-only memory map of the
+    file instead, so resident memory stays flat however large the file is.
+    Identifier and string values are decoded from the mapping only when a
+    lexeme needs one.  "\r\n" and "\r" line breaks read as "\n", as they do
+    in text mode.
 
-    def __init__(self, filename):
-        """Initialize the Scanner object and open the file to be scanned"""
+    Passing engine="regex" replaces the hand-written DFA with a tokenizer
+    that reads the whole file and matches each lexeme, along with the white
+    space and comments before it, with one precompiled master pattern. """
+
+    def __init__(self, filename, blockSize=1, memoryMap=False, engine="dfa"):
+        """Initialize the Scanner object and open the file to be scanned
+        Inputs:
+            filename    string; path to the Eck source file
+            blockSize   Optional; number of characters to read from the file
+                        at a time.  1 reads a character per call; zero or a
+                        negative value reads the whole file at once.
+            memoryMap   Optional; True scans a memory map of the file and
+                        ignores blockSize.
+            engine      Optional; "dfa" for the hand-written scanner or
+                        "regex" for the master pattern tokenizer, which
+                        ignores blockSize and memoryMap.
+        """
+        if engine not in ("dfa", "regex"):
+            raise ValueError(f"unknown scanner engine '{engine}'")
         # instance variables
+        self.__blockSize = blockSize  # characters requested per read from stream
+        self.__buffer = ""        # buffered mode: characters read from stream;
+                                  # memory-mapped mode: the mmap of the file
         self.__char = None        # the last character read from stream
+        self.__cursor = 0         # buffered mode: index of self.__char in self.__buffer
+        self.__exhausted = False  # buffered mode: True once the whole file is buffered
         self.__lineNumber = 1     # current line number in input file
         self.__stream = None      # file object associated with the input file
+        if engine == "regex":
+            with open(filename, "r") as self.__stream:
+                self.__buffer = self.__stream.read()
+            self.__exhausted = True
+            self.nextLexeme = self._nextRegexLexeme
+            # prime the pump by moving onto the first character in the buffer
+            self.__cursor = -1
+            self._moveCursor(0)
+            return
+        if memoryMap:
+            self.__stream = open(filename, "rb")
+            try:
+                self.__buffer = mmap.mmap(self.__stream.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file cannot be mapped
+                self.__buffer = b""
+            self.nextLexeme = self._nextMappedLexeme
+            # prime the pump by moving onto the first character in the map
+            self.__cursor = -1
+            self._moveMappedCursor(0)
+            return
         # open the input file
         self.__stream = open(filename, "r")
-        # prime the pump by reading the first character in the file
-        self._nextChar()
+        if blockSize == 1:
+            # prime the pump by reading the first character in the file
+            self._nextChar()
+        else:
+            if blockSize <= 0:
+                self.__buffer = self.__stream.read()
+                self.__exhausted = True
+                self.__stream.close()
+            else:
+                self.__buffer = self.__stream.read(blockSize)
+            self.nextLexeme = self._nextBufferedLexeme
+            # prime the pump by moving onto the first character in the buffer
+            self.__cursor = -1
+            self._moveCursor(0)
 
     @property
     def char(self):
@@ -51,6 +151,315 @@ class Scanner:
             self.__lineNumber += 1
         return self.__char
 
+    def _fillBuffer(self):
+        """Buffered mode: discards the scanned part of the buffer and appends
+        the next block of the input file to it."""
+        block = self.__stream.read(self.__blockSize)
+        if block == '':
+            self.__exhausted = True
+            self.__stream.close()
+        else:
+            self.__buffer = self.__buffer[self.__cursor:] + block
+            self.__cursor = 0
+
+    def _moveCursor(self, pos):
+        """Buffered mode: makes buffer position pos the current character,
+        counting the newlines passed over on the way."""
+        buf = self.__buffer
+        self.__lineNumber += buf.count('\n', self.__cursor + 1, pos + 1)
+        self.__cursor = pos
+        self.__char = buf[pos] if pos < len(buf) else None
+
+    def _nextBufferedLexeme(self):
+        """Buffered mode replacement for nextLexeme(), installed by the
+        constructor.  Returns the next lexeme as a (category, value) pair."""
+        while True:
+            lexeme = self._scanBuffer()
+            if lexeme is not None:
+                return lexeme
+            # the lexeme runs past the end of the buffer
+            self._fillBuffer()
+
+    def _scanBuffer(self):
+        """Buffered mode: scans one lexeme starting at the cursor.  Returns
+        the (category, value) pair, or None if more of the file must be read
+        into the buffer before the lexeme can be completed."""
+        buf = self.__buffer
+        n = len(buf)
+        more = not self.__exhausted
+        pos = self.__cursor
+        lexeme = None     # lexeme pair to return
+        error = None      # descriptive part of a ScannerError to raise
+        # skip over any white space and comments
+        while True:
+            pos = WHITESPACE.match(buf, pos).end()
+            if pos + 1 >= n and more:
+                return None
+            if pos >= n or buf[pos] != '/':
+                break
+            # either the start of a comment or the division symbol
+            nextChar = buf[pos + 1] if pos + 1 < n else None
+            if nextChar == '/':
+                end = buf.find('\n', pos + 2)
+                if end < 0:
+                    if more:
+                        return None
+                    pos = n
+                else:
+                    pos = end + 1
+            elif nextChar == '*':
+                end = buf.find('*/', pos + 2)
+                if end < 0:
+                    if more:
+                        return None
+                    pos = n
+                    error = "end-of-file encountered in a multi-line comment"
+                    break
+                pos = end + 2
+            else:
+                # division symbol
+                pos += 1
+                lexeme = (Lexeme.SYMBOL_DIVIDE, None)
+                break
+
+        # the current character is the start of a lexeme
+        if lexeme is not None or error is not None:
+            pass
+        elif pos >= n:
+            # at end of file
+            self.__stream.close()
+            lexeme = (Lexeme.EOF, None)
+        else:
+            char = buf[pos]
+            if char == "0":
+                pos += 1
+                lexeme = (Lexeme.INTEGER_CONST, 0)
+            elif char.isdigit():
+                val = 0
+                while pos < n and buf[pos].isdigit():
+                    val = val * 10 + ord(buf[pos]) - ord("0")
+                    pos += 1
+                if val > 32767:
+                    error = "Integer too large"
+                else:
+                    lexeme = (Lexeme.INTEGER_CONST, val)
+            elif char == '"':
+                end = buf.find('"', pos + 1)
+                if end < 0:
+                    if more:
+                        return None
+                    pos = n
+                    error = "end-of-file encountered in a string constant"
+                else:
+                    lexeme = (Lexeme.STRING_CONST, buf[pos + 1:end])
+                    pos = end + 1
+            elif char == "_" or char.isalpha():
+                start = pos
+                pos = IDENTIFIER_TAIL.match(buf, pos + 1).end()
+                word = buf[start:pos]
+                if word in LexemeMap.keywords:
+                    lexeme = (LexemeMap.keywords[word], None)
+                else:
+                    lexeme = (Lexeme.IDENTIFIER, word)
+            elif char in LexemeMap.symbols:
+                pos += 1
+                lexeme = (LexemeMap.symbols[char], None)
+            else:
+                # illegal character
+                pos += 1
+                error = f"illegal character '{char}'"
+
+        # the character following the lexeme must be in the buffer too
+        if pos >= n and more:
+            return None
+        # move the cursor past the lexeme (inlined _moveCursor)
+        self.__lineNumber += buf.count('\n', self.__cursor + 1, pos + 1)
+        self.__cursor = pos
+        self.__char = buf[pos] if pos < n else None
+        if error is not None:
+            raise ScannerError(f"Line {self.getLineNumber()}: {error}")
+        return lexeme
+
+    def _decodeMappedChar(self, pos):
+        """Memory-mapped mode: decodes the UTF-8 character starting at
+        position pos.  Returns the (character, position after it) pair."""
+        byte = self.__buffer[pos]
+        if byte < 0x80:
+            size = 1
+        elif byte < 0xE0:
+            size = 2
+        elif byte < 0xF0:
+            size = 3
+        else:
+            size = 4
+        return self.__buffer[pos:pos + size].decode("utf-8"), pos + size
+
+    def _moveMappedCursor(self, pos):
+        """Memory-mapped mode: makes map position pos the current character,
+        counting the line breaks passed over on the way."""
+        buf = self.__buffer
+        n = len(buf)
+        if pos < n and buf[pos] == ord("\r") and buf[pos + 1:pos + 2] == b"\n":
+            # "\r\n" reads as a single "\n", which sits on the "\n" byte
+            pos += 1
+        self.__lineNumber += len(
+            MAPPED_LINE_BREAK.findall(buf, self.__cursor + 1, pos + 1))
+        self.__cursor = pos
+        if pos >= n:
+            self.__char = None
+        elif buf[pos] < 0x80:
+            self.__char = "\n" if buf[pos] == ord("\r") else chr(buf[pos])
+        else:
+            self.__char = self._decodeMappedChar(pos)[0]
+
+    def _nextMappedLexeme(self):
+        """Memory-mapped mode replacement for nextLexeme(), installed by the
+        constructor.  Returns the next lexeme as a (category, value) pair."""
+        buf = self.__buffer
+        n = len(buf)
+        pos = self.__cursor
+        lexeme = None     # lexeme pair to return
+        error = None      # descriptive part of a ScannerError to raise
+        # skip over any white space and comments
+        while True:
+            pos = MAPPED_WHITESPACE.match(buf, pos).end()
+            if buf[pos:pos + 1] != b"/":
+                break
+            # either the start of a comment or the division symbol
+            nextByte = buf[pos + 1:pos + 2]
+            if nextByte == b"/":
+                end = MAPPED_LINE_REST.match(buf, pos + 2).end()
+                if end >= n:
+                    pos = n
+                elif buf[end:end + 2] == b"\r\n":
+                    pos = end + 2
+                else:
+                    pos = end + 1
+            elif nextByte == b"*":
+                end = buf.find(b"*/", pos + 2)
+                if end < 0:
+                    pos = n
+                    error = "end-of-file encountered in a multi-line comment"
+                    break
+                pos = end + 2
+            else:
+                # division symbol
+                pos += 1
+                lexeme = (Lexeme.SYMBOL_DIVIDE, None)
+                break
+
+        # the current character is the start of a lexeme
+        if lexeme is not None or error is not None:
+            pass
+        elif pos >= n:
+            # at end of file; release the mapping
+            self._moveMappedCursor(n)
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+            self.__stream.close()
+            self.__buffer = b""
+            self.__cursor = 0
+            return (Lexeme.EOF, None)
+        else:
+            if buf[pos] < 0x80:
+                char, charEnd = chr(buf[pos]), pos + 1
+            else:
+                char, charEnd = self._decodeMappedChar(pos)
+            if char == "0":
+                pos += 1
+                lexeme = (Lexeme.INTEGER_CONST, 0)
+            elif charEnd == pos + 1 and char.isdigit():
+                # only ASCII digits form integer constants in this mode
+                end = MAPPED_DIGITS.match(buf, pos).end()
+                val = int(buf[pos:end])
+                pos = end
+                if val > 32767:
+                    error = "Integer too large"
+                else:
+                    lexeme = (Lexeme.INTEGER_CONST, val)
+            elif char == '"':
+                end = buf.find(b'"', pos + 1)
+                if end < 0:
+                    pos = n
+                    error = "end-of-file encountered in a string constant"
+                else:
+                    s = buf[pos + 1:end].decode("utf-8")
+                    if "\r" in s:
+                        s = s.replace("\r\n", "\n").replace("\r", "\n")
+                    lexeme = (Lexeme.STRING_CONST, s)
+                    pos = end + 1
+            elif char == "_" or char.isalpha():
+                end = MAPPED_IDENTIFIER_TAIL.match(buf, charEnd).end()
+                word = buf[pos:end]
+                if word in MAPPED_KEYWORDS:
+                    lexeme = (MAPPED_KEYWORDS[word], None)
+                else:
+                    word = word.decode("utf-8")
+                    if not word.isascii():
+                        # keep only the leading run of identifier characters
+                        word = word[:IDENTIFIER_TAIL.match(word, 1).end()]
+                        end = pos + len(word.encode("utf-8"))
+                    lexeme = (Lexeme.IDENTIFIER, word)
+                pos = end
+            elif char in LexemeMap.symbols:
+                pos += 1
+                lexeme = (LexemeMap.symbols[char], None)
+            else:
+                # illegal character
+                pos = charEnd
+                error = f"illegal character '{char}'"
+
+        self._moveMappedCursor(pos)
+        if error is not None:
+            raise ScannerError(f"Line {self.getLineNumber()}: {error}")
+        return lexeme
+
+    def _nextRegexLexeme(self):
+        """Regex engine replacement for nextLexeme(), installed by the
+        constructor.  Returns the next lexeme as a (category, value) pair."""
+        buf = self.__buffer
+        match = TOKEN.match(buf, self.__cursor)
+        kind = match.lastgroup
+        pos = match.end()
+        lexeme = None     # lexeme pair to return
+        error = None      # descriptive part of a ScannerError to raise
+        if kind == "word":
+            word = match.group(kind)
+            if word in LexemeMap.keywords:
+                lexeme = (LexemeMap.keywords[word], None)
+            else:
+                lexeme = (Lexeme.IDENTIFIER, word)
+        elif kind == "symbol":
+            lexeme = (LexemeMap.symbols[match.group(kind)], None)
+        elif kind == "zero":
+            lexeme = (Lexeme.INTEGER_CONST, 0)
+        elif kind == "integer":
+            val = int(match.group(kind))
+            if val > 32767:
+                error = "Integer too large"
+            else:
+                lexeme = (Lexeme.INTEGER_CONST, val)
+        elif kind == "string":
+            lexeme = (Lexeme.STRING_CONST, match.group(kind))
+        elif kind == "eof":
+            lexeme = (Lexeme.EOF, None)
+        elif kind == "openComment":
+            pos = len(buf)
+            error = "end-of-file encountered in a multi-line comment"
+        elif kind == "openString":
+            pos = len(buf)
+            error = "end-of-file encountered in a string constant"
+        else:
+            error = f"illegal character '{match.group(kind)}'"
+
+        # move the cursor past the lexeme (inlined _moveCursor)
+        self.__lineNumber += buf.count('\n', self.__cursor + 1, pos + 1)
+        self.__cursor = pos
+        self.__char = buf[pos] if pos < len(buf) else None
+        if error is not None:
+            raise ScannerError(f"Line {self.getLineNumber()}: {error}")
+        return lexeme
+
     def nextLexeme(self):
         """Returns the next lexeme in the input stream as a (category, value) pair."""
         # skip over any white space and comments
@@ -88,7 +497,7 @@ class Scanner:
         word = self.char
         char = self._nextChar()
         # loop through legal characters for identifiers
-        while char.isalnum() or char == "_":
+        while char is not None and (char.isalnum() or char == "_"):
             word += char
             char = self._nextChar()
         # determine if the word is a keyword or an identifier
@@ -105,7 +514,7 @@ class Scanner:
         val = ord(self.char) - ord("0")
         # read the rest of the digits
         char = self._nextChar()
-        while char.isdigit():
+        while char is not None and char.isdigit():
             # accumulate the value of the integer
             digit = ord(char) - ord("0")
             val = val * 10 + digit
@@ -141,10 +550,12 @@ class Scanner:
             if char is None:
                 raise ScannerError(
                     f"Line {self.getLineNumber()}: end-of-file encountered in a multi-line comment")
-            elif char == '*' and self._nextChar() == '/':
-                # at the end of comment
-                self._nextChar()
-                return
+            elif char == '*':
+                char = self._nextChar()
+                if char == '/':
+                    # at the end of comment
+                    self._nextChar()
+                    return
             else:
                 # inside the comment
                 char = self._nextChar()
@@ -153,7 +564,7 @@ class Scanner:
         """Advances the input to the next character past the end of a
         single line comment """
         # skip over characters until a newline is read
-        while self.char != '\n':
+        while self.char is not None and self.char != '\n':
             self._nextChar()
         # read past the end of comment
         self._nextChar()
@@ -187,6 +598,87 @@ class Scanner:
                 return False
 
 
+class TokenArray:
+    """The lexemes of a whole file stored as parallel arrays rather than as
+    a list of (category, value) tuples.  Token i has the Lexeme whose value
+    is lexemes[i], was scanned when the scanner reported line
+    lineNumbers[i], and has the value values[valueIndexes[i]].  Identifier,
+    string and integer values are interned, so each distinct value is
+    stored once; index 0 of values is None, for lexemes without a value.
+
+    Lexical errors do not stop the scan.  Each one is recorded in errors as
+    a (token index, message) pair, where token index is the position the
+    next token will take in the arrays. """
+
+    # maps Lexeme values back to Lexeme constants
+    LEXEMES = {lexeme.value: lexeme for lexeme in Lexeme}
+
+    def __init__(self):
+        self.errors = []                 # (token index, message) pairs
+        self.lexemes = array("H")        # Lexeme value of each token
+        self.lineNumbers = array("I")    # line number of each token
+        self.valueIndexes = array("I")   # index into values for each token
+        self.values = [None]             # interned token values
+        self.__valueIndex = {}           # maps a value to its index in values
+
+    def __getitem__(self, index):
+        """Returns token index as a (category, value) pair, like
+        Scanner.nextLexeme()."""
+        return (TokenArray.LEXEMES[self.lexemes[index]],
+                self.values[self.valueIndexes[index]])
+
+    def __len__(self):
+        return len(self.lexemes)
+
+    def append(self, lexeme, lineNumber):
+        """Appends a (category, value) lexeme pair scanned on lineNumber."""
+        category, value = lexeme
+        self.lexemes.append(category.value)
+        self.lineNumbers.append(lineNumber)
+        if value is None:
+            self.valueIndexes.append(0)
+        else:
+            # the type is part of the key so that 1 and "1" stay distinct
+            key = (type(value), value)
+            index = self.__valueIndex.get(key)
+            if index is None:
+                index = len(self.values)
+                self.__valueIndex[key] = index
+                self.values.append(value)
+            self.valueIndexes.append(index)
+
+    def lexeme(self, index):
+        """Returns the Lexeme category of token index."""
+        return TokenArray.LEXEMES[self.lexemes[index]]
+
+    def lineNumber(self, index):
+        """Returns the line number of token index."""
+        return self.lineNumbers[index]
+
+    def value(self, index):
+        """Returns the value of token index, or None."""
+        return self.values[self.valueIndexes[index]]
+
+
+def tokenizeAll(filename, **scannerOptions):
+    """Scans a whole Eck source file.  Returns a TokenArray holding every
+    lexeme up to and including Lexeme.EOF.  The keyword arguments are passed
+    to the Scanner constructor; the regex engine is used unless another is
+    requested."""
+    scannerOptions.setdefault("engine", "regex")
+    scanner = Scanner(filename, **scannerOptions)
+    tokens = TokenArray()
+    while True:
+        try:
+            lexeme = scanner.nextLexeme()
+        except ScannerError as err:
+            tokens.errors.append((len(tokens), err.value))
+            continue
+        tokens.append(lexeme, scanner.getLineNumber())
+        if lexeme[0] == Lexeme.EOF:
+            return tokens
+
+
 if __name__ == "__main__":
     import os
 
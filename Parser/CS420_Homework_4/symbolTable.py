@@ -0,0 +1,249 @@
+"""
+Symbol tables for the Eck Compiler
+CS420, Spring 2025
+
+This file defines the SymbolTableManager, which records every declaration
+of an Eck program: the classes, their subroutines, and the variables of
+each VariableScopes kind.  Scopes nest two deep.  A class's table holds
+its FIELD and STATIC variables, and each subroutine's table holds its
+PARAMETER and LOCAL variables and has the class's table as its parent.
+
+Every table is a dict keyed by variable name, so an identifier is resolved
+with at most one hashed lookup per scope, never by scanning the variables
+lists of the PIR.  Subroutines are kept in one dict for the whole program,
+keyed by their mangled names, which are also stored in
+PIR_SubroutineDeclaration.mangledName.  Names are interned as they are
+declared, so the many symbols of a large program share their strings.
+
+Eck subroutines can be overloaded, so a mangled name includes the types of
+the parameters: "Square.new$int$int$int".  The overloads of a name are
+also kept together, keyed by the unmangled "Class.subroutine" name, for
+resolving calls.
+"""
+
+import sys
+
+from eckTypes import DataTypes, VariableScopes
+
+# spelling of each DataTypes constant in Eck source, besides CLASS_SCALAR
+TYPE_NAMES = {
+    DataTypes.BOOLEAN_ARRAY: "boolean[]",
+    DataTypes.BOOLEAN_SCALAR: "boolean",
+    DataTypes.CHAR_ARRAY: "char[]",
+    DataTypes.CHAR_SCALAR: "char",
+    DataTypes.INT_ARRAY: "int[]",
+    DataTypes.INT_SCALAR: "int",
+    DataTypes.STRING: "String",
+    DataTypes.VOID: "void",
+}
+
+
+class SymbolError(Exception):
+    """Custom error class for declaration errors.  value is the list of
+    "Line N: message" strings for every error found."""
+
+    def __init__(self, value):
+        self.value = value
+
+    # __str__ is to print() the value
+    def __str__(self):
+        return (repr(self.value))
+
+
+def typeName(typ):
+    """Returns the Eck spelling of a (DataType, className | None) pair."""
+    dataType, className = typ
+    if dataType == DataTypes.CLASS_SCALAR:
+        return className or "null"
+    return TYPE_NAMES[dataType]
+
+
+def mangle(className, subroutineName, parameters=()):
+    """Returns the mangled name of a subroutine: its class name and its own
+    name joined by a dot, followed by the type of each of its
+    PIR_VariableDeclaration parameters after a "$", as in
+    "Square.new$int$int$int"."""
+    return sys.intern(f"{className}.{subroutineName}" +
+                      "".join("$" + typeName(parameter.type)
+                              for parameter in parameters))
+
+
+class Symbol:
+    """One declared variable.  index counts the variables of the same
+    VariableScopes kind declared before it in the same table, so it is the
+    variable's slot in the storage for that kind."""
+
+    __slots__ = ("index", "lineNumber", "name", "scope", "type")
+
+    def __init__(self, line, name, typ, scope, index):
+        """
+        line    Line number where the variable is declared
+        name    string; name of the variable
+        typ     (DataType, className | None) pair containing variable type
+        scope   VariableScopes constant
+        index   position among the variables of its scope kind
+        """
+        self.index = index
+        self.lineNumber = line
+        self.name = name
+        self.scope = scope
+        self.type = typ
+
+
+class SymbolTable:
+    """
+    The variables declared in one scope: a class or a subroutine.  symbols
+    maps each name to its Symbol, counts maps each VariableScopes constant
+    to the number of variables of that kind, and parent is the table of
+    the enclosing scope, or None for a class.
+    """
+
+    def __init__(self, name, parent=None):
+        """name        class name or mangled subroutine name of the scope"""
+        self.counts = dict.fromkeys(VariableScopes, 0)
+        self.name = name
+        self.parent = parent
+        self.symbols = {}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def declare(self, declaration):
+        """Adds a PIR_VariableDeclaration to the table.  Returns its Symbol,
+        or None if the name is already declared in this scope."""
+        name = sys.intern(declaration.name)
+        if name in self.symbols:
+            return None
+        scope = declaration.scope
+        symbol = Symbol(declaration.lineNumber, name, declaration.type, scope,
+                        self.counts[scope])
+        self.counts[scope] += 1
+        self.symbols[name] = symbol
+        return symbol
+
+    def lookup(self, name):
+        """Returns the Symbol a name refers to in this scope, searching the
+        enclosing scopes if it is not declared here, or None."""
+        table = self
+        while table is not None:
+            symbol = table.symbols.get(name)
+            if symbol is not None:
+                return symbol
+            table = table.parent
+        return None
+
+
+class SymbolTableManager:
+    """
+    The symbol tables of a whole program.  classes maps each class name to
+    its PIR_Class, classTables maps it to the table of its variables,
+    subroutines maps each mangled name to its PIR_SubroutineDeclaration and
+    tables maps it to the table of its variables.  overloads maps each
+    "Class.subroutine" name to the list of its declarations.  errors lists
+    every declaration error found so far.
+    """
+
+    def __init__(self):
+        self.classes = {}        # class name -> PIR_Class
+        self.classTables = {}    # class name -> SymbolTable
+        self.errors = []         # "Line N: message" strings
+        self.overloads = {}      # "Class.subroutine" -> [PIR_SubroutineDeclaration]
+        self.subroutines = {}    # mangled name -> PIR_SubroutineDeclaration
+        self.tables = {}         # mangled name -> SymbolTable
+
+    def addClass(self, pirClass):
+        """Declares a class, its variables and its subroutines, and
+        assigns the mangled name of each subroutine.  Errors are added to
+        errors and the declarations in error are skipped."""
+        className = sys.intern(pirClass.name)
+        if className in self.classes:
+            self.errors.append(f"Line {pirClass.lineNumber}: class {className} "
+                               f"is already declared")
+            return
+        self.classes[className] = pirClass
+        classTable = self.classTables[className] = SymbolTable(className)
+        self.__declareAll(classTable, pirClass.variables)
+        for subroutine in pirClass.subroutines:
+            mangledName = mangle(className, subroutine.name, subroutine.parameters)
+            if mangledName in self.subroutines:
+                self.errors.append(f"Line {subroutine.lineNumber}: subroutine "
+                                   f"{mangledName} is already declared")
+                continue
+            subroutine.mangledName = mangledName
+            self.subroutines[mangledName] = subroutine
+            self.overloads.setdefault(mangle(className, subroutine.name),
+                                      []).append(subroutine)
+            table = self.tables[mangledName] = SymbolTable(mangledName, classTable)
+            self.__declareAll(table, subroutine.parameters)
+            self.__declareAll(table, subroutine.body.variables)
+
+    def build(self, classes):
+        """Declares every class of a program.
+        Inputs:
+            classes     An iterable of PIR_Class objects, or a dict of them
+                        such as parseProject returns
+        Returns:
+            This manager.  If any declaration is in error, a SymbolError
+            listing every error is raised instead, after the rest of the
+            program has been declared.
+        """
+        if isinstance(classes, dict):
+            classes = classes.values()
+        for pirClass in classes:
+            self.addClass(pirClass)
+        if self.errors:
+            raise SymbolError(self.errors)
+        return self
+
+    def lookupSubroutines(self, className, subroutineName):
+        """Returns the list of PIR_SubroutineDeclarations of a class's
+        subroutines with a name, one per overload, which is empty if there
+        is no such class or subroutine."""
+        return self.overloads.get(f"{className}.{subroutineName}", [])
+
+    def resolve(self, mangledName, name):
+        """Returns the Symbol an identifier used in a subroutine refers to,
+        or None if it is not a variable in scope there."""
+        table = self.tables[mangledName]
+        symbol = table.symbols.get(name)
+        if symbol is None:
+            symbol = table.parent.symbols.get(name)
+        return symbol
+
+    def symbolCount(self):
+        """Returns the number of variables declared in the program."""
+        return (sum(len(table) for table in self.classTables.values())
+                + sum(len(table) for table in self.tables.values()))
+
+    def __declareAll(self, table, declarations):
+        """Adds a list of PIR_VariableDeclarations to a table."""
+        for declaration in declarations:
+            if table.declare(declaration) is None:
+                self.errors.append(f"Line {declaration.lineNumber}: variable "
+                                   f"{declaration.name} is already declared "
+                                   f"in {table.name}")
+
+
+if __name__ == "__main__":
+    import os
+    from eckProject import ProjectError, parseProject
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[1:] or [os.path.join(here, "ParserTests", "Square")]
+    try:
+        manager = SymbolTableManager().build(parseProject(paths, workers=1))
+    except (ProjectError, SymbolError) as err:
+        for error in err.value:
+            print(error)
+        sys.exit(1)
+    for className, classTable in manager.classTables.items():
+        print(f"class {className}: " + ", ".join(
+            f"{symbol.scope.name.lower()} {symbol.name} #{symbol.index}"
+            for symbol in classTable.symbols.values()))
+        for subroutine in manager.classes[className].subroutines:
+            table = manager.tables[subroutine.mangledName]
+            print(f"   {subroutine.mangledName}: " + ", ".join(
+                f"{symbol.scope.name.lower()} {symbol.name} #{symbol.index}"
+                for symbol in table.symbols.values()))
+    print(f"{manager.symbolCount()} variables, {len(manager.subroutines)} "
+          f"subroutines in {len(manager.classes)} classes")
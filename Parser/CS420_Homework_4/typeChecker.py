@@ -0,0 +1,491 @@
+"""
+Type checker for the Eck Compiler
+CS420, Spring 2025
+
+This file defines a checker that walks the PIR trees of a whole program
+once and checks every statement and expression against the types of the
+Eck language description:
+
+  * int and char convert to each other freely; boolean converts to
+    nothing.  Arithmetic operators and unary - take int or char and give
+    int, < and > compare them, and & | ~ take two booleans or two ints.
+  * null may be assigned to any object or array.  Arrays are implemented
+    by the standard library's Array class, so an Array may be assigned to
+    any array variable, and an Array variable accepts any object or array,
+    as Memory.deAlloc(this) requires.
+  * Conditions must be boolean and return values must match the
+    subroutine's type.
+
+Calls are resolved across classes, including overloaded subroutines and
+the standard library, whose declarations are read from the stubs in
+StandardLibrary.  The checker sets PIR_SubroutineCall.mangledSubrName to
+the mangled name of the subroutine called, and
+PIR_SubroutineDeclaration.returnFound to whether every path through the
+subroutine ends in a return statement.
+
+Expressions are checked bottom-up with an explicit stack, so a long
+expression cannot exhaust Python's recursion limit.  The types of a
+node's operands are looked up by node in a table kept for the expression
+being checked.  An expression whose operands are in error has no type,
+and is not reported again, so every error is reported once.
+"""
+
+import glob
+import os
+
+from eckParser import Parser
+from eckTypes import DataTypes, SubroutineSpecifiers, VariableScopes
+from lexeme import Lexeme
+from parserIR import (PIR_AssignmentStatement, PIR_DoStatement, PIR_ExpressionBinop,
+                      PIR_ExpressionConstant, PIR_ExpressionUnop,
+                      PIR_ExpressionVariable, PIR_IfStatement, PIR_ReturnStatement,
+                      PIR_SubroutineCall, PIR_WhileStatement)
+from symbolTable import SymbolTableManager, typeName
+
+# directory holding this module; the standard library is located relative to it
+HERE = os.path.dirname(os.path.abspath(__file__))
+LIBRARY_DIRECTORY = os.path.join(HERE, "StandardLibrary")
+
+ARRAY = (DataTypes.CLASS_SCALAR, "Array")
+BOOLEAN = (DataTypes.BOOLEAN_SCALAR, None)
+CHAR = (DataTypes.CHAR_SCALAR, None)
+INT = (DataTypes.INT_SCALAR, None)
+NULL = (DataTypes.CLASS_SCALAR, None)       # the type of null
+STRING = (DataTypes.CLASS_SCALAR, "String")
+VOID = (DataTypes.VOID, None)
+
+# the type of an element of each array type
+ELEMENT_TYPES = {
+    DataTypes.BOOLEAN_ARRAY: BOOLEAN,
+    DataTypes.CHAR_ARRAY: CHAR,
+    DataTypes.INT_ARRAY: INT,
+}
+NUMERIC = (DataTypes.CHAR_SCALAR, DataTypes.INT_SCALAR)
+ARITHMETIC = (Lexeme.SYMBOL_PLUS, Lexeme.SYMBOL_MINUS, Lexeme.SYMBOL_TIMES,
+              Lexeme.SYMBOL_DIVIDE)
+LOGICAL = (Lexeme.SYMBOL_AND, Lexeme.SYMBOL_OR)
+ORDERING = (Lexeme.SYMBOL_LT, Lexeme.SYMBOL_GT)
+OPERATOR_NAMES = {
+    Lexeme.SYMBOL_AND: "&", Lexeme.SYMBOL_DIVIDE: "/", Lexeme.SYMBOL_EQUAL: "=",
+    Lexeme.SYMBOL_GT: ">", Lexeme.SYMBOL_LT: "<", Lexeme.SYMBOL_MINUS: "-",
+    Lexeme.SYMBOL_NEGATE: "~", Lexeme.SYMBOL_OR: "|", Lexeme.SYMBOL_PLUS: "+",
+    Lexeme.SYMBOL_TIMES: "*",
+}
+
+# the classes of the standard library, parsed on first use
+LIBRARY = []
+
+
+class TypeCheckError(Exception):
+    """Custom error class for a program with type errors.  value is the
+    list of "Class: Line N: message" strings for every error found."""
+
+    def __init__(self, value):
+        self.value = value
+
+    # __str__ is to print() the value
+    def __str__(self):
+        return (repr(self.value))
+
+
+def standardLibrary():
+    """Returns the PIR_Class of every class of the Eck standard library,
+    parsing the stubs in LIBRARY_DIRECTORY the first time it is called."""
+    if not LIBRARY:
+        for filename in sorted(glob.glob(os.path.join(LIBRARY_DIRECTORY, "*.eck"))):
+            LIBRARY.append(Parser().parse(filename))
+    return LIBRARY
+
+
+def isReference(typ):
+    """Returns True for the type of an object, an array or null."""
+    return typ[0] == DataTypes.CLASS_SCALAR or typ[0] in ELEMENT_TYPES
+
+
+def assignable(target, source):
+    """Returns True if a value of type source may be stored in a variable
+    of type target."""
+    if target == source:
+        return True
+    if target[0] in NUMERIC:
+        return source[0] in NUMERIC
+    if source == NULL:
+        return isReference(target)
+    if target == ARRAY:
+        return isReference(source)
+    return source == ARRAY and target[0] in ELEMENT_TYPES
+
+
+def operands(node):
+    """Returns the subexpressions of an expression node."""
+    kind = type(node)
+    if kind is PIR_ExpressionBinop:
+        return (node.leftExp, node.rightExp)
+    if kind is PIR_ExpressionUnop:
+        return (node.expression,)
+    if kind is PIR_SubroutineCall:
+        return node.actualParameters
+    if kind is PIR_ExpressionVariable and node.arrayExpression is not None:
+        return (node.arrayExpression,)
+    return ()
+
+
+class TypeChecker:
+    """
+    This class checks the types of a program.  check() takes every class
+    of the program at once and raises a TypeCheckError listing all the
+    errors found, declaration errors included.  symbols is the
+    SymbolTableManager holding the program's declarations, and nodes
+    counts the statements and expressions checked.
+    """
+
+    def __init__(self, library=True):
+        """
+        library     Optional; False to leave out the standard library
+        """
+        self.errors = []                    # "Class: Line N: message" strings
+        self.nodes = 0                      # statements and expressions checked
+        self.symbols = SymbolTableManager()
+        self.__class = None                 # PIR_Class being checked
+        self.__subroutine = None            # PIR_SubroutineDeclaration being checked
+        self.__types = {}                   # operand node -> type, or None if in error,
+                                            # for the expression being checked
+        # expression class -> method returning the type of a node whose
+        # operands have been checked
+        self.__rules = {
+            PIR_ExpressionBinop: self.__binop,
+            PIR_ExpressionConstant: self.__constant,
+            PIR_ExpressionUnop: self.__unop,
+            PIR_ExpressionVariable: self.__variable,
+            PIR_SubroutineCall: self.__call,
+        }
+        if library:
+            for pirClass in standardLibrary():
+                self.symbols.addClass(pirClass)
+
+    def check(self, classes, declared=()):
+        """Checks every class of a program.
+        Inputs:
+            classes     An iterable of PIR_Class objects, or a dict of them
+                        such as parseProject returns
+            declared    Optional; PIR_Class objects of the rest of the
+                        program, which are declared but not checked.  Only
+                        their names and subroutine declarations are used.
+        Returns:
+            The SymbolTableManager of the program.  If the program has
+            declaration or type errors, a TypeCheckError listing every
+            error is raised instead.
+        """
+        if isinstance(classes, dict):
+            classes = classes.values()
+        classes = list(classes)
+        for pirClass in declared:
+            self.symbols.addClass(pirClass)
+        for pirClass in classes:
+            count = len(self.symbols.errors)
+            self.symbols.addClass(pirClass)
+            self.errors.extend(f"{pirClass.name}: {error}"
+                               for error in self.symbols.errors[count:])
+        for pirClass in classes:
+            self.checkClass(pirClass)
+        if self.errors:
+            raise TypeCheckError(self.errors)
+        return self.symbols
+
+    def checkClass(self, pirClass):
+        """Checks the subroutines of a class already declared in symbols,
+        adding any errors to errors."""
+        self.__class = pirClass
+        for declaration in pirClass.variables:
+            self.__checkType(declaration.lineNumber, declaration.type)
+        for subroutine in pirClass.subroutines:
+            if subroutine.mangledName is not None:
+                self.__checkSubroutine(subroutine)
+
+    def expressionType(self, expression):
+        """Returns the type of an expression in the subroutine being
+        checked, or None if it is in error, checking every subexpression
+        once."""
+        types = self.__types = {}
+        rules = self.__rules
+        # (node, True once its operands have been pushed)
+        stack = [(expression, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                self.nodes += 1
+                types[node] = rules[type(node)](node)
+            else:
+                # check the operands left to right before the node
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(operands(node)))
+        return types[expression]
+
+    def __error(self, line, message):
+        self.errors.append(f"{self.__class.name}: Line {line}: {message}")
+
+    def __checkType(self, line, typ):
+        """Reports a declared type naming a class that does not exist."""
+        if typ[0] == DataTypes.CLASS_SCALAR and typ[1] not in self.symbols.classes:
+            self.__error(line, f"unknown type {typ[1]}")
+
+    def __checkSubroutine(self, subroutine):
+        self.__subroutine = subroutine
+        self.__checkType(subroutine.lineNumber, subroutine.type)
+        if subroutine.specifier == SubroutineSpecifiers.CONSTRUCTOR and \
+                subroutine.type != (DataTypes.CLASS_SCALAR, self.__class.name):
+            self.__error(subroutine.lineNumber, f"constructor {subroutine.name} must "
+                         f"return {self.__class.name}")
+        for declaration in subroutine.parameters + subroutine.body.variables:
+            self.__checkType(declaration.lineNumber, declaration.type)
+        subroutine.returnFound = self.__checkStatements(subroutine.body.statements)
+        if not subroutine.returnFound and subroutine.type != VOID:
+            self.__error(subroutine.lineNumber, f"{subroutine.name} does not return "
+                         f"a value on every path")
+
+    def __checkStatements(self, statements):
+        """Checks a list of statements.  Returns True if every path
+        through them ends in a return statement."""
+        returns = False
+        for statement in statements:
+            self.nodes += 1
+            kind = type(statement)
+            if kind is PIR_AssignmentStatement:
+                self.__assignment(statement)
+            elif kind is PIR_DoStatement:
+                self.expressionType(statement.subprogram)
+            elif kind is PIR_IfStatement:
+                self.__condition(statement.condition, "if")
+                thenReturns = self.__checkStatements(statement.thenBranch)
+                if statement.elseBranch is not None:
+                    if self.__checkStatements(statement.elseBranch) and thenReturns:
+                        returns = True
+            elif kind is PIR_WhileStatement:
+                self.__condition(statement.condition, "while")
+                self.__checkStatements(statement.statements)
+            elif kind is PIR_ReturnStatement:
+                self.__return(statement)
+                returns = True
+        return returns
+
+    def __assignment(self, statement):
+        symbol = self.__lookup(statement.lineNumber, statement.variable)
+        target = None if symbol is None else symbol.type
+        if statement.arrayExpression is not None:
+            index = self.expressionType(statement.arrayExpression)
+            target = self.__element(statement.lineNumber, statement.variable,
+                                    target, index)
+        value = self.expressionType(statement.expression)
+        if target is not None and value is not None and not assignable(target, value):
+            self.__error(statement.lineNumber, f"cannot assign {typeName(value)} to "
+                         f"{statement.variable}, of type {typeName(target)}")
+
+    def __condition(self, expression, keyword):
+        typ = self.expressionType(expression)
+        if typ is not None and typ != BOOLEAN:
+            self.__error(expression.lineNumber, f"{keyword} condition is "
+                         f"{typeName(typ)}, not boolean")
+
+    def __return(self, statement):
+        expected = self.__subroutine.type
+        if statement.expression is None:
+            if expected != VOID:
+                self.__error(statement.lineNumber, f"{self.__subroutine.name} must "
+                             f"return {typeName(expected)}")
+            return
+        typ = self.expressionType(statement.expression)
+        if expected == VOID:
+            self.__error(statement.lineNumber, f"{self.__subroutine.name} is void "
+                         f"and cannot return a value")
+        elif typ is not None and not assignable(expected, typ):
+            self.__error(statement.lineNumber, f"cannot return {typeName(typ)} from "
+                         f"{self.__subroutine.name}, of type {typeName(expected)}")
+
+    def __lookup(self, line, name):
+        """Returns the Symbol of a variable used in the subroutine being
+        checked, reporting an undeclared variable or a field used in a
+        function."""
+        symbol = self.symbols.resolve(self.__subroutine.mangledName, name)
+        if symbol is None:
+            self.__error(line, f"undeclared variable {name}")
+        elif symbol.scope == VariableScopes.FIELD and \
+                self.__subroutine.specifier == SubroutineSpecifiers.FUNCTION:
+            self.__error(line, f"field {name} used in function "
+                         f"{self.__subroutine.name}")
+            return None
+        return symbol
+
+    def __element(self, line, name, arrayType, index):
+        """Returns the type of an element of an array variable, or None,
+        reporting an index that is not an integer or a variable that is
+        not an array."""
+        if index is not None and index[0] not in NUMERIC:
+            self.__error(line, f"index of {name} is {typeName(index)}, not int")
+        if arrayType is None:
+            return None
+        if arrayType == ARRAY:
+            return INT
+        if arrayType[0] not in ELEMENT_TYPES:
+            self.__error(line, f"{name}, of type {typeName(arrayType)}, is not an array")
+            return None
+        return ELEMENT_TYPES[arrayType[0]]
+
+    def __binop(self, node):
+        types = self.__types
+        left = types[node.leftExp]
+        right = types[node.rightExp]
+        if left is None or right is None:
+            return None
+        op = node.operator
+        numeric = left[0] in NUMERIC and right[0] in NUMERIC
+        if op in ARITHMETIC:
+            if numeric:
+                return INT
+        elif op in ORDERING:
+            if numeric:
+                return BOOLEAN
+        elif op in LOGICAL:
+            if numeric:
+                return INT
+            if left == BOOLEAN and right == BOOLEAN:
+                return BOOLEAN
+        elif numeric or (left == BOOLEAN and right == BOOLEAN) or \
+                (isReference(left) and isReference(right) and
+                 (assignable(left, right) or assignable(right, left))):
+            return BOOLEAN
+        self.__error(node.lineNumber, f"operator {OPERATOR_NAMES[op]} cannot take "
+                     f"{typeName(left)} and {typeName(right)}")
+        return None
+
+    def __unop(self, node):
+        operand = self.__types[node.expression]
+        if operand is None:
+            return None
+        if operand[0] in NUMERIC:
+            return INT
+        if operand == BOOLEAN and node.operator == Lexeme.SYMBOL_NEGATE:
+            return BOOLEAN
+        self.__error(node.lineNumber, f"operator {OPERATOR_NAMES[node.operator]} "
+                     f"cannot take {typeName(operand)}")
+        return None
+
+    def __constant(self, node):
+        if node.value is Lexeme.KW_THIS:
+            if self.__subroutine.specifier == SubroutineSpecifiers.FUNCTION:
+                self.__error(node.lineNumber, f"this used in function "
+                             f"{self.__subroutine.name}")
+                return None
+            return (DataTypes.CLASS_SCALAR, self.__class.name)
+        if node.type == VOID:
+            return NULL
+        return node.type
+
+    def __variable(self, node):
+        symbol = self.__lookup(node.lineNumber, node.name)
+        typ = None if symbol is None else symbol.type
+        if node.arrayExpression is None:
+            return typ
+        return self.__element(node.lineNumber, node.name, typ,
+                              self.__types[node.arrayExpression])
+
+    def __call(self, node):
+        """Resolves a call to the subroutine it calls and sets its
+        mangledSubrName.  Returns the subroutine's type."""
+        line = node.lineNumber
+        name = node.subroutineName
+        target = node.varOrClass
+        caller = self.__subroutine
+        if target is None:
+            className = self.__class.name
+            static = False
+        elif self.symbols.resolve(caller.mangledName, target) is not None:
+            symbol = self.__lookup(line, target)
+            if symbol is None:
+                return None
+            if symbol.type[0] in ELEMENT_TYPES:
+                className = "Array"
+            elif symbol.type[0] == DataTypes.CLASS_SCALAR:
+                className = symbol.type[1]
+            else:
+                self.__error(line, f"{target}, of type {typeName(symbol.type)}, "
+                             f"has no subroutine {name}")
+                return None
+            static = False
+        elif target in self.symbols.classes:
+            className = target
+            static = True
+        else:
+            self.__error(line, f"unknown class or variable {target}")
+            return None
+
+        candidates = self.symbols.lookupSubroutines(className, name)
+        if not candidates:
+            self.__error(line, f"{className} has no subroutine {name}")
+            return None
+        arguments = [self.__types[argument] for argument in node.actualParameters]
+        if None in arguments:
+            return None
+        subroutine = self.__overload(line, className, name, candidates, arguments)
+        if subroutine is None:
+            return None
+
+        isMethod = subroutine.specifier == SubroutineSpecifiers.METHOD
+        if static and isMethod:
+            self.__error(line, f"method {className}.{name} must be called on an object")
+        elif target is not None and not static and not isMethod:
+            self.__error(line, f"{className}.{name} is not a method; call it "
+                         f"through {className}")
+        elif target is None and not isMethod:
+            self.__error(line, f"{name} is not a method; call it as {className}.{name}")
+        elif target is None and caller.specifier == SubroutineSpecifiers.FUNCTION:
+            self.__error(line, f"method {name} called from function {caller.name}")
+        node.mangledSubrName = subroutine.mangledName
+        return subroutine.type
+
+    def __overload(self, line, className, name, candidates, arguments):
+        """Returns the declaration a call with the given argument types
+        resolves to: the only one whose parameter types match exactly, or
+        else the only one that accepts them.  Reports a call that matches
+        no declaration, or several."""
+        applicable = []
+        for candidate in candidates:
+            parameters = candidate.parameters
+            if len(parameters) == len(arguments) and \
+                    all(assignable(parameter.type, argument)
+                        for parameter, argument in zip(parameters, arguments)):
+                if all(parameter.type == argument
+                       for parameter, argument in zip(parameters, arguments)):
+                    return candidate
+                applicable.append(candidate)
+        if len(applicable) == 1:
+            return applicable[0]
+        signature = ", ".join(typeName(argument) for argument in arguments)
+        if applicable:
+            self.__error(line, f"call of {className}.{name}({signature}) is ambiguous")
+        else:
+            self.__error(line, f"no {className}.{name} takes ({signature})")
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+    from eckProject import ProjectError, parseProject
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    programs = sys.argv[1:] or [os.path.join(here, "ParserTests", "Square"),
+                                os.path.join(here, "ParserTests", "ExpressionLessSquare"),
+                                os.path.join(here, "ParserTests", "ArrayTests.eck")]
+    for program in programs:
+        checker = TypeChecker()
+        try:
+            checker.check(parseProject(program, workers=1))
+            print(f"{os.path.relpath(program, here)}: no errors, "
+                  f"{checker.nodes} nodes checked")
+        except ProjectError as err:
+            print(f"{os.path.relpath(program, here)}: does not parse")
+            for error in err.value:
+                print(f"   {error}")
+        except TypeCheckError as err:
+            print(f"{os.path.relpath(program, here)}: {len(err.value)} errors")
+            for error in err.value:
+                print(f"   {error}")